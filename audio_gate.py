@@ -0,0 +1,101 @@
+# audio_gate.py
+
+import logging
+
+import numpy as np
+
+try:
+    import webrtcvad
+except ImportError:
+    webrtcvad = None
+
+logger = logging.getLogger(__name__)
+
+
+class EnergyGate:
+    """
+    Cheap speech-energy gate placed in front of the wake word model.
+
+    Tracks the background noise floor (fast down, slow up, only while the
+    gate is closed) and opens when a frame's RMS rises well above it. Uses
+    separate open/close ratios for hysteresis and keeps the gate open for a
+    hang-over period after energy drops, so word endings are not cut off.
+    Optionally confirms openings with WebRTC VAD when it is installed.
+    """
+
+    def __init__(self, sample_rate: int = 16000, open_ratio: float = 3.0, close_ratio: float = 2.0,
+                 min_open_rms: float = 0.004, hangover_frames: int = 12,
+                 use_webrtc_vad: bool = False, vad_mode: int = 2):
+        self.sample_rate = sample_rate
+        self.open_ratio = open_ratio
+        self.close_ratio = close_ratio
+        self.min_open_rms = min_open_rms
+        self.hangover_frames = hangover_frames
+        self.noise_floor = min_open_rms / open_ratio
+        self.is_open = False
+        self._hangover = 0
+
+        self.vad = None
+        if use_webrtc_vad:
+            if webrtcvad is None:
+                logger.warning("webrtcvad is not installed; energy gate will run without VAD.")
+            else:
+                self.vad = webrtcvad.Vad(vad_mode)
+
+        # --- Stats ---
+        self.frames = 0
+        self.gated_frames = 0
+        self.openings = 0
+
+    @staticmethod
+    def rms(frame: np.ndarray) -> float:
+        samples = frame.astype(np.float32) / 32768.0
+        return float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+
+    def _is_speech(self, frame: np.ndarray) -> bool:
+        """True if any 20 ms sub-frame is classified as speech by WebRTC VAD."""
+        step = self.sample_rate // 50
+        for start in range(0, len(frame) - step + 1, step):
+            if self.vad.is_speech(frame[start:start + step].tobytes(), self.sample_rate):
+                return True
+        return False
+
+    def process(self, frame: np.ndarray) -> bool:
+        """Updates the gate with one int16 frame; returns True if the model should run."""
+        self.frames += 1
+        level = self.rms(frame)
+
+        if self.is_open:
+            if level > self.noise_floor * self.close_ratio:
+                self._hangover = self.hangover_frames
+            elif self._hangover > 0:
+                self._hangover -= 1
+            else:
+                self.is_open = False
+        else:
+            # Follow drops in background noise quickly and rises slowly
+            rate = 0.2 if level < self.noise_floor else 0.01
+            self.noise_floor += rate * (level - self.noise_floor)
+            if level > max(self.noise_floor * self.open_ratio, self.min_open_rms):
+                if self.vad is None or self._is_speech(frame):
+                    self.is_open = True
+                    self._hangover = self.hangover_frames
+                    self.openings += 1
+
+        if not self.is_open:
+            self.gated_frames += 1
+        return self.is_open
+
+    def reset(self):
+        """Closes the gate; the noise floor and stats are kept."""
+        self.is_open = False
+        self._hangover = 0
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'gated_frames': self.gated_frames,
+            'gated_fraction': self.gated_frames / self.frames if self.frames else 0.0,
+            'openings': self.openings,
+            'noise_floor_rms': self.noise_floor,
+        }
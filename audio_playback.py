@@ -0,0 +1,242 @@
+# audio_playback.py
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class JitterBuffer:
+    """
+    Adaptive jitter buffer between the WebRTC data channel and the speaker.
+
+    The network side calls put() with PCM chunks of any size (and trace
+    marker tuples), exactly like the queue it replaces. The PortAudio output
+    callback calls read() for fixed-size frames and always gets a full frame
+    back, padded with silence if the buffer ran dry.
+
+    Playback of a burst starts once `target_ms` of audio is buffered (or the
+    first chunk has waited that long, so short replies are not held back).
+    Running dry shortly before more audio arrives counts as an underrun and
+    grows the target; a long stretch without underruns shrinks it again.
+    flush() drops everything queued in O(1) and mutes input until the next
+    response marker.
+    """
+
+    def __init__(self, sample_rate: int = 24000, target_ms: float = 120.0, min_target_ms: float = 60.0,
+                 max_target_ms: float = 400.0, step_ms: float = 40.0, decay_seconds: float = 10.0,
+                 end_of_stream_gap: float = 0.5,
+                 on_marker: Optional[Callable[[tuple], bool]] = None):
+        self.sample_rate = sample_rate
+        self.target_ms = target_ms
+        self.min_target_ms = min_target_ms
+        self.max_target_ms = max_target_ms
+        self.step_ms = step_ms
+        self.decay_seconds = decay_seconds
+        self.end_of_stream_gap = end_of_stream_gap  # Dry spells longer than this are the end of a reply
+        # Called from put() with each marker tuple; returns False to drop the audio that follows it
+        self.on_marker = on_marker
+
+        self._lock = threading.Lock()
+        self._items = deque()   # int16 arrays and marker tuples, in arrival order
+        self._offset = 0        # Samples already played from _items[0]
+        self._buffered = 0      # Samples queued (excluding the played part of _items[0])
+        self._playing = False
+        self._first_wait = None  # monotonic time the oldest unplayed chunk arrived while buffering
+        self._dry_since = None   # monotonic time playback ran dry
+        self._last_underrun = time.monotonic()
+        self._accepting = True
+        self.started_markers: List[Tuple[tuple, float]] = []  # (marker, wall time its audio started)
+
+        # --- Stats ---
+        self.underruns = 0
+        self.late_chunks = 0
+        self.flushes = 0
+        self.dropped_chunks = 0
+        self.frames_read = 0
+        self.silent_samples = 0  # Silence inserted mid-reply
+        self.max_depth_ms = 0.0
+
+    def _ms(self, samples: int) -> float:
+        return samples / self.sample_rate * 1000
+
+    def put(self, item):
+        """Queues a PCM chunk (bytes) or a marker tuple. Called from the network thread."""
+        if isinstance(item, tuple):
+            accept = self.on_marker(item) if self.on_marker else True
+            with self._lock:
+                self._accepting = accept
+                if accept:
+                    self._items.append(item)
+            return
+        if not item:
+            return
+        samples = np.frombuffer(item, dtype=np.int16)
+        now = time.monotonic()
+        with self._lock:
+            if not self._accepting:
+                self.dropped_chunks += 1
+                return
+            if self._dry_since is not None:
+                if now - self._dry_since < self.end_of_stream_gap:
+                    # Audio of the same reply arrived after its playout time
+                    self.late_chunks += 1
+                    self.underruns += 1
+                    self._last_underrun = now
+                    self.target_ms = min(self.max_target_ms, self.target_ms + self.step_ms)
+                self._dry_since = None
+            if not self._playing and self._first_wait is None:
+                self._first_wait = now
+            self._items.append(samples)
+            self._buffered += len(samples)
+            self.max_depth_ms = max(self.max_depth_ms, self._ms(self._buffered))
+
+    def read(self, n: int) -> bytes:
+        """Returns exactly n samples for the output callback; never blocks on the network."""
+        out = np.zeros(n, dtype=np.int16)
+        now = time.monotonic()
+        with self._lock:
+            self.frames_read += 1
+            if not self._playing:
+                waited = now - self._first_wait if self._first_wait is not None else 0.0
+                if self._buffered == 0 or (self._ms(self._buffered) < self.target_ms
+                                           and waited * 1000 < self.target_ms):
+                    return out.tobytes()
+                self._playing = True
+                self._first_wait = None
+
+            filled = 0
+            while filled < n and self._items:
+                item = self._items[0]
+                if isinstance(item, tuple):
+                    self._items.popleft()
+                    self.started_markers.append((item, time.time()))
+                    continue
+                take = min(len(item) - self._offset, n - filled)
+                out[filled:filled + take] = item[self._offset:self._offset + take]
+                filled += take
+                self._offset += take
+                self._buffered -= take
+                if self._offset == len(item):
+                    self._items.popleft()
+                    self._offset = 0
+
+            if filled < n:
+                self._playing = False
+                self._dry_since = now
+                self.silent_samples += n - filled
+            elif now - self._last_underrun > self.decay_seconds:
+                self.target_ms = max(self.min_target_ms, self.target_ms - self.step_ms)
+                self._last_underrun = now
+        return out.tobytes()
+
+    def pop_started_markers(self) -> List[Tuple[tuple, float]]:
+        with self._lock:
+            started, self.started_markers = self.started_markers, []
+        return started
+
+    def flush(self, mute: bool = True):
+        """Drops all queued audio in O(1); with mute, also drops input until the next marker."""
+        with self._lock:
+            self._items = deque()
+            self._offset = 0
+            self._buffered = 0
+            self._playing = False
+            self._first_wait = None
+            self._dry_since = None
+            if mute:
+                self._accepting = False
+            self.flushes += 1
+
+    def depth_ms(self) -> float:
+        return self._ms(self._buffered)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'depth_ms': self.depth_ms(),
+            'target_ms': self.target_ms,
+            'max_depth_ms': self.max_depth_ms,
+            'underruns': self.underruns,
+            'late_chunks': self.late_chunks,
+            'flushes': self.flushes,
+            'dropped_chunks': self.dropped_chunks,
+            'silence_ms': self._ms(self.silent_samples),
+        }
+
+
+class PlaybackEnvelope:
+    """
+    Lock-free, single-writer envelope of the audio leaving the speaker.
+
+    The output callback calls write() once per frame with the time that
+    frame will actually be heard; RMS and peak are computed there (one
+    vectorized pass over the frame). Entries live in preallocated arrays
+    indexed by a sequence counter that is only advanced after an entry is
+    complete, so readers such as the render loop never take a lock: they
+    read the counter, scan back for the newest frame already audible, and
+    retry if the writer lapped them meanwhile.
+
+    Pass `buffer` (e.g. a multiprocessing.shared_memory buffer of at least
+    nbytes(capacity)) to place the arrays and counter in it, so another
+    process can attach a reader to the same memory.
+    """
+
+    def __init__(self, capacity: int = 256, gain: float = 4.0, buffer=None, initialize: bool = True):
+        self.capacity = capacity
+        self.gain = gain  # Speech RMS around 0.1-0.25 maps to a level of roughly 0.4-1.0
+        if buffer is None:
+            buffer = bytearray(self.nbytes(capacity))
+        # Layout: seq (int64) | times (float64) | rms | peak | level (float32)
+        self._header = np.ndarray((1,), dtype=np.int64, buffer=buffer, offset=0)
+        offset = 8
+        self._times = np.ndarray((capacity,), dtype=np.float64, buffer=buffer, offset=offset)
+        offset += 8 * capacity
+        self._rms, self._peak, self._level = (
+            np.ndarray((capacity,), dtype=np.float32, buffer=buffer, offset=offset + 4 * capacity * k)
+            for k in range(3)
+        )
+        if initialize:
+            self._header[0] = 0  # Number of entries ever written
+            self._times[:] = -np.inf
+            self._rms[:] = self._peak[:] = self._level[:] = 0.0
+
+    @staticmethod
+    def nbytes(capacity: int) -> int:
+        return 8 + 8 * capacity + 3 * 4 * capacity
+
+    @property
+    def _seq(self) -> int:
+        return int(self._header[0])
+
+    def write(self, frame: np.ndarray, play_time: float):
+        """Adds one int16 output frame that will reach the speaker at `play_time` (time.monotonic())."""
+        samples = frame.astype(np.float32) * (1.0 / 32768.0)
+        rms = float(np.sqrt(np.dot(samples, samples) / len(samples))) if len(samples) else 0.0
+        i = self._seq % self.capacity
+        self._rms[i] = rms
+        self._peak[i] = float(np.abs(samples).max()) if len(samples) else 0.0
+        self._level[i] = min(1.0, rms * self.gain)
+        self._times[i] = play_time
+        self._header[0] += 1
+
+    def sample_at(self, now: float, max_age: float = 0.1) -> Tuple[float, float, float]:
+        """(level, rms, peak) of the frame playing at `now`; zeros if nothing played recently."""
+        for _ in range(3):
+            seq = self._seq
+            for back in range(1, min(seq, self.capacity - 1) + 1):
+                i = (seq - back) % self.capacity
+                t = self._times[i]
+                if t <= now:
+                    result = (float(self._level[i]), float(self._rms[i]), float(self._peak[i]))
+                    # Entry i could only have been overwritten if the writer lapped us
+                    if self._seq - seq < self.capacity - back:
+                        return result if now - t <= max_age else (0.0, 0.0, 0.0)
+                    break
+            else:
+                return (0.0, 0.0, 0.0)
+        return (0.0, 0.0, 0.0)
+
+    def level_at(self, now: float) -> float:
+        return self.sample_at(now)[0]
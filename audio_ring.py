@@ -0,0 +1,146 @@
+# audio_ring.py
+
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class AudioRingBuffer:
+    """
+    Preallocated single-writer, multi-reader ring buffer of int16 samples.
+
+    The writer (the PortAudio callback) only copies samples in and then
+    advances a monotonically increasing write position; it never takes a
+    lock or waits for readers. Each reader keeps its own position and
+    detects when the writer has lapped it (an overrun), in which case it
+    skips ahead and counts the dropped samples.
+    """
+
+    def __init__(self, capacity_samples: int, sample_rate: int = 16000):
+        self.capacity = capacity_samples
+        self.sample_rate = sample_rate
+        self._buffer = np.zeros(capacity_samples, dtype=np.int16)
+        self._write_pos = 0  # Total samples ever written
+        self._max_write = 0  # Largest single write; that much may be in flight at any time
+        self.last_write_time = 0.0  # time.monotonic() of the most recent write
+        self.readers: Dict[str, "RingReader"] = {}
+
+    @property
+    def write_pos(self) -> int:
+        return self._write_pos
+
+    @property
+    def usable(self) -> int:
+        """Samples behind write_pos that cannot be overwritten by a write in progress."""
+        return self.capacity - self._max_write
+
+    def write(self, samples: np.ndarray):
+        """Copies samples into the ring. Safe to call from the audio callback."""
+        n = len(samples)
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+            self._write_pos += n - self.capacity
+            n = self.capacity
+        self._max_write = max(self._max_write, n)
+        start = self._write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self._buffer[start:start + first] = samples[:first]
+        if first < n:
+            self._buffer[:n - first] = samples[first:]
+        # Publish only after the samples are in place
+        self._write_pos += n
+        self.last_write_time = time.monotonic()
+
+    def age_of(self, position: int) -> float:
+        """Seconds since the sample at `position` was captured (approximate)."""
+        return (self._write_pos - position) / self.sample_rate + (time.monotonic() - self.last_write_time)
+
+    def reader(self, name: str, from_now: bool = True) -> "RingReader":
+        reader = RingReader(self, name, self._write_pos if from_now else max(0, self._write_pos - self.capacity))
+        self.readers[name] = reader
+        return reader
+
+    def _copy_out(self, position: int, n: int) -> np.ndarray:
+        start = position % self.capacity
+        first = min(n, self.capacity - start)
+        if first == n:
+            return self._buffer[start:start + n].copy()
+        return np.concatenate((self._buffer[start:], self._buffer[:n - first]))
+
+    def recent(self, end_position: int, n: int) -> np.ndarray:
+        """Copy of up to n samples ending at end_position, limited to what is still buffered."""
+        start = max(end_position - n, self._write_pos - self.usable, 0)
+        if end_position <= start:
+            return np.zeros(0, dtype=np.int16)
+        return self._copy_out(start, end_position - start)
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        return {name: reader.metrics() for name, reader in self.readers.items()}
+
+
+class RingReader:
+    """A consumer's independent cursor into an AudioRingBuffer."""
+
+    def __init__(self, ring: AudioRingBuffer, name: str, position: int):
+        self.ring = ring
+        self.name = name
+        self.position = position
+        self.overruns = 0
+        self.dropped_samples = 0
+        self.max_lag = 0
+
+    def available(self) -> int:
+        return self.ring.write_pos - self.position
+
+    def _check_overrun(self):
+        lag = self.ring.write_pos - self.position
+        self.max_lag = max(self.max_lag, lag)
+        if lag > self.ring.usable:
+            self.overruns += 1
+            self.dropped_samples += lag - self.ring.usable
+            self.position = self.ring.write_pos - self.ring.usable
+
+    def read(self, n: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        Returns exactly n samples (or everything available if n is None),
+        or None if not enough audio has been written yet.
+        """
+        self._check_overrun()
+        available = self.available()
+        if n is None:
+            n = min(available, self.ring.usable)
+        if n == 0 or available < n:
+            return None
+        samples = self.ring._copy_out(self.position, n)
+        # If the writer lapped us while copying, the copy may be torn: drop it
+        if self.ring.write_pos - self.position > self.ring.usable:
+            self._check_overrun()
+            return None
+        self.position += n
+        return samples
+
+    def read_blocking(self, n: int, timeout: float = 1.0, poll_interval: float = 0.005) -> Optional[np.ndarray]:
+        """Polls until n samples are available; readers sleep, the writer never signals."""
+        deadline = time.monotonic() + timeout
+        while True:
+            samples = self.read(n)
+            if samples is not None or time.monotonic() >= deadline:
+                return samples
+            time.sleep(poll_interval)
+
+    def seek(self, position: int):
+        """Moves the cursor to an absolute sample position (clamped to what is still buffered)."""
+        self.position = max(position, self.ring.write_pos - self.ring.usable, 0)
+
+    def skip_to_end(self):
+        self.position = self.ring.write_pos
+
+    def metrics(self) -> Dict[str, float]:
+        rate = self.ring.sample_rate
+        return {
+            "lag_ms": self.available() / rate * 1000,
+            "max_lag_ms": self.max_lag / rate * 1000,
+            "overruns": self.overruns,
+            "dropped_ms": self.dropped_samples / rate * 1000,
+        }
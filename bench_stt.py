@@ -0,0 +1,199 @@
+"""
+STT configuration benchmark.
+Feeds recorded 16 kHz WAV fixtures through STTProcessor.feed_audio at
+real-time pace (each utterance followed by silence, as the mic would) and,
+for every Whisper configuration, reports:
+  - load time of both models,
+  - final-transcript latency: end of the fixture's audio -> full sentence,
+  - realtime update rate: stabilized realtime callbacks per second of speech,
+  - CPU%: core seconds used by the run (including RealtimeSTT's
+    transcription process) per wall-clock second, and the resident memory
+    of those processes once the models are loaded (needs psutil),
+  - WER against the reference transcript in <fixture>.txt, when present.
+
+Each configuration runs in its own process so models and thread settings
+do not leak between runs.
+
+Usage:
+  python bench_stt.py fixtures/*.wav
+  python bench_stt.py fixtures/*.wav --configs small:int8:5:4 small:float32:5:4 base.en:int8:1:2
+  (config = final model:compute type:beam size:cpu threads, 0 threads = default)
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from audio_io import read_wav
+
+SAMPLE_RATE = 16000
+CHUNK_SAMPLES = 1024  # 64 ms, same order as KAIRACore's STT feed
+
+
+def normalize_words(text: str):
+    return re.sub(r"[^a-z0-9' ]", " ", text.lower()).split()
+
+
+def word_errors(reference: str, hypothesis: str):
+    """(word edit distance, reference word count)."""
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (r != h))
+    return row[len(hyp)], len(ref)
+
+
+def load_fixtures(paths):
+    fixtures = []
+    for path in paths:
+        samples, rate = read_wav(path)
+        if rate != SAMPLE_RATE:
+            raise ValueError(f"{path}: expected 16 kHz, got {rate}")
+        reference_path = os.path.splitext(path)[0] + ".txt"
+        reference = open(reference_path).read().strip() if os.path.exists(reference_path) else None
+        fixtures.append((os.path.basename(path), samples, reference))
+    return fixtures
+
+
+def feed_realtime(processor, samples: np.ndarray):
+    for i in range(0, len(samples), CHUNK_SAMPLES):
+        chunk = samples[i:i + CHUNK_SAMPLES]
+        processor.feed_audio(chunk.astype(np.int16).tobytes())
+        time.sleep(len(chunk) / SAMPLE_RATE)
+
+
+def process_tree_usage():
+    """(CPU seconds, RSS bytes) of this process and its children, or None without psutil."""
+    if psutil is None:
+        return None
+    processes = [psutil.Process()]
+    processes += processes[0].children(recursive=True)
+    cpu, rss = 0.0, 0
+    for process in processes:
+        try:
+            times = process.cpu_times()
+            cpu += times.user + times.system
+            rss += process.memory_info().rss
+        except psutil.Error:
+            pass  # Exited while we were looking
+    return cpu, rss
+
+
+def run_config(config: dict, fixture_paths, timeout: float, results):
+    from stt_processor import STTProcessor
+
+    finals = []
+    realtime_updates = []
+    final_event = threading.Event()
+
+    def on_realtime(text):
+        realtime_updates.append(time.perf_counter())
+
+    def on_final(text):
+        finals.append((time.perf_counter(), text))
+        final_event.set()
+
+    processor = STTProcessor(on_realtime, on_final, **config)
+    processor.start()
+    processor.ready.wait()
+    silence = np.zeros(CHUNK_SAMPLES, dtype=np.int16)
+
+    rows = []
+    for name, samples, reference in load_fixtures(fixture_paths):
+        final_event.clear()
+        finals.clear()
+        realtime_updates.clear()
+        feed_realtime(processor, np.zeros(SAMPLE_RATE // 2, dtype=np.int16))
+        speech_start = time.perf_counter()
+        feed_realtime(processor, samples)
+        speech_end = time.perf_counter()
+        # Keep the "microphone" running with silence until the sentence arrives
+        while not final_event.is_set() and time.perf_counter() - speech_end < timeout:
+            feed_realtime(processor, silence)
+        text = finals[0][1] if finals else ""
+        rows.append({
+            "fixture": name,
+            "latency_ms": (finals[0][0] - speech_end) * 1000 if finals else None,
+            "realtime_per_s": len([t for t in realtime_updates if t <= speech_end]) / (speech_end - speech_start),
+            "errors": word_errors(reference, text) if reference is not None else None,
+            "text": text,
+        })
+    load_seconds = processor.load_seconds
+    # Measured before stop() so RealtimeSTT's transcription process is still counted
+    usage = process_tree_usage()
+    processor.stop()
+    results.put({"rows": rows, "load_seconds": load_seconds, "describe": processor.describe(), "usage": usage})
+
+
+def parse_config(spec: str, realtime_model: str) -> dict:
+    model, compute_type, beam, threads = spec.split(":")
+    return {
+        "model": model,
+        "realtime_model": realtime_model,
+        "compute_type": compute_type,
+        "beam_size": int(beam),
+        "cpu_threads": int(threads),
+        "device": "cpu",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixtures", nargs="+", help="16 kHz 16-bit mono WAV files (references in .txt next to them)")
+    parser.add_argument("--configs", nargs="+", default=["small:float32:5:0", "small:int8:5:0", "small:int8:1:4",
+                                                          "base.en:int8:5:4"])
+    parser.add_argument("--realtime-model", default="tiny.en")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Seconds to wait for a final transcript")
+    parser.add_argument("--verbose", action="store_true", help="Print every transcript")
+    args = parser.parse_args()
+
+    if psutil is None:
+        print("psutil is not installed; CPU and memory will not be reported.")
+    ctx = mp.get_context("spawn")
+    for spec in args.configs:
+        config = parse_config(spec, args.realtime_model)
+        results = ctx.Queue()
+        started = time.perf_counter()
+        process = ctx.Process(target=run_config, args=(config, args.fixtures, args.timeout, results))
+        process.start()
+        result = results.get()
+        process.join()
+        elapsed = time.perf_counter() - started
+        if result["usage"] is not None:
+            cpu, rss = result["usage"]
+            usage = f"CPU {cpu / elapsed * 100:.0f}% | RSS {rss / 2**20:.0f} MB"
+        else:
+            usage = "CPU n/a"
+
+        rows = result["rows"]
+        latencies = [r["latency_ms"] for r in rows if r["latency_ms"] is not None]
+        scored = [r["errors"] for r in rows if r["errors"] is not None]
+        missed = len(rows) - len(latencies)
+        print(f"\n{result['describe']}")
+        print(f"  load {result['load_seconds']:.1f} s | {usage} "
+              f"| realtime updates {np.mean([r['realtime_per_s'] for r in rows]):.2f}/s")
+        if latencies:
+            print(f"  final latency after end of audio: mean {np.mean(latencies):.0f} ms, "
+                  f"p95 {np.percentile(latencies, 95):.0f} ms" + (f", {missed} timed out" if missed else ""))
+        if scored:
+            errors, words = map(sum, zip(*scored))
+            print(f"  WER {errors / max(words, 1):.1%} over {words} words")
+        if args.verbose:
+            for r in rows:
+                print(f"    {r['fixture']}: {r['text']!r}")
+
+
+if __name__ == "__main__":
+    main()
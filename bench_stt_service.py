@@ -0,0 +1,88 @@
+"""
+Pooled STT load test.
+Simulates N kiosks talking at the same time: each one streams the same
+16 kHz WAV (with a small random start offset) through RemoteSTTProcessor
+at real-time pace, then silence until its final transcript arrives.
+Reports, per number of concurrent kiosks, the final-transcript latency
+(end of utterance sent -> final received) and the partial update rate, so
+you can see how stt_service.py's batching holds up as speakers are added.
+
+Usage (with stt_service.py running):
+  python bench_stt_service.py utterance.wav
+  python bench_stt_service.py utterance.wav --kiosks 1 2 4 8 --url tcp://stt-host:5561
+"""
+
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from audio_io import read_wav
+from stt_client import STT_SERVICE_URL, RemoteSTTProcessor
+
+SAMPLE_RATE = 16000
+CHUNK_SAMPLES = 1024
+
+
+def simulate_kiosk(name: str, url: str, audio: np.ndarray, start_delay: float, timeout: float, results: list):
+    partials = []
+    final = threading.Event()
+    processor = RemoteSTTProcessor(lambda text: partials.append(time.perf_counter()), lambda text: final.set(),
+                                   service_url=url, kiosk_id=name)
+    processor.start()
+    time.sleep(start_delay)
+    speech_start = time.perf_counter()
+    for i in range(0, len(audio), CHUNK_SAMPLES):
+        processor.feed_audio(audio[i:i + CHUNK_SAMPLES].tobytes())
+        time.sleep(CHUNK_SAMPLES / SAMPLE_RATE)
+    speech_end = time.perf_counter()
+    silence = np.zeros(CHUNK_SAMPLES, dtype=np.int16).tobytes()
+    while not final.is_set() and time.perf_counter() - speech_end < timeout:
+        processor.feed_audio(silence)
+        time.sleep(CHUNK_SAMPLES / SAMPLE_RATE)
+    processor.stop()
+    results.append({
+        "latency_ms": processor.final_latency_ms if final.is_set() else None,
+        "partials_per_s": len(partials) / (speech_end - speech_start),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("wav", help="16 kHz 16-bit mono WAV with one utterance")
+    parser.add_argument("--kiosks", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--url", default=STT_SERVICE_URL)
+    parser.add_argument("--timeout", type=float, default=15.0)
+    args = parser.parse_args()
+
+    audio, rate = read_wav(args.wav)
+    if rate != SAMPLE_RATE:
+        parser.error("WAV must be 16 kHz")
+    rng = np.random.default_rng(0)
+
+    print(f"{'kiosks':>6} {'mean ms':>8} {'p95 ms':>8} {'max ms':>8} {'partials/s':>11} {'timeouts':>9}")
+    for n in args.kiosks:
+        results = []
+        threads = [
+            threading.Thread(target=simulate_kiosk,
+                             args=(f"bench-{n}-{i}", args.url, audio, rng.uniform(0, 0.3), args.timeout, results))
+            for i in range(n)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        latencies = [r["latency_ms"] for r in results if r["latency_ms"] is not None]
+        timeouts = len(results) - len(latencies)
+        partial_rate = np.mean([r["partials_per_s"] for r in results])
+        if latencies:
+            print(f"{n:>6} {np.mean(latencies):8.0f} {np.percentile(latencies, 95):8.0f} {max(latencies):8.0f} "
+                  f"{partial_rate:11.2f} {timeouts:>9}")
+        else:
+            print(f"{n:>6} {'-':>8} {'-':>8} {'-':>8} {partial_rate:11.2f} {timeouts:>9}")
+        time.sleep(1.0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+UI render benchmark.
+Drives KAIRAUI headless (SDL dummy video driver) against a scripted fake
+core for a few scenarios and compares the old full-redraw path with the
+cached, dirty-rect path. Reports per-frame draw time (mean / p95), surfaces
+created, Python allocations, pixels pushed to the display and caption
+words re-wrapped, all per frame.
+
+It then runs the real render loop in the WAITING state for --loop-seconds,
+once at a fixed 60 fps and once with the adaptive frame scheduler, and
+reports frames drawn, CPU% and pixels pushed per second.
+
+Usage:
+  python bench_ui.py
+  python bench_ui.py --frames 600 --scenarios SPEAKING
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import math
+import time
+import tracemalloc
+
+import numpy as np
+
+from kaira_ui import KAIRAUI
+from state_store import StateStore
+
+ANSWER = ("The library is open from nine in the morning until eight in the evening on weekdays, "
+          "and you can find the study rooms on the second floor next to the reading hall.")
+
+
+class FakeEnvelope:
+    def __init__(self, speaking: bool):
+        self.speaking = speaking
+
+    def level_at(self, t: float) -> float:
+        return 0.5 + 0.4 * math.sin(t * 9) if self.speaking else 0.0
+
+
+class FakeCore:
+    """Just enough of KAIRACore for KAIRAUI, scripted per scenario."""
+
+    def __init__(self, scenario: str):
+        self.scenario = scenario
+        self.state = StateStore({
+            'listening_state': 'LISTENING' if scenario == 'LISTENING' else 'WAITING',
+            'display_text': "",
+            'kaira_response_text': "",
+            'is_final_sentence': False,
+            'is_kaira_speaking': scenario in ('SPEAKING', 'LONG_ANSWER'),
+            'last_sentence_time': time.time(),
+        })
+        self.playback_envelope = FakeEnvelope(scenario in ('SPEAKING', 'LONG_ANSWER'))
+        self.input_level = 0.0
+        self.frame = 0
+
+    def step(self):
+        """Advances the script by one frame (~60 fps)."""
+        self.frame += 1
+        if self.scenario == 'LISTENING':
+            self.input_level = 0.4 + 0.3 * math.sin(self.frame / 5)
+            if self.frame % 20 == 0:  # Realtime transcript grows a word every ~330 ms
+                words = ANSWER.split()[:self.frame // 20]
+                self.state.update(display_text=" ".join(words), last_sentence_time=time.time())
+        elif self.scenario == 'SPEAKING' and self.frame % 15 == 0:
+            words = ANSWER.split()[:self.frame // 15]
+            self.state.update(kaira_response_text=" ".join(words), last_sentence_time=time.time())
+        elif self.scenario == 'LONG_ANSWER' and self.frame % 3 == 0:
+            # A response already ~1500 words long, still streaming in small chunks
+            if not self.state['kaira_response_text']:
+                self.state.update(kaira_response_text=" ".join([ANSWER] * 50))
+            chunk = " " + ANSWER.split()[(self.frame // 3) % len(ANSWER.split())]
+            self.state.update(kaira_response_text=self.state['kaira_response_text'] + chunk,
+                              last_sentence_time=time.time())
+
+    def get_state(self):
+        return self.state.snapshot()
+
+    def start_recording(self):
+        pass
+
+    def clear_captions(self, seen_version, user=False, kaira=False):
+        return True
+
+
+def surfaces_created(ui: KAIRAUI) -> int:
+    return ui.sprites.misses + sum(layout.surfaces_rendered for layout in ui.caption_layouts.values())
+
+
+def words_laid_out(ui: KAIRAUI) -> int:
+    return sum(layout.words_laid_out for layout in ui.caption_layouts.values())
+
+
+def run_scenario(scenario: str, dirty_rendering: bool, frames: int):
+    core = FakeCore(scenario)
+    ui = KAIRAUI(core, dirty_rendering=dirty_rendering)
+    np.random.seed(0)
+    dt = 1 / 60
+    for _ in range(30):  # Warm-up: fill caches, first full flip
+        core.step()
+        ui.update_animations(dt)
+        ui.draw_face()
+
+    times = np.empty(frames)
+    surfaces, pixels, words = surfaces_created(ui), ui.pixels_pushed, words_laid_out(ui)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    allocated = 0
+    for i in range(frames):
+        core.step()
+        ui.update_animations(dt)
+        before = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        ui.draw_face()
+        times[i] = (time.perf_counter() - t0) * 1000
+        allocated += max(0, tracemalloc.get_traced_memory()[0] - before)
+    tracemalloc.stop()
+
+    result = {
+        "mean_ms": times.mean(),
+        "p95_ms": np.percentile(times, 95),
+        "surfaces_per_frame": (surfaces_created(ui) - surfaces) / frames,
+        "alloc_bytes_per_frame": allocated / frames,
+        "pixels_per_frame": (ui.pixels_pushed - pixels) / frames,
+        "words_per_frame": (words_laid_out(ui) - words) / frames,
+    }
+    ui.cleanup()
+    return result
+
+
+def run_idle_loop(idle_fps: int, seconds: float):
+    core = FakeCore('WAITING')
+    ui = KAIRAUI(core, idle_fps=idle_fps)
+    frames = 0
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    while time.perf_counter() - wall_start < seconds:
+        ui.run_frame()
+        frames += 1
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    result = {
+        "fps": frames / wall,
+        "cpu_percent": cpu / wall * 100,
+        "pixels_per_second": ui.pixels_pushed / wall,
+        "active_frames": ui.scheduler.active_frames,
+        "idle_frames": ui.scheduler.idle_frames,
+    }
+    ui.cleanup()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--scenarios", nargs="+", default=["WAITING", "LISTENING", "SPEAKING", "LONG_ANSWER"])
+    parser.add_argument("--loop-seconds", type=float, default=10.0, help="Idle loop run time (0 to skip)")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<12} {'render':<8} {'mean ms':>8} {'p95 ms':>8} {'surf/frame':>11} "
+          f"{'alloc B/frame':>14} {'Mpx/frame':>10} {'words/frame':>12}")
+    for scenario in args.scenarios:
+        for dirty_rendering in (False, True):
+            r = run_scenario(scenario, dirty_rendering, args.frames)
+            label = "dirty" if dirty_rendering else "full"
+            print(f"{scenario:<12} {label:<8} {r['mean_ms']:8.2f} {r['p95_ms']:8.2f} {r['surfaces_per_frame']:11.1f} "
+                  f"{r['alloc_bytes_per_frame']:14.0f} {r['pixels_per_frame'] / 1e6:10.3f} {r['words_per_frame']:12.1f}")
+
+    if args.loop_seconds > 0:
+        print(f"\nIdle loop ({args.loop_seconds:.0f} s, WAITING):")
+        for label, idle_fps in (("fixed 60 fps", 60), ("adaptive", None)):
+            r = run_idle_loop(idle_fps, args.loop_seconds)
+            print(f"  {label:<13} {r['fps']:5.1f} frames/s | CPU {r['cpu_percent']:5.1f}% | "
+                  f"{r['pixels_per_second'] / 1e6:6.2f} Mpx/s | {r['active_frames']} active / {r['idle_frames']} idle frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Wake word backend benchmark.
+Feeds 16 kHz audio (WAV files, or synthetic noise with speech-like bursts)
+through each inference backend / thread setting in 80 ms frames and reports
+per-frame latency, process CPU% and how closely the scores agree with the
+first configuration.
+
+Usage:
+  python bench_wakeword.py                              # 60 s synthetic audio
+  python bench_wakeword.py --wav lobby.wav hey.wav
+  python bench_wakeword.py --frameworks onnx tflite --threads 1 2 4
+"""
+
+import argparse
+import itertools
+import time
+
+import numpy as np
+
+from wake_word import FRAME_SAMPLES, STOP_WORD_NAME, WAKE_WORD_NAME, create_wake_word_model, read_wav_16k
+
+
+def synthetic_audio(seconds: float, seed: int = 0) -> np.ndarray:
+    """Low-level noise with a few louder amplitude-modulated bursts."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * 16000)
+    audio = rng.standard_normal(n) * 100
+    t = np.arange(16000) / 16000
+    burst = np.sin(2 * np.pi * 220 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)) * 4000
+    for start in range(16000 * 5, n - 16000, 16000 * 10):
+        audio[start:start + 16000] += burst
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+
+def run_config(audio: np.ndarray, framework: str, threads: int):
+    model = create_wake_word_model(framework, ncpu=threads)
+    frames = [audio[i:i + FRAME_SAMPLES] for i in range(0, len(audio) - FRAME_SAMPLES + 1, FRAME_SAMPLES)]
+
+    latencies = np.empty(len(frames))
+    scores = np.empty((len(frames), 2))
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for i, frame in enumerate(frames):
+        t0 = time.perf_counter()
+        prediction = model.predict(frame)
+        latencies[i] = (time.perf_counter() - t0) * 1000
+        scores[i] = (prediction.get(WAKE_WORD_NAME, 0.0), prediction.get(STOP_WORD_NAME, 0.0))
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+
+    audio_seconds = len(frames) * FRAME_SAMPLES / 16000
+    return {
+        "latencies": latencies,
+        "scores": scores,
+        "cpu_percent": cpu / wall * 100,
+        "realtime_cpu_percent": cpu / audio_seconds * 100,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wav", nargs="*", default=[], help="16 kHz 16-bit mono WAV files")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Length of synthetic audio if no WAVs are given")
+    parser.add_argument("--frameworks", nargs="+", default=["onnx", "tflite"])
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, 2])
+    parser.add_argument("--threshold", type=float, default=0.5, help="Threshold used for detection agreement")
+    args = parser.parse_args()
+
+    if args.wav:
+        audio = np.concatenate([read_wav_16k(path) for path in args.wav])
+    else:
+        audio = synthetic_audio(args.seconds)
+    print(f"Audio: {len(audio) / 16000:.1f} s ({'WAV' if args.wav else 'synthetic'})\n")
+
+    results = []
+    for framework, threads in itertools.product(args.frameworks, args.threads):
+        try:
+            results.append(((framework, threads), run_config(audio, framework, threads)))
+        except Exception as e:
+            print(f"{framework} x{threads}: skipped ({e})")
+    if not results:
+        return
+
+    reference_scores = results[0][1]["scores"]
+    reference_hits = reference_scores >= args.threshold
+    print(f"{'backend':<10}{'threads':>8}{'mean ms':>9}{'p95 ms':>9}{'max ms':>9}"
+          f"{'CPU%':>7}{'CPU%/rt':>9}{'max |dscore|':>14}{'agree':>8}")
+    for (framework, threads), r in results:
+        lat = r["latencies"]
+        diff = np.abs(r["scores"] - reference_scores).max()
+        agreement = np.mean((r["scores"] >= args.threshold) == reference_hits) * 100
+        print(f"{framework:<10}{threads:>8}{lat.mean():>9.2f}{np.percentile(lat, 95):>9.2f}{lat.max():>9.2f}"
+              f"{r['cpu_percent']:>7.0f}{r['realtime_cpu_percent']:>9.1f}{diff:>14.4f}{agreement:>7.1f}%")
+    print(f"\nScores are compared against {results[0][0][0]} x{results[0][0][1]}. "
+          f"CPU%/rt is CPU time as a share of the audio duration (cost of running live).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Micro-benchmark: JSON payloads vs the kaira_messages binary wire format.
+Measures encode/decode cost per topic and a ZMQ inproc round trip for a
+640x480 camera frame (JSON meta + tobytes copy vs zero-copy send/recv).
+
+Usage: python bench_wire.py [--iterations N]
+"""
+
+import argparse
+import json
+import time
+import timeit
+
+import numpy as np
+import zmq
+
+import kaira_messages as wire
+
+
+def _per_call_us(fn, iterations):
+    return timeit.timeit(fn, number=iterations) / iterations * 1e6
+
+
+def bench_small_messages(iterations):
+    cases = {
+        "ai_transcription": (
+            lambda: json.dumps({"type": "chunk", "text": "Dr. Padmakumar Nair is the Vice Chancellor"}).encode(),
+            lambda b: json.loads(b.decode()),
+            lambda: wire.encode_transcription("chunk", "Dr. Padmakumar Nair is the Vice Chancellor"),
+            wire.decode_transcription,
+        ),
+        "current_identity": (
+            lambda: json.dumps({"identity": "Shalini", "emotion": "Neutral", "timestamp": time.time()}).encode(),
+            lambda b: json.loads(b.decode()),
+            lambda: wire.encode_identity("Shalini", "Neutral"),
+            wire.decode_identity,
+        ),
+        "ai_prompt": (
+            lambda: json.dumps({"prompt": "who is the vice chancellor?", "timestamp": time.time()}).encode(),
+            lambda b: json.loads(b.decode()),
+            lambda: wire.encode_prompt("who is the vice chancellor?"),
+            wire.decode_prompt,
+        ),
+    }
+
+    print(f"{'topic':<18}{'format':<8}{'bytes':>7}{'encode us':>12}{'decode us':>12}")
+    for topic, (json_enc, json_dec, wire_enc, wire_dec) in cases.items():
+        for name, enc, dec in (("json", json_enc, json_dec), ("wire", wire_enc, wire_dec)):
+            payload = enc()
+            enc_us = _per_call_us(enc, iterations)
+            dec_us = _per_call_us(lambda: dec(payload), iterations)
+            print(f"{topic:<18}{name:<8}{len(payload):>7}{enc_us:>12.2f}{dec_us:>12.2f}")
+
+
+def _json_frame_message(frame, topic, send_time):
+    meta = json.dumps(dict(dtype=str(frame.dtype), shape=frame.shape, send_time=send_time)).encode()
+    return [topic, meta, frame.tobytes()]
+
+
+def _json_frame_decode(parts):
+    topic, meta_json, frame_data = parts
+    meta = json.loads(meta_json.decode())
+    return np.frombuffer(frame_data, dtype=meta["dtype"]).reshape(meta["shape"])
+
+
+def bench_frames(iterations):
+    frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+    topic = b"camera_0"
+
+    ctx = zmq.Context.instance()
+    push = ctx.socket(zmq.PAIR)
+    pull = ctx.socket(zmq.PAIR)
+    push.bind("inproc://bench_wire")
+    pull.connect("inproc://bench_wire")
+
+    def json_round_trip():
+        push.send_multipart(_json_frame_message(frame, topic, time.time()))
+        _json_frame_decode(pull.recv_multipart())
+
+    def wire_round_trip():
+        push.send_multipart(wire.encode_frame_message(frame, topic, time.time()), copy=False)
+        wire.decode_frame_message(pull.recv_multipart(copy=False))
+
+    print()
+    print(f"{'camera frame 640x480x3':<26}{'round trip us':>14}")
+    for name, fn in (("json + tobytes", json_round_trip), ("wire zero-copy", wire_round_trip)):
+        fn()
+        print(f"{name:<26}{_per_call_us(fn, iterations):>14.1f}")
+
+    push.close()
+    pull.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    bench_small_messages(args.iterations)
+    bench_frames(max(1, args.iterations // 20))
+
+
+if __name__ == "__main__":
+    main()
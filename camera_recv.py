@@ -1,9 +1,9 @@
 import asyncio
-import json
 import aiohttp
 import numpy as np
 import zmq.asyncio
 from aiortc import RTCPeerConnection, RTCSessionDescription
+from kaira_messages import encode_frame_message
 
 # ✅ WINDOWS COMPATIBLE: Use TCP instead of IPC
 socket_url = "tcp://127.0.0.1:5555"  # Changed from tcp://127.0.0.1:5555
@@ -11,13 +11,7 @@ camera_server_url = "http://localhost:8080"
 
 def create_frame_message(frame, topic, send_time):
     """Create a ZMQ message with frame data and metadata."""
-    meta = dict(
-        dtype=str(frame.dtype),
-        shape=frame.shape,
-        send_time=send_time
-    )
-    meta_json = json.dumps(meta).encode()
-    return [topic, meta_json, frame.tobytes()]
+    return encode_frame_message(frame, topic, send_time)
 
 async def publish_video(track, topic, socket):
     """Continuously receive frames from WebRTC track and publish to ZMQ."""
@@ -30,7 +24,7 @@ async def publish_video(track, topic, socket):
                 img = frame.to_ndarray(format="bgr24")
                 send_time = asyncio.get_event_loop().time()
                 message = create_frame_message(img, topic, send_time)
-                await socket.send_multipart(message)
+                await socket.send_multipart(message, copy=False)
                 
                 frame_count += 1
                 if frame_count % 100 == 0:
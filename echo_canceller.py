@@ -0,0 +1,124 @@
+# echo_canceller.py
+
+from collections import deque
+
+import numpy as np
+
+
+class Resampler:
+    """
+    Streaming resampler (e.g. 24 kHz playback -> 16 kHz reference).
+    Low-pass filters with a short windowed-sinc FIR, then linearly
+    interpolates; filter and phase state carry across calls, so feeding
+    480-sample frames at 24 kHz yields exactly 320 samples each.
+    """
+
+    def __init__(self, src_rate: int, dst_rate: int, taps: int = 31):
+        self.step = src_rate / dst_rate
+        cutoff = min(1.0, dst_rate / src_rate) * 0.9
+        n = np.arange(taps) - (taps - 1) / 2
+        h = cutoff * np.sinc(cutoff * n) * np.hamming(taps)
+        self._h = (h / h.sum()).astype(np.float32)
+        self._history = np.zeros(taps - 1, dtype=np.float32)
+        self._offset = 0      # Absolute index of the first filtered sample of the next block
+        self._next = 0.0      # Absolute (fractional) index of the next output sample
+        self._last = 0.0      # Last filtered sample of the previous block
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if self.step == 1.0 or len(samples) == 0:
+            return samples.astype(np.float32)
+        padded = np.concatenate((self._history, samples.astype(np.float32)))
+        self._history = padded[-len(self._history):]
+        filtered = np.convolve(padded, self._h, mode="valid")
+
+        end = self._offset + len(filtered) - 1
+        positions = np.arange(self._next, end + 1e-9, self.step)
+        extended = np.concatenate(([self._last], filtered))
+        out = np.interp(positions, np.arange(self._offset - 1, end + 1), extended)
+
+        if len(positions):
+            self._next = positions[-1] + self.step
+        self._offset += len(filtered)
+        self._last = filtered[-1]
+        return out.astype(np.float32)
+
+
+class EchoCanceller:
+    """
+    Partitioned-block frequency-domain NLMS echo canceller.
+
+    `process(mic, ref)` takes one block of microphone samples and the
+    reference (what the speaker played) for the same instants, and returns
+    the mic block with the estimated echo removed. The filter spans
+    `filter_length` samples of echo path, split into block-sized partitions
+    so the cost per block is a few small FFTs. Adaptation freezes while the
+    near-end talker is louder than the echo could be (Geigel double-talk
+    detector), so the user's own speech does not train the filter away.
+    The detector assumes the echo reaches the mic quieter than the reference
+    was played; raise `double_talk_ratio` for a loud speaker close to the mic.
+    """
+
+    def __init__(self, block_size: int = 256, filter_length: int = 4096, mu: float = 0.3,
+                 double_talk_ratio: float = 0.6, min_reference_level: float = 1e-3):
+        self.block_size = block_size
+        self.partitions = max(1, filter_length // block_size)
+        self.mu = mu
+        self.double_talk_ratio = double_talk_ratio
+        self.min_reference_level = min_reference_level
+        bins = block_size + 1
+        self._X = np.zeros((self.partitions, bins), dtype=np.complex64)  # Reference spectra, newest first
+        self._W = np.zeros((self.partitions, bins), dtype=np.complex64)  # Filter partitions
+        self._previous_ref = np.zeros(block_size, dtype=np.float32)
+        self._ref_peaks = deque([0.0] * self.partitions, maxlen=self.partitions)
+
+        # --- Stats ---
+        self.blocks = 0
+        self.adapted_blocks = 0
+        self.double_talk_blocks = 0
+
+    def reset(self):
+        self._X[:] = 0
+        self._W[:] = 0
+        self._previous_ref[:] = 0
+        self._ref_peaks.extend([0.0] * self.partitions)
+
+    def process(self, mic: np.ndarray, ref: np.ndarray) -> np.ndarray:
+        """mic/ref: float arrays of block_size samples in [-1, 1]. Returns the echo-cancelled block."""
+        n = self.block_size
+        self.blocks += 1
+        mic = mic.astype(np.float32)
+        ref = ref.astype(np.float32)
+
+        # Overlap-save: spectrum of [previous block, current block]
+        spectrum = np.fft.rfft(np.concatenate((self._previous_ref, ref)))
+        self._previous_ref = ref
+        self._X = np.roll(self._X, 1, axis=0)
+        self._X[0] = spectrum
+        echo = np.fft.irfft((self._W * self._X).sum(axis=0))[n:]
+        error = mic - echo
+
+        self._ref_peaks.append(float(np.abs(ref).max()) if len(ref) else 0.0)
+        ref_peak = max(self._ref_peaks)
+        if ref_peak < self.min_reference_level:
+            return error
+        if np.abs(mic).max() > ref_peak * self.double_talk_ratio:
+            self.double_talk_blocks += 1
+            return error
+
+        # NLMS step, normalized by reference power across all partitions
+        error_spectrum = np.fft.rfft(np.concatenate((np.zeros(n, dtype=np.float32), error)))
+        power = (np.abs(self._X) ** 2).sum(axis=0) + 1e-6
+        self._W += self.mu * np.conj(self._X) * (error_spectrum / power)
+        # Gradient constraint: keep each partition a causal block_size-tap filter
+        taps = np.fft.irfft(self._W, axis=1)
+        taps[:, n:] = 0
+        self._W = np.fft.rfft(taps, axis=1).astype(np.complex64)
+        self.adapted_blocks += 1
+        return error
+
+    def stats(self):
+        return {
+            'blocks': self.blocks,
+            'adapted_fraction': self.adapted_blocks / self.blocks if self.blocks else 0.0,
+            'double_talk_fraction': self.double_talk_blocks / self.blocks if self.blocks else 0.0,
+        }
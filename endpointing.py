@@ -0,0 +1,114 @@
+# endpointing.py
+
+import re
+from typing import Optional
+
+# A turn that stops on one of these is probably not finished ("... and", "the")
+CONTINUATION_WORDS = {
+    "and", "but", "or", "so", "because", "then", "if", "when", "while", "which", "that", "who",
+    "the", "a", "an", "to", "of", "in", "on", "at", "for", "with", "from", "about", "my", "your",
+    "is", "are", "was", "um", "uh", "er", "like",
+}
+# "Hey Kaira" as Whisper tends to spell it; the pre-roll puts it at the start of most turns
+WAKE_PHRASE = re.compile(r"^\W*(?:(?:hey|hi|hello|okay|ok)\W+)?(?:kaira+|kyra|kira|keira|kara|kiera)\b[\W]*",
+                         re.IGNORECASE)
+QUESTION_WORDS = {
+    "what", "where", "when", "who", "whom", "whose", "why", "how", "which",
+    "is", "are", "can", "could", "do", "does", "did", "will", "would", "should", "tell", "show",
+}
+
+
+def strip_wake_phrase(text: str) -> str:
+    """Text without a leading "hey kaira" (empty if that was all of it)."""
+    return WAKE_PHRASE.sub("", text.strip(), count=1).strip()
+
+
+def classify_utterance(text: str) -> str:
+    """
+    Rough sentence-completeness guess for a partial transcript:
+    'complete', 'incomplete' or 'unknown'.
+    """
+    text = text.strip().lower()
+    if not text:
+        return "unknown"
+    if text.endswith((",", "...", "…", "-")):
+        return "incomplete"
+    words = re.findall(r"[a-z']+", text)
+    if not words:
+        return "unknown"
+    # Terminal punctuation wins: "Where are you from?" ends on a preposition but is finished
+    if text.endswith(("?", ".", "!")):
+        return "complete"
+    if words[-1] in CONTINUATION_WORDS:
+        return "incomplete"
+    # Unpunctuated but shaped like a whole question ("where is the library")
+    if words[0] in QUESTION_WORDS and len(words) >= 4:
+        return "complete"
+    return "unknown"
+
+
+class EndpointPolicy:
+    """
+    Chooses how much trailing silence ends the user's turn.
+
+    RealtimeSTT ends a recording after `post_speech_silence_duration` of VAD
+    silence. Instead of one fixed value, this looks at the stabilized
+    realtime transcript: once it has stopped changing for `stable_seconds`
+    and reads as a complete sentence or question, a short silence is
+    enough; a transcript that trails off on "and", "the", "um" or a comma
+    gets a longer one; anything else keeps the base value. A leading wake
+    phrase is ignored, so "Hey Kaira." alone is not a finished turn. It
+    also reports when no speech has started within `no_speech_timeout` of
+    the wake word, so the recording can be abandoned instead of idling.
+    Time is passed in by the caller, as with DetectionPolicy.
+    """
+
+    def __init__(self, base_silence: float = 0.5, complete_silence: float = 0.25,
+                 incomplete_silence: float = 1.2, stable_seconds: float = 0.3,
+                 no_speech_timeout: float = 5.0):
+        self.base_silence = base_silence
+        self.complete_silence = complete_silence
+        self.incomplete_silence = incomplete_silence
+        self.stable_seconds = stable_seconds
+        self.no_speech_timeout = no_speech_timeout
+        self.reset(0.0)
+
+    def reset(self, now: float):
+        """Starts a new turn (at the wake word)."""
+        self.turn_start = now
+        self.speech_start: Optional[float] = None
+        self.text = ""
+        self.text_changed = now
+
+    def on_speech_start(self, now: float):
+        if self.speech_start is None:
+            self.speech_start = now
+
+    def on_partial(self, text: str, now: float):
+        # The wake phrase from the pre-roll is neither speech of the turn nor a sentence
+        text = strip_wake_phrase(text)
+        if not text:
+            return
+        if text != self.text:
+            self.text = text
+            self.text_changed = now
+        # A transcript means someone is talking, even if the VAD callback was missed
+        self.on_speech_start(now)
+
+    def classify(self, now: float) -> str:
+        """Completeness of the current partial; 'unknown' until it has been stable long enough."""
+        kind = classify_utterance(self.text)
+        if kind == "complete" and now - self.text_changed < self.stable_seconds:
+            return "unknown"
+        return kind
+
+    def silence_duration(self, now: float) -> float:
+        kind = self.classify(now)
+        if kind == "complete":
+            return self.complete_silence
+        if kind == "incomplete":
+            return self.incomplete_silence
+        return self.base_silence
+
+    def no_speech_expired(self, now: float) -> bool:
+        return self.speech_start is None and now - self.turn_start > self.no_speech_timeout
@@ -0,0 +1,110 @@
+"""
+Offline echo canceller test.
+Runs a microphone recording and the reference (what the speaker played)
+through EchoCanceller block by block, writes the cleaned audio and reports
+echo return loss enhancement (ERLE) while only the echo is present, plus
+how much the near-end talker is distorted when a clean copy is available.
+
+Real recordings:
+  python eval_echo_canceller.py --mic mic.wav --ref playback.wav --out cleaned.wav
+Simulated room (reference speech convolved with a synthetic echo path,
+optionally mixed with near-end speech starting at --near-start seconds):
+  python eval_echo_canceller.py --simulate --ref kaira_answer.wav --near user_question.wav
+
+The reference may be 24 kHz (Gemini output); it is resampled to 16 kHz the
+same way KAIRACore does. Microphone and near-end WAVs must be 16 kHz.
+"""
+
+import argparse
+
+import numpy as np
+
+from audio_io import read_wav, write_wav
+from echo_canceller import EchoCanceller, Resampler
+
+SAMPLE_RATE = 16000
+
+
+def load_reference(path: str) -> np.ndarray:
+    samples, rate = read_wav(path)
+    return Resampler(rate, SAMPLE_RATE).process(samples) / 32768.0
+
+
+def simulate_echo_path(ref: np.ndarray, delay_ms: float, gain: float, seed: int = 0) -> np.ndarray:
+    """Direct path after `delay_ms` plus an exponentially decaying diffuse tail."""
+    rng = np.random.default_rng(seed)
+    delay = int(delay_ms * SAMPLE_RATE / 1000)
+    tail = 1600
+    h = np.zeros(delay + tail)
+    h[delay] = gain
+    h[delay + 1:] = rng.standard_normal(tail - 1) * gain * 0.1 * np.exp(-np.arange(tail - 1) / 400)
+    return np.convolve(ref, h)[:len(ref)]
+
+
+def erle_db(before: np.ndarray, after: np.ndarray) -> float:
+    return 10 * np.log10((np.mean(before ** 2) + 1e-12) / (np.mean(after ** 2) + 1e-12))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ref", required=True, help="Reference (playback) WAV")
+    parser.add_argument("--mic", help="Microphone WAV recorded while the reference played")
+    parser.add_argument("--near", help="Clean near-end speech WAV (mixed in with --simulate)")
+    parser.add_argument("--simulate", action="store_true", help="Build the mic signal from --ref and --near")
+    parser.add_argument("--near-start", type=float, default=2.0, help="Seconds into the reference the near-end starts")
+    parser.add_argument("--delay-ms", type=float, default=60.0, help="Simulated speaker-to-mic delay")
+    parser.add_argument("--echo-gain", type=float, default=0.4, help="Simulated echo path gain")
+    parser.add_argument("--filter-ms", type=float, default=256.0)
+    parser.add_argument("--mu", type=float, default=0.3)
+    parser.add_argument("--out", default="aec_output.wav")
+    args = parser.parse_args()
+
+    ref = load_reference(args.ref)
+    near = np.zeros_like(ref)
+    if args.near:
+        near_samples, rate = read_wav(args.near)
+        if rate != SAMPLE_RATE:
+            parser.error("--near must be 16 kHz")
+        start = int(args.near_start * SAMPLE_RATE)
+        near_samples = near_samples[:max(0, len(ref) - start)] / 32768.0
+        near[start:start + len(near_samples)] = near_samples
+
+    if args.simulate:
+        mic = simulate_echo_path(ref, args.delay_ms, args.echo_gain) + near
+    elif args.mic:
+        mic_samples, rate = read_wav(args.mic)
+        if rate != SAMPLE_RATE:
+            parser.error("--mic must be 16 kHz")
+        mic = mic_samples / 32768.0
+        n = min(len(mic), len(ref))
+        mic, ref, near = mic[:n], ref[:n], near[:n]
+    else:
+        parser.error("give --mic, or --simulate")
+
+    aec = EchoCanceller(filter_length=int(args.filter_ms * SAMPLE_RATE / 1000), mu=args.mu)
+    block = aec.block_size
+    n = len(mic) // block * block
+    out = np.concatenate([aec.process(mic[i:i + block], ref[i:i + block]) for i in range(0, n, block)])
+    mic, ref, near = mic[:n], ref[:n], near[:n]
+    write_wav(args.out, np.clip(out * 32768.0, -32768, 32767), SAMPLE_RATE)
+
+    # Echo-only blocks: reference playing, no near-end speech
+    blocks = np.arange(n // block)
+    ref_active = np.array([np.abs(ref[b * block:(b + 1) * block]).max() > 0.01 for b in blocks])
+    near_active = np.array([np.abs(near[b * block:(b + 1) * block]).max() > 0.01 for b in blocks])
+    echo_only = np.repeat(ref_active & ~near_active, block)
+    converged = np.arange(n) > SAMPLE_RATE  # Skip the first second of adaptation
+
+    print(f"Processed {n / SAMPLE_RATE:.1f} s | {aec.stats()}")
+    if (echo_only & converged).any():
+        print(f"ERLE (echo only, after 1 s): {erle_db(mic[echo_only & converged], out[echo_only & converged]):.1f} dB")
+    if args.near and near_active.any():
+        talk = np.repeat(near_active, block)
+        residual = out[talk] - near[talk]
+        print(f"Near-end SNR in output: {erle_db(near[talk], residual):.1f} dB "
+              f"(input: {erle_db(near[talk], mic[talk] - near[talk]):.1f} dB)")
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Offline wake word evaluation.
+Replays WAV files through the wake word model and the DetectionPolicy used
+by KAIRACore, sweeping the threshold, and reports:
+  - false accepts per hour on background audio (no wake word present)
+  - miss rate on positive clips (one utterance per clip)
+  - detection latency on positives, from the estimated end of the utterance
+
+Scores are computed once per file; the threshold sweep only re-runs the
+(cheap) policy. All WAVs must be 16 kHz 16-bit mono.
+
+Usage:
+  python eval_wakeword.py --positives clips/hey_kaira/*.wav --background lobby_*.wav
+  python eval_wakeword.py --positives ... --background ... --word staup_kairaa \
+      --thresholds 0.1 0.2 0.3 0.5 0.7 --patience 2 --smoothing 3
+"""
+
+import argparse
+
+import numpy as np
+
+from wake_word import (FRAME_SAMPLES, WAKE_WORD_NAME, DetectionPolicy, create_wake_word_model,
+                       read_wav_16k)
+
+FRAME_SECONDS = FRAME_SAMPLES / 16000
+LEAD_IN_SECONDS = 2.0  # Silence before each positive so the feature buffers are warm
+
+
+def score_file(model, audio: np.ndarray, word: str) -> np.ndarray:
+    """Raw per-frame scores for one file, starting from a clean model state."""
+    model.reset()
+    scores = []
+    for start in range(0, len(audio) - FRAME_SAMPLES + 1, FRAME_SAMPLES):
+        scores.append(model.predict(audio[start:start + FRAME_SAMPLES]).get(word, 0.0))
+    return np.array(scores)
+
+
+def speech_end_frame(audio: np.ndarray) -> int:
+    """Index of the last frame whose RMS is within 20 dB of the loudest frame."""
+    n = len(audio) // FRAME_SAMPLES
+    frames = audio[:n * FRAME_SAMPLES].astype(np.float32).reshape(n, FRAME_SAMPLES)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    loud = np.nonzero(rms >= rms.max() * 0.1)[0]
+    return int(loud[-1]) if len(loud) else n - 1
+
+
+def detections(scores: np.ndarray, args, threshold: float):
+    policy = DetectionPolicy(threshold=threshold, smoothing_frames=args.smoothing,
+                             patience_frames=args.patience, refractory_seconds=args.refractory)
+    return [i for i, score in enumerate(scores) if policy.update(score, i * FRAME_SECONDS)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--positives", nargs="*", default=[], help="Clips containing one wake word each")
+    parser.add_argument("--background", nargs="*", default=[], help="Long recordings without the wake word")
+    parser.add_argument("--word", default=WAKE_WORD_NAME)
+    parser.add_argument("--framework", default="onnx", choices=["onnx", "tflite"])
+    parser.add_argument("--thresholds", nargs="+", type=float,
+                        default=[0.01, 0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9])
+    parser.add_argument("--smoothing", type=int, default=3, help="Moving-average window in frames")
+    parser.add_argument("--patience", type=int, default=2, help="Consecutive frames above threshold")
+    parser.add_argument("--refractory", type=float, default=2.0, help="Seconds between detections")
+    args = parser.parse_args()
+    if not args.positives and not args.background:
+        parser.error("give --positives and/or --background WAV files")
+
+    model = create_wake_word_model(args.framework)
+    lead_in = np.zeros(int(LEAD_IN_SECONDS * 16000), dtype=np.int16)
+    lead_in_frames = len(lead_in) // FRAME_SAMPLES
+
+    positives = []
+    for path in args.positives:
+        audio = read_wav_16k(path)
+        # Detections before the clip starts (lead-in) do not count
+        positives.append((score_file(model, np.concatenate((lead_in, audio)), args.word),
+                          lead_in_frames + speech_end_frame(audio)))
+
+    background_scores = [score_file(model, read_wav_16k(path), args.word) for path in args.background]
+    background_hours = sum(len(s) for s in background_scores) * FRAME_SECONDS / 3600
+
+    print(f"Word: {args.word} | positives: {len(positives)} | background: {background_hours:.2f} h | "
+          f"smoothing={args.smoothing} patience={args.patience} refractory={args.refractory}s\n")
+    print(f"{'threshold':>10}{'FA':>6}{'FA/hour':>10}{'misses':>8}{'miss %':>8}{'lat p50 ms':>12}{'lat p90 ms':>12}")
+    for threshold in args.thresholds:
+        false_accepts = sum(len(detections(scores, args, threshold)) for scores in background_scores)
+        misses, latencies = 0, []
+        for scores, end_frame in positives:
+            hits = [i for i in detections(scores, args, threshold) if i >= lead_in_frames]
+            if hits:
+                latencies.append((hits[0] - end_frame) * FRAME_SECONDS * 1000)
+            else:
+                misses += 1
+
+        fa_per_hour = false_accepts / background_hours if background_hours else float("nan")
+        miss_rate = misses / len(positives) * 100 if positives else float("nan")
+        p50, p90 = (np.percentile(latencies, 50), np.percentile(latencies, 90)) if latencies else (np.nan, np.nan)
+        print(f"{threshold:>10.2f}{false_accepts:>6}{fa_per_hour:>10.2f}{misses:>8}{miss_rate:>8.1f}"
+              f"{p50:>12.0f}{p90:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
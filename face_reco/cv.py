@@ -1,10 +1,14 @@
 import cv2
 import zmq
 import numpy as np
-import json
+import os
+import sys
 import time
 import threading
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from kaira_messages import TOPIC_CURRENT_IDENTITY, decode_frame_message, encode_identity
+
 try:
     from facereco import process_identity_from_frame
     FACE_RECO_LOADED = True
@@ -72,13 +76,10 @@ def identity_worker():
             # --- NEW: PUBLISH THE CURRENT_KNOWN IDENTITY ---
             if identity_publisher and current_known != last_published_identity:
                 try:
-                    message = json.dumps({
-                        "identity": current_known,
-                        "timestamp": time.time()
-                    }).encode('utf-8')
+                    message = encode_identity(current_known)
                     
-                    # Publish the topic and the JSON message
-                    identity_publisher.send_multipart([b"current_identity", message])
+                    # Publish the topic and the encoded message
+                    identity_publisher.send_multipart([TOPIC_CURRENT_IDENTITY, message])
                     last_published_identity = current_known
                     print(f"Published identity: {current_known}")
                 except Exception as e:
@@ -118,11 +119,11 @@ def main():
     try:
         while True:
             # Receive Frame
-            topic, meta_json, img_bytes = frame_socket.recv_multipart()
+            parts = frame_socket.recv_multipart(copy=False)
             recv_time = time.time()
             
-            meta = json.loads(meta_json.decode())
-            frame = np.frombuffer(img_bytes, dtype=meta['dtype']).reshape(meta['shape']).copy()
+            topic, frame, meta = decode_frame_message(parts)
+            frame = frame.copy()
             
             # Latency calculation
             send_time = meta['send_time']
@@ -4,24 +4,31 @@ Receives camera frames and publishes identity information
 """
 
 import zmq
-import json
 import numpy as np
 import time
 import cv2
+from kaira_messages import (
+    TOPIC_CURRENT_IDENTITY,
+    TOPIC_PRESENCE,
+    decode_frame_message,
+    encode_identity,
+    encode_presence,
+)
 
 # ✅ WINDOWS COMPATIBLE: TCP sockets
 CAMERA_STREAM_URL = "tcp://127.0.0.1:5555"
-IDENTITY_PUB_URL = "tcp://127.0.0.1:5558"
+IDENTITY_PUB_URL = "tcp://127.0.0.1:5559"  # State broker frontend (see state_broker.py)
+PRESENCE_HEARTBEAT_SECONDS = 2.0  # Presence and identity are re-sent this often so consumers can tell we are alive
 
 # Import your face recognition function
 try:
-    from identity_processing import process_identity_from_frame
+    from identity_processing import process_frame
     print("✅ Loaded identity_processing module")
 except ImportError:
     print("⚠️  identity_processing.py not found, using mock recognition")
-    def process_identity_from_frame(frame):
-        """Mock function for testing"""
-        return "Unknown"
+    def process_frame(frame):
+        """Mock function for testing (always reports someone present)"""
+        return "Unknown", 1
 
 def main():
     print("=" * 60)
@@ -38,10 +45,10 @@ def main():
     camera_sub.subscribe(b"camera_0")
     print(f"📹 Subscribed to camera stream: {CAMERA_STREAM_URL}")
     
-    # Publish identity
+    # Publish identity through the state broker, which caches the last value
     identity_pub = context.socket(zmq.PUB)
-    identity_pub.bind(IDENTITY_PUB_URL)
-    print(f"📡 Publishing identity to: {IDENTITY_PUB_URL}")
+    identity_pub.connect(IDENTITY_PUB_URL)
+    print(f"📡 Publishing identity to state broker: {IDENTITY_PUB_URL}")
     
     print()
     print("🎬 Starting face recognition loop...")
@@ -50,45 +57,56 @@ def main():
     print()
     
     last_identity = "Unknown"
+    last_face_count = 0
+    last_face_time = 0.0
+    last_presence_sent = 0.0
+    last_identity_sent = 0.0
     frame_count = 0
     last_log_time = time.time()
     
     try:
         while True:
             # Receive frame from camera stream
-            topic, meta_json, frame_data = camera_sub.recv_multipart()
-            meta = json.loads(meta_json.decode())
+            parts = camera_sub.recv_multipart(copy=False)
             
-            # Reconstruct frame
-            frame = np.frombuffer(frame_data, dtype=meta['dtype'])
-            frame = frame.reshape(meta['shape'])
+            # Reconstruct frame (zero-copy view over the received buffer)
+            topic, frame, meta = decode_frame_message(parts)
             
             frame_count += 1
             
             # Process face recognition (every 10 frames to reduce load)
             if frame_count % 10 == 0:
-                identity = process_identity_from_frame(frame)
+                identity, face_count = process_frame(frame)
+                now = time.time()
+                if face_count:
+                    last_face_time = now
                 
-                # Only publish if identity changed
-                if identity != last_identity:
-                    print(f"👤 Identity changed: {last_identity} → {identity}")
+                # Publish presence on change, and as a heartbeat
+                if (face_count > 0) != (last_face_count > 0) or now - last_presence_sent > PRESENCE_HEARTBEAT_SECONDS:
+                    identity_pub.send_multipart([
+                        TOPIC_PRESENCE,
+                        encode_presence(face_count, last_face_time, timestamp=now)
+                    ])
+                    last_presence_sent = now
+                last_face_count = face_count
+                
+                # Publish identity on change, and as a heartbeat so the last-value
+                # cache recovers if a change message was lost
+                if identity != last_identity or now - last_identity_sent > PRESENCE_HEARTBEAT_SECONDS:
+                    if identity != last_identity:
+                        print(f"👤 Identity changed: {last_identity} → {identity}")
                     last_identity = identity
                     
                     # Publish identity update
-                    identity_data = {
-                        "identity": identity,
-                        "emotion": "Neutral",  # Add emotion detection if available
-                        "timestamp": time.time()
-                    }
-                    
                     identity_pub.send_multipart([
-                        b"current_identity",
-                        json.dumps(identity_data).encode()
+                        TOPIC_CURRENT_IDENTITY,
+                        encode_identity(identity, emotion="Neutral")  # Add emotion detection if available
                     ])
+                    last_identity_sent = now
             
             # Log status every 5 seconds
             if time.time() - last_log_time > 5:
-                print(f"✅ Processed {frame_count} frames | Current: {last_identity}")
+                print(f"✅ Processed {frame_count} frames | Current: {last_identity} | Faces: {last_face_count}")
                 last_log_time = time.time()
                 
     except KeyboardInterrupt:
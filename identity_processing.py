@@ -125,16 +125,17 @@ def preload_known_faces():
 known_faces = preload_known_faces()
 
 
-def process_identity_from_frame(frame):
-    """Recognize identity from frame using preloaded models and faces."""
+def process_frame(frame):
+    """Detects faces and recognizes them. Returns (identity, number of faces detected)."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    faces = face_detector(gray, 1)
+
     if face_encoder is None or shape_predictor is None:
-        return "Unknown"
+        return "Unknown", len(faces)
     
     if len(known_faces) == 0:
-        return "Unknown"
+        return "Unknown", len(faces)
     
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    faces = face_detector(gray, 1)
     identified_person = "Unknown"
 
     for face in faces:
@@ -152,7 +153,12 @@ def process_identity_from_frame(frame):
 
         identified_person = identity
 
-    return identified_person
+    return identified_person, len(faces)
+
+
+def process_identity_from_frame(frame):
+    """Recognize identity from frame using preloaded models and faces."""
+    return process_frame(frame)[0]
 
 
 # Test on import
@@ -4,12 +4,23 @@ import threading
 import time
 import logging
 import zmq
-import json
-import queue
 import os
-from openwakeword.model import Model
+from functools import partial
 from stt_processor import STTProcessor
 from webrtc_client import WebRTCClient 
+from voice_trace import TraceRecorder, new_trace_id
+from audio_ring import AudioRingBuffer
+from audio_gate import EnergyGate
+from audio_playback import JitterBuffer, PlaybackEnvelope
+from state_store import StateStore
+from echo_canceller import EchoCanceller, Resampler
+from endpointing import EndpointPolicy, strip_wake_phrase
+from turn_state import FOLLOW_UP, LISTENING, SPEAKING, THINKING, WAITING, TurnStateMachine
+from wake_word import WAKE_WORD_NAME, STOP_WORD_NAME, DetectionPolicy, create_wake_word_model
+from kaira_messages import (
+    TOPIC_AI_TRANSCRIPTION, TOPIC_CURRENT_IDENTITY, TOPIC_KAIRA_STATE, TOPIC_PRESENCE,
+    decode_identity, decode_presence, decode_transcription, encode_kaira_state, encode_prompt
+)
 
 # --- Setup Logger ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -18,22 +29,33 @@ logger = logging.getLogger(__name__)
 # --- ZMQ URLs ---
 AI_PROMPT_PUSH_URL = "tcp://127.0.0.1:5557"
 AI_TRANSCRIPTION_SUB_URL = "tcp://127.0.0.1:5556"
+STATE_PUB_URL = "tcp://127.0.0.1:5559"  # State broker frontend (last-value cache)
+STATE_SUB_URL = "tcp://127.0.0.1:5558"  # State broker backend (presence / identity)
 
 class KAIRACore:
-    def __init__(self):
+    def __init__(self, wake_word_framework=None, wake_word_threads=None, presence_idle_seconds=None,
+                 full_duplex=None, no_speech_timeout=None, stt_service_url=None, follow_up_seconds=None,
+                 wake_threshold=None, stop_threshold=None):
         # --- State ---
-        self.state = {
+        # Immutable, versioned snapshots: writers publish new versions, readers
+        # (UI, ZMQ publisher) read the current one without locking.
+        self.state = StateStore({
             'display_text': "",
             'kaira_response_text': "",
-            'normalized_amplitude': 0.0,
             'is_final_sentence': False,
             'is_kaira_speaking': False,
             'last_sentence_time': 0,
-            'listening_state': 'WAITING',
-        }
-        self.state_lock = threading.Lock()
+            'listening_state': WAITING,
+        })
+        # WAITING -> LISTENING -> THINKING -> SPEAKING -> FOLLOW_UP/WAITING
+        self.turn_state = TurnStateMachine(self.state)
+        self.recording_lock = threading.Lock()  # Makes the start_recording check-and-set atomic
         self.ai_response_timeout = 3.0  # 3 seconds
         self.ai_response_start_time = 0
+
+        # --- Voice turn tracing ---
+        self.tracer = TraceRecorder("kaira_core")
+        self.current_trace_id = None
         
         # --- Audio Settings ---
         self.chunk = 2048
@@ -44,65 +66,255 @@ class KAIRACore:
         self.p_audio = pyaudio.PyAudio()
         self.input_stream = None
 
+        # --- Audio Fan-out ---
+        # The input callback only writes into this ring; each consumer thread
+        # reads from it at its own pace.
+        self.ring_seconds = 10
+        self.audio_ring = AudioRingBuffer(self.sample_rate * self.ring_seconds, self.sample_rate)
+
+        # --- Full duplex (barge-in) ---
+        # An echo canceller removes KAIRA's own voice (the playback signal,
+        # resampled to 16 kHz) from the mic and writes the result to a second
+        # ring at the same sample positions; detection and STT read that ring.
+        if full_duplex is None:
+            full_duplex = os.getenv("KAIRA_FULL_DUPLEX", "0") == "1"
+        self.full_duplex = full_duplex
+        if self.full_duplex:
+            self.reference_ring = AudioRingBuffer(self.sample_rate * self.ring_seconds, self.sample_rate)
+            self.clean_ring = AudioRingBuffer(self.sample_rate * self.ring_seconds, self.sample_rate)
+            self.aec_reader = self.audio_ring.reader("echo_canceller")
+            self.echo_canceller = EchoCanceller(block_size=256, filter_length=4096)
+            self.reference_offset = None  # Smoothed reference-ring minus mic-ring position
+            self.detect_ring = self.clean_ring
+        else:
+            self.detect_ring = self.audio_ring
+        self.wake_word_reader = self.detect_ring.reader("wake_word")
+        self.stt_reader = self.detect_ring.reader("stt")
+        self.level_reader = self.audio_ring.reader("level")
+        self.stt_start_position = None  # Ring position the next recording starts from
+        self.wake_word_frame = 1280  # 80 ms, openwakeword's native frame size
+        self.preroll_seconds = 1.0   # Audio before detection that is flushed into STT
+        self.clip_rms_threshold = 0.02  # Speech already present at the first fed sample => clipped
+        self.wake_metrics = {
+            'detections': 0,
+            'detection_latency_ms': 0.0,
+            'mean_detection_latency_ms': 0.0,
+            'recordings': 0,
+            'clipped_recordings': 0,
+        }
+        self.input_overflows = 0
+        self.input_level = 0.0
+        self.consumer_threads = []
+
         # --- Wake Word Detection ---
-        self.wake_word_threshold = 0.01  # Lowered from 3.5
-        self.wake_word_model_path = os.path.join(os.path.dirname(__file__), "hey_kairaa.onnx")
-        logger.info(f"Initializing wake word detector with model: {self.wake_word_model_path}")
-        self.wake_word_detector = Model(wakeword_models=[self.wake_word_model_path], inference_framework='onnx')
+        # Detection uses smoothed scores held for a few frames, then a refractory
+        # period. The default thresholds are untuned starting points: measure
+        # miss rate / false accepts per hour on this kiosk's recordings with
+        # eval_wakeword.py and set KAIRA_WAKE_THRESHOLD / KAIRA_STOP_THRESHOLD.
+        if wake_threshold is None:
+            wake_threshold = float(os.getenv("KAIRA_WAKE_THRESHOLD", "0.3"))
+        if stop_threshold is None:
+            stop_threshold = float(os.getenv("KAIRA_STOP_THRESHOLD", "0.5"))
+        self.wake_word_policy = DetectionPolicy(threshold=wake_threshold, smoothing_frames=3, patience_frames=2,
+                                                refractory_seconds=2.0)
+        self.stop_word_policy = DetectionPolicy(threshold=stop_threshold, smoothing_frames=2, patience_frames=1,
+                                                refractory_seconds=1.0)
+        # Backend ('onnx' or 'tflite') and feature-model threads; run bench_wakeword.py to pick
+        self.wake_word_framework = wake_word_framework or os.getenv("KAIRA_WAKE_WORD_FRAMEWORK", "onnx")
+        if wake_word_threads is None:
+            wake_word_threads = int(os.getenv("KAIRA_WAKE_WORD_THREADS", "1"))
+        self.wake_word_threads = wake_word_threads
+        self.wake_word_name = WAKE_WORD_NAME
+        self.stop_word_name = STOP_WORD_NAME
+        # One Model so both words share the melspectrogram and embedding features
+        self.wake_word_detector = create_wake_word_model(self.wake_word_framework, ncpu=self.wake_word_threads)
         logger.info("Wake word detector initialized successfully")
 
+        # --- Energy/VAD pre-gate (skips model inference on silence) ---
+        self.wake_gate_enabled = True
+        self.wake_gate = EnergyGate(sample_rate=self.sample_rate, use_webrtc_vad=False)
+        self.gate_warmup_seconds = 1.5  # Audio replayed into the model's feature buffer on gate open
+        self.gate_was_open = False
+        self.inference_frames = 0
+        self.inference_time = 0.0
+
+        # --- Presence-gated low-power mode ---
+        # With nobody in front of the camera, the model only runs behind a
+        # stricter VAD-confirmed gate and the level meter slows down.
+        if presence_idle_seconds is None:
+            presence_idle_seconds = float(os.getenv("KAIRA_PRESENCE_IDLE_SECONDS", "60"))
+        self.presence_idle_seconds = presence_idle_seconds
+        self.presence_stale_seconds = 10.0  # No presence messages for this long => assume the camera is down
+        self.last_face_time = time.time()   # Start at full rate
+        self.last_presence_message_time = 0.0
+        self.low_power = False
+        self.idle_gate = EnergyGate(sample_rate=self.sample_rate, open_ratio=4.0, min_open_rms=0.008,
+                                    hangover_frames=12, use_webrtc_vad=True)
+        self.power_mode_changes = 0
+
+        # --- Greetings ---
+        # A known face that says the wake word and then pauses is greeted
+        # (liveapi replays the cached greeting, or sends an empty answer if it
+        # has none) and the question goes into the follow-up window. At most
+        # once per cooldown; never while anything else is being said.
+        self.current_identity = "Unknown"
+        self.greet_on_wake = os.getenv("KAIRA_GREET_ON_WAKE", "1") == "1"
+        self.greeting_pause_seconds = 1.5
+        self.greeting_cooldown_seconds = 300.0
+        self.last_greeted = {}
+
         # --- STT Processor ---
-        self.stt_processor = STTProcessor(
+        # Local RealtimeSTT by default; with a service URL, a thin client that
+        # transcribes on the shared stt_service.py (same callbacks)
+        self.stt_service_url = stt_service_url or os.getenv("KAIRA_STT_SERVICE_URL")
+        stt_class = STTProcessor
+        if self.stt_service_url:
+            from stt_client import RemoteSTTProcessor
+            stt_class = partial(RemoteSTTProcessor, service_url=self.stt_service_url)
+        self.stt_processor = stt_class(
             on_realtime_text=self._on_stt_realtime,
-            on_full_sentence_text=self._on_stt_full_sentence
+            on_full_sentence_text=self._on_stt_full_sentence,
         )
-        
+
+        # --- Adaptive endpointing ---
+        # The end-of-turn silence follows the realtime transcript (short for a
+        # finished question, long after a trailing "and..."); a recording with
+        # no speech at all is dropped after no_speech_timeout.
+        if no_speech_timeout is None:
+            no_speech_timeout = float(os.getenv("KAIRA_NO_SPEECH_TIMEOUT", "5.0"))
+        self.endpoint_policy = EndpointPolicy(
+            base_silence=STTProcessor.recorder_config['post_speech_silence_duration'],
+            no_speech_timeout=no_speech_timeout,
+        )
+        self.endpoint_silence = None  # Value last handed to the recorder
+        # Speech start comes from a VAD gate over the audio after the detection
+        # point: the recorder's own VAD fires on the wake phrase in the pre-roll
+        self.speech_gate = EnergyGate(sample_rate=self.sample_rate, hangover_frames=0, use_webrtc_vad=True)
+        self.speech_gate_min_chunks = 2  # Consecutive voiced reads before speech counts as started
+        self.speech_gate_chunks = 0
+        self.speech_search_position = None  # Ring position the turn's own speech can start from
+        self.endpoint_metrics = {
+            'turns': 0,
+            'early_finals': 0,      # Ended on the short silence
+            'extended_finals': 0,   # Ended on the long silence
+            'no_speech_timeouts': 0,
+        }
+
+        # --- Follow-up window ---
+        # Once an answer has finished playing, speech confirmed by a VAD gate
+        # starts the next turn without the wake word for follow_up_seconds
+        # (0 disables); then it's back to wake-word mode.
+        if follow_up_seconds is None:
+            follow_up_seconds = float(os.getenv("KAIRA_FOLLOW_UP_SECONDS", "8.0"))
+        self.follow_up_seconds = follow_up_seconds
+        self.follow_up_settle_seconds = 0.3  # Playback must be drained this long (echo tail) before opening
+        self.follow_up_min_speech_frames = 2  # Consecutive 80 ms gate frames before a turn starts
+        self.follow_up_gate = EnergyGate(sample_rate=self.sample_rate, open_ratio=4.0, min_open_rms=0.008,
+                                         hangover_frames=0, use_webrtc_vad=True)
+        self.follow_up_speech_frames = 0
+        self.follow_up_start_position = 0  # Ring position at opening; pre-roll never reaches before it
+        self.playback_drained_at = None
+        self.follow_up_turn = False  # The current recording was started by the follow-up window
+        self.follow_up_metrics = {
+            'windows': 0,
+            'turns': 0,              # Speech in the window started a turn
+            'timeouts': 0,           # Window closed without speech
+            'false_starts': 0,       # Gate fired but STT heard no speech
+            'mean_speech_delay_ms': 0.0,  # Window opening -> speech
+        }
+
         # --- ZMQ Sockets ---
         logger.info("Initializing ZMQ sockets...")
         self.zmq_context = zmq.Context()
         self.prompt_pusher = self.zmq_context.socket(zmq.PUSH)
         self.prompt_pusher.connect(AI_PROMPT_PUSH_URL)
+        self.prompt_push_lock = threading.Lock()  # Prompts and cancels come from different threads
         self.transcription_sub = self.zmq_context.socket(zmq.SUB)
         self.transcription_sub.connect(AI_TRANSCRIPTION_SUB_URL)
-        self.transcription_sub.subscribe(b"ai_transcription")
+        self.transcription_sub.subscribe(TOPIC_AI_TRANSCRIPTION)
+        self.state_pub = self.zmq_context.socket(zmq.PUB)
+        self.state_pub.connect(STATE_PUB_URL)
+        self.last_published_state = None
         
         self.transcription_thread = threading.Thread(
             target=self._transcription_subscriber_worker, 
             daemon=True
         )
+        self.presence_thread = threading.Thread(target=self._presence_worker, daemon=True)
+        self.state_publisher_thread = threading.Thread(target=self._state_publisher_worker, daemon=True)
         
         # --- Audio Playback & WebRTC ---
-        self.audio_playback_queue = queue.Queue()
+        # Response audio goes through a jitter buffer that the output callback
+        # pulls fixed 20 ms frames from; a flush drops queued audio instantly.
+        self.playback_rate = 24000
+        self.playback_frame = 480  # 20 ms at 24 kHz
+        self.cancelled_trace_ids = set()
+        self.playback_buffer = JitterBuffer(sample_rate=self.playback_rate, on_marker=self._on_playback_marker)
+        self.playback_underflows = 0
+        # RMS/peak of what the speaker is playing, for the mouth animation (read without locks)
+        self.playback_envelope = PlaybackEnvelope()
+        if self.full_duplex:
+            self.reference_resampler = Resampler(self.playback_rate, self.sample_rate)
         self.playback_stream = None
+        self.playback_latency = 0.0  # Fallback when the callback gets no DAC timestamp
         self.audio_playback_thread = threading.Thread(
             target=self._audio_playback_worker,
             daemon=True
         )
-        self.webrtc_client = WebRTCClient(self.audio_playback_queue)
+        self.webrtc_client = WebRTCClient(self.playback_buffer)
         
         print("KAIRA Core initialized.")
 
+    def _on_playback_marker(self, marker):
+        """("trace", trace_id, received_time) from the WebRTC client; returns False to mute that response."""
+        _, trace_id, received_time = marker
+        self.tracer.mark(trace_id, "audio_received", received_time)
+        return trace_id not in self.cancelled_trace_ids
+
+    def _playback_callback(self, in_data, frame_count, time_info, status):
+        """PortAudio output callback: pulls one fixed-size frame from the jitter buffer."""
+        if status & pyaudio.paOutputUnderflow:
+            self.playback_underflows += 1
+        frame = self.playback_buffer.read(frame_count)
+        samples = np.frombuffer(frame, dtype=np.int16)
+        # Stamp the frame with when it will leave the speaker, not when it was queued
+        latency = time_info.get('output_buffer_dac_time', 0.0) - time_info.get('current_time', 0.0)
+        if not 0.0 <= latency < 1.0:
+            latency = self.playback_latency
+        self.playback_envelope.write(samples, time.monotonic() + latency)
+        if self.full_duplex:
+            reference = self.reference_resampler.process(samples)
+            self.reference_ring.write(np.clip(reference, -32768, 32767).astype(np.int16))
+        return (frame, pyaudio.paContinue)
+
     def _audio_playback_worker(self):
-        """Runs in a thread, initializes speaker output, and plays audio."""
+        """Opens callback-mode speaker output and records when each response starts playing."""
         logger.info("Audio playback worker started.")
         self.playback_stream = self.p_audio.open(
             format=pyaudio.paInt16, 
             channels=1, 
-            rate=24000, 
-            output=True
+            rate=self.playback_rate, 
+            output=True,
+            frames_per_buffer=self.playback_frame,
+            stream_callback=self._playback_callback
         )
+        self.playback_latency = self.playback_stream.get_output_latency()
+        self.playback_stream.start_stream()
+        last_log_time = time.time()
         while self.is_listening:
             try:
-                chunk = self.audio_playback_queue.get(timeout=1.0)
-                if chunk is None:
-                    break
-                if self.playback_stream:
-                    self.playback_stream.write(chunk)
-            except queue.Empty:
-                continue
+                for (_, trace_id, _), started in self.playback_buffer.pop_started_markers():
+                    if trace_id:
+                        self.tracer.mark(trace_id, "playback_start", started)
+                        self._maybe_finish_trace(trace_id)
+                self._update_follow_up()
+                if time.time() - last_log_time > 30:
+                    logger.debug(f"Playback metrics: {self.get_playback_metrics()}")
+                    last_log_time = time.time()
             except Exception as e:
                 if self.is_listening:
                     logger.error(f"Audio playback error: {e}")
+            time.sleep(0.02)
         
         logger.info("Audio playback worker stopping...")
         if self.playback_stream:
@@ -110,25 +322,39 @@ class KAIRACore:
             self.playback_stream.close()
         logger.info("Audio playback worker stopped.")
 
+    def get_playback_metrics(self):
+        metrics = self.playback_buffer.stats()
+        metrics['output_underflows'] = self.playback_underflows
+        return metrics
+
     def _transcription_subscriber_worker(self):
         """Listens for AI text and updates the state."""
         logger.info(f"Listening for AI transcriptions on {AI_TRANSCRIPTION_SUB_URL}")
         while self.is_listening:
             try:
                 topic, payload = self.transcription_sub.recv_multipart()
-                data = json.loads(payload.decode())
+                data = decode_transcription(payload)
+                trace_id = data.get('trace_id')
+                if trace_id and trace_id in self.cancelled_trace_ids:
+                    continue
                 
-                with self.state_lock:
-                    if data['type'] == 'chunk':
-                        text_chunk = data['text']
-                        if not self.state['is_kaira_speaking']:
-                            self.state['is_kaira_speaking'] = True
-                            self.state['display_text'] = ""
-                            self.state['is_final_sentence'] = False
-                        self.state['kaira_response_text'] += text_chunk
-                    elif data['type'] == 'final':
-                        self.state['is_kaira_speaking'] = False
-                        self.state['last_sentence_time'] = time.time()
+                if data['type'] == 'chunk':
+                    self.tracer.mark(trace_id, "first_transcription")
+                    text_chunk = data['text']
+                    # The first chunk of an answer clears the user's caption
+                    self.state.modify(lambda state: {
+                        'is_kaira_speaking': True,
+                        'display_text': state['display_text'] if state['is_kaira_speaking'] else "",
+                        'is_final_sentence': state['is_final_sentence'] and state['is_kaira_speaking'],
+                        'kaira_response_text': state['kaira_response_text'] + text_chunk,
+                    })
+                    self.turn_state.transition(SPEAKING, "answer", expected=(THINKING,))
+                elif data['type'] == 'final':
+                    # Stays SPEAKING until playback drains (_update_follow_up)
+                    self.turn_state.transition(SPEAKING, "answer", expected=(THINKING,))
+                    self.state.update(is_kaira_speaking=False, last_sentence_time=time.time())
+                    self.tracer.mark(trace_id, "response_final")
+                self._maybe_finish_trace(trace_id)
             except zmq.ZMQError as e:
                 if not self.is_listening:
                     break 
@@ -159,40 +385,400 @@ class KAIRACore:
             logger.error(f"Error starting audio input stream: {e}")
 
     def audio_input_callback(self, in_data, frame_count, time_info, status):
-        """Audio input callback to process wake word detection and feed STT"""
+        """Audio input callback: only copies the block into the ring buffer."""
+        if status & pyaudio.paInputOverflow:
+            self.input_overflows += 1
+        self.audio_ring.write(np.frombuffer(in_data, dtype=np.int16))
+        return (None, pyaudio.paContinue)
+
+    # --- Audio Consumers ---
+    def _wake_word_worker(self):
+        """Reads the ring and runs wake word ('hey kaira') and stop word ('stop kaira') detection."""
+        logger.info("Wake word consumer started.")
+        while self.is_listening:
+            # Re-chunk the input blocks into frames aligned with the model
+            audio_array = self.wake_word_reader.read_blocking(self.wake_word_frame, timeout=0.5)
+            if audio_array is None:
+                continue
+            frame_end = self.wake_word_reader.position
+            try:
+                if self.state['listening_state'] == FOLLOW_UP and self._follow_up_speech(audio_array):
+                    self._start_follow_up_turn(frame_end)
+                    continue
+                prediction = self._gated_predict(audio_array, frame_end)
+                if prediction is None:
+                    continue
+
+                wake_score = prediction.get(self.wake_word_name, 0.0)
+                stop_score = prediction.get(self.stop_word_name, 0.0)
+                # Debug logging
+                if max(wake_score, stop_score) > 0.1:
+                    logger.debug(f"Wake word score: {wake_score:.3f} | Stop word score: {stop_score:.3f}")
+
+                now = frame_end / self.sample_rate
+                stop_detected = self.stop_word_policy.update(stop_score, now)
+                wake_detected = self.wake_word_policy.update(wake_score, now)
+
+                # Answer audio can still be playing after its 'final' cleared is_kaira_speaking
+                answering = self.state['is_kaira_speaking'] or self.playback_buffer.depth_ms() > 0
+                if stop_detected and (self.is_recording or answering):
+                    logger.info(f"Stop word detected! Smoothed score: {self.stop_word_policy.smoothed:.2f}")
+                    self.handle_stop_command()
+                elif stop_detected and self.state['listening_state'] == FOLLOW_UP:
+                    logger.info("Stop word detected; closing the follow-up window.")
+                    self.turn_state.transition(WAITING, "stop_word", expected=(FOLLOW_UP,))
+                elif wake_detected and not self.is_recording:
+                    logger.info(f"Wake word detected! Smoothed score: {self.wake_word_policy.smoothed:.2f}")
+                    if self.full_duplex and answering:
+                        logger.info("Barge-in: dropping the current answer.")
+                        self._cancel_response(self.current_trace_id)
+                    self._record_detection_latency(frame_end)
+                    # Recording starts with the pre-roll window before detection
+                    self.stt_start_position = frame_end - int(self.preroll_seconds * self.sample_rate)
+                    self.speech_search_position = frame_end
+                    self.start_recording(reason="wake_word")
+            except Exception as e:
+                logger.error(f"Wake word consumer error: {e}")
+        logger.info("Wake word consumer stopped.")
+
+    def _echo_cancel_worker(self):
+        """Removes KAIRA's own voice from the mic signal and writes the result to the clean ring."""
+        logger.info("Echo canceller consumer started.")
+        block = self.echo_canceller.block_size
+        while self.is_listening:
+            mic = self.aec_reader.read_blocking(block, timeout=0.5)
+            if mic is None:
+                continue
+            block_end = self.aec_reader.position
+            try:
+                # Keep clean ring positions identical to mic positions, even after an overrun
+                gap = block_end - block - self.clean_ring.write_pos
+                if gap > 0:
+                    self.clean_ring.write(np.zeros(gap, dtype=np.int16))
+                reference = self._reference_for(block_end, block)
+                cleaned = self.echo_canceller.process(mic / 32768.0, reference / 32768.0)
+                self.clean_ring.write(np.clip(cleaned * 32768.0, -32768, 32767).astype(np.int16))
+            except Exception as e:
+                logger.error(f"Echo canceller error: {e}")
+                self.clean_ring.write(mic)
+        logger.info("Echo canceller consumer stopped.")
+
+    def _reference_for(self, block_end, n):
+        """
+        Reference samples played at the time the mic block was captured.
+        Both rings are mapped to wall-clock time through their last write;
+        the offset is smoothed so callback jitter does not move the
+        reference around, while slow clock drift is still followed.
+        """
+        ref_ring = self.reference_ring
+        if ref_ring.write_pos == 0:
+            return np.zeros(n, dtype=np.int16)
+        mic_time = self.audio_ring.last_write_time - (self.audio_ring.write_pos - block_end) / self.sample_rate
+        ref_end = ref_ring.write_pos - (ref_ring.last_write_time - mic_time) * self.sample_rate
+        offset = ref_end - block_end
+        if self.reference_offset is None:
+            self.reference_offset = offset
+        else:
+            self.reference_offset += 0.01 * (offset - self.reference_offset)
+        end = min(int(round(block_end + self.reference_offset)), ref_ring.write_pos)
+        reference = ref_ring.recent(end, n)
+        if len(reference) < n:
+            reference = np.concatenate((np.zeros(n - len(reference), dtype=np.int16), reference))
+        return reference
+
+    def _stt_feed_worker(self):
+        """Feeds audio from the ring to the STT processor while recording."""
+        logger.info("STT feed consumer started.")
+        while self.is_listening:
+            if not self.is_recording:
+                self.stt_reader.skip_to_end()
+                time.sleep(0.01)
+                continue
+            self._update_endpointing()
+            first_read = False
+            if self.stt_start_position is not None:
+                self.stt_reader.seek(self.stt_start_position)
+                self.stt_start_position = None
+                first_read = True
+            samples = self.stt_reader.read()
+            if samples is None:
+                time.sleep(0.01)
+                continue
+            if first_read:
+                self._check_clipped(samples)
+            if self.endpoint_policy.speech_start is None:
+                self._detect_speech_start(samples, self.stt_reader.position - len(samples))
+            self.stt_processor.feed_audio(samples.tobytes())
+        logger.info("STT feed consumer stopped.")
+
+    def _gated_predict(self, audio_array, frame_end):
+        """
+        Runs the wake word model only while the energy gate is open. When the
+        gate opens, the model's feature buffers are reset and refilled with
+        the recent audio from the ring so they match a continuous stream.
+        """
+        gate = self.idle_gate if self.low_power else (self.wake_gate if self.wake_gate_enabled else None)
+        if gate is not None:
+            is_open = gate.process(audio_array)
+            just_opened = is_open and not self.gate_was_open
+            self.gate_was_open = is_open
+            if not is_open:
+                return None
+            if just_opened:
+                self._warm_up_wake_word_model(frame_end - len(audio_array))
+
+        start = time.perf_counter()
+        prediction = self.wake_word_detector.predict(audio_array)
+        self.inference_time += time.perf_counter() - start
+        self.inference_frames += 1
+        return prediction
+
+    def _presence_worker(self):
+        """Follows presence/identity from the face recognition service and switches power modes."""
+        socket = self.zmq_context.socket(zmq.SUB)
+        socket.connect(STATE_SUB_URL)
+        socket.subscribe(TOPIC_PRESENCE)
+        socket.subscribe(TOPIC_CURRENT_IDENTITY)
+        poller = zmq.Poller()
+        poller.register(socket, zmq.POLLIN)
+        logger.info("Presence subscriber started.")
         try:
-            # Convert audio data to numpy array for wake word detection
-            audio_array = np.frombuffer(in_data, dtype=np.int16)
-
-            # If currently recording, feed audio to STT processor
-            if self.is_recording and self.stt_processor:
-                self.stt_processor.feed_audio(in_data)
-            # Otherwise, check for wake word
-            elif not self.is_recording:
-                # Predict wake word from audio chunk
-                prediction = self.wake_word_detector.predict(audio_array)
-
-                # Check if wake word was detected above threshold
-                for model_name, score in prediction.items():
-                    # Debug logging
-                    if score > 0.1:
-                        logger.debug(f"Wake word score: {score:.3f}")
-                    
-                    if score >= self.wake_word_threshold:
-                        logger.info(f"Wake word detected! Score: {score:.2f}")
-                        # Trigger recording
-                        self.start_recording()
-                        # Feed this audio chunk to STT immediately
-                        if self.stt_processor:
-                            self.stt_processor.feed_audio(in_data)
-                        break
+            while self.is_listening:
+                if poller.poll(500):
+                    topic, payload = socket.recv_multipart()
+                    try:
+                        if topic == TOPIC_PRESENCE:
+                            presence = decode_presence(payload)
+                            self.last_presence_message_time = time.time()
+                            self.last_face_time = max(self.last_face_time, presence['last_face_time'])
+                        else:
+                            identity = decode_identity(payload)
+                            self.current_identity = identity['identity']
+                            if identity['identity'] != "Unknown":
+                                self.last_face_time = max(self.last_face_time, identity['timestamp'])
+                    except Exception as e:
+                        logger.error(f"Error decoding presence message: {e}")
+                self._update_power_mode()
+        finally:
+            socket.close()
+        logger.info("Presence subscriber stopped.")
+
+    def _update_power_mode(self):
+        now = time.time()
+        camera_alive = now - self.last_presence_message_time < self.presence_stale_seconds
+        busy = self.is_recording or self.state['is_kaira_speaking'] or self.state['listening_state'] != WAITING
+        idle = camera_alive and not busy and now - self.last_face_time > self.presence_idle_seconds
+        if idle != self.low_power:
+            self.low_power = idle
+            # The next gate opening (either gate) re-warms the model from the ring
+            self.gate_was_open = False
+            self.power_mode_changes += 1
+            if idle:
+                logger.info(f"No face for {now - self.last_face_time:.0f}s; entering low-power listening.")
+            else:
+                logger.info("Face present (or camera silent); back to full-rate listening.")
+
+    def _warm_up_wake_word_model(self, end_position):
+        start = time.perf_counter()
+        # Model.reset() also resets the preprocessor, so it must run before the
+        # replay: afterwards it would throw the replayed features away again
+        self.wake_word_detector.reset()
+        history = self.detect_ring.recent(end_position, int(self.gate_warmup_seconds * self.sample_rate))
+        for offset in range(0, len(history) - self.wake_word_frame + 1, self.wake_word_frame):
+            self.wake_word_detector.predict(history[offset:offset + self.wake_word_frame])
+        # predict() returns raw scores, so dropping the policies' history is
+        # enough to keep the replay from triggering; only the live frame may
+        self.wake_word_policy.reset()
+        self.stop_word_policy.reset()
+        self.inference_time += time.perf_counter() - start
+
+    def get_gate_report(self):
+        """Fraction of frames the gate skipped and the inference time that saved."""
+        report = self.wake_gate.stats()
+        mean_inference_ms = (self.inference_time / self.inference_frames * 1000) if self.inference_frames else 0.0
+        frame_ms = self.wake_word_frame / self.sample_rate * 1000
+        report.update({
+            'inference_frames': self.inference_frames,
+            'mean_inference_ms': mean_inference_ms,
+            'estimated_cpu_saved_s': report['gated_frames'] * mean_inference_ms / 1000,
+            'estimated_core_fraction_saved': report['gated_fraction'] * mean_inference_ms / frame_ms,
+        })
+        return report
+
+    def _record_detection_latency(self, frame_end):
+        """Time between the end of the detecting frame being captured and the decision."""
+        latency_ms = self.audio_ring.age_of(frame_end) * 1000
+        m = self.wake_metrics
+        m['detections'] += 1
+        m['detection_latency_ms'] = latency_ms
+        m['mean_detection_latency_ms'] += (latency_ms - m['mean_detection_latency_ms']) / m['detections']
+
+    def _check_clipped(self, samples):
+        """Counts recordings whose very first samples already contain speech energy."""
+        head = samples[:self.sample_rate // 20].astype(np.float32) / 32768.0
+        self.wake_metrics['recordings'] += 1
+        if head.size and np.sqrt(np.mean(head ** 2)) > self.clip_rms_threshold:
+            self.wake_metrics['clipped_recordings'] += 1
+
+    def _level_meter_worker(self):
+        """Tracks the microphone RMS level and periodically logs fan-out metrics."""
+        last_log_time = time.time()
+        while self.is_listening:
+            samples = self.level_reader.read()
+            if samples is not None:
+                rms = np.sqrt(np.mean(samples.astype(np.float32) ** 2)) / 32768.0
+                self.input_level = float(min(rms * 10, 1.0))
+            if time.time() - last_log_time > 30:
+                logger.debug(f"Audio metrics: {self.get_audio_metrics()}")
+                last_log_time = time.time()
+            time.sleep(0.5 if self.low_power else 0.05)
 
+    def get_audio_metrics(self):
+        """Input overflow count and per-consumer lag/overrun metrics."""
+        return {
+            'input_overflows': self.input_overflows,
+            'samples_written': self.audio_ring.write_pos,
+            'consumers': {**self.audio_ring.metrics(), **(self.clean_ring.metrics() if self.full_duplex else {})},
+            'wake_word': dict(self.wake_metrics),
+            'wake_gate': self.get_gate_report(),
+            'low_power': self.low_power,
+            'idle_gate': self.idle_gate.stats(),
+            'playback': self.get_playback_metrics(),
+            'echo_canceller': self.echo_canceller.stats() if self.full_duplex else None,
+            'endpointing': dict(self.endpoint_metrics),
+            'turn_state': self.turn_state.metrics(),
+            'follow_up': dict(self.follow_up_metrics),
+        }
+
+    def _update_endpointing(self):
+        """Hands the policy's current end-of-turn silence to the recorder; drops turns with no speech."""
+        now = time.time()
+        if self.endpoint_policy.no_speech_expired(now):
+            self._on_no_speech()
+            return
+        if (self.endpoint_policy.speech_start is None
+                and now - self.endpoint_policy.turn_start > self.greeting_pause_seconds and self._should_greet()):
+            self._greet_instead_of_listening()
+            return
+        silence = self.endpoint_policy.silence_duration(now)
+        if silence != self.endpoint_silence:
+            self.endpoint_silence = silence
+            self.stt_processor.set_post_speech_silence(silence)
+
+    def _on_no_speech(self):
+        """Nobody spoke after the wake word: stop recording instead of idling in LISTENING."""
+        trace_id = self.current_trace_id
+        logger.info(f"No speech within {self.endpoint_policy.no_speech_timeout:.0f}s of the wake word; "
+                    f"back to waiting.")
+        self.endpoint_metrics['no_speech_timeouts'] += 1
+        if self.follow_up_turn:
+            self.follow_up_metrics['false_starts'] += 1
+        self.stop_recording(reason="no_speech")
+        self.stt_processor.abort()
+        self.tracer.finish(trace_id, no_speech=True)
+        self.state.update(display_text="", is_final_sentence=False)
+
+    # --- Greetings ---
+    def _should_greet(self):
+        """Known face, not greeted lately, a wake-word turn and a follow-up window to take the question."""
+        identity = self.current_identity
+        return (self.greet_on_wake and self.follow_up_seconds > 0 and not self.follow_up_turn
+                and identity != "Unknown"
+                and time.time() - self.last_greeted.get(identity, 0) > self.greeting_cooldown_seconds)
+
+    def _greet_instead_of_listening(self):
+        """The visitor paused after the wake word: drop the empty recording and ask liveapi for the greeting."""
+        trace_id = self.current_trace_id
+        identity = self.current_identity
+        self.is_recording = False
+        self.stt_processor.abort()
+        if not self.turn_state.transition(THINKING, "greeting", expected=(LISTENING,), is_kaira_speaking=True,
+                                          display_text="", is_final_sentence=False, kaira_response_text=""):
+            return
+        self.last_greeted[identity] = time.time()
+        logger.info(f"{identity} paused after the wake word; greeting first.")
+        self.tracer.finish(trace_id, greeting=True)
+        try:
+            with self.prompt_push_lock:
+                self.prompt_pusher.send(encode_prompt(kind="greeting", trace_id=trace_id or ""))
         except Exception as e:
-            logger.error(f"Audio input callback error: {e}")
-        
-        return (in_data, pyaudio.paContinue)
+            logger.error(f"Failed to send greeting request via ZMQ: {e}")
+            self.turn_state.transition(WAITING, "prompt_failed", expected=(THINKING,), is_kaira_speaking=False)
+
+    # --- Follow-up window ---
+    def _update_follow_up(self):
+        """Opens the follow-up window once an answer has finished playing; closes it when it times out."""
+        listening_state = self.state['listening_state']
+        if listening_state != SPEAKING or self.state['is_kaira_speaking']:
+            self.playback_drained_at = None
+            if listening_state == FOLLOW_UP and self.turn_state.seconds_in_current() > self.follow_up_seconds:
+                if self.turn_state.transition(WAITING, "follow_up_timeout", expected=(FOLLOW_UP,)):
+                    self.follow_up_metrics['timeouts'] += 1
+                    logger.info("No follow-up; back to waiting for the wake word.")
+            return
+        # Answer text is final; wait until its audio has drained (plus the echo tail)
+        now = time.monotonic()
+        if self.playback_buffer.depth_ms() > 0:
+            self.playback_drained_at = None
+        elif self.playback_drained_at is None:
+            self.playback_drained_at = now
+        elif now - self.playback_drained_at >= self.follow_up_settle_seconds:
+            self.playback_drained_at = None
+            self._open_follow_up()
+
+    def _open_follow_up(self):
+        if self.follow_up_seconds <= 0:
+            self.turn_state.transition(WAITING, "answer_done", expected=(SPEAKING,))
+            return
+        # Set up before publishing FOLLOW_UP: the wake word thread reads these from then on
+        self.follow_up_gate.reset()
+        self.follow_up_speech_frames = 0
+        self.follow_up_start_position = self.detect_ring.write_pos
+        if self.turn_state.transition(FOLLOW_UP, "answer_done", expected=(SPEAKING,)):
+            self.follow_up_metrics['windows'] += 1
+            logger.info(f"Follow-up window open for {self.follow_up_seconds:.0f}s (no wake word needed).")
+
+    def _follow_up_speech(self, frame):
+        """True once the VAD gate has passed a few consecutive frames during the follow-up window."""
+        if not self.full_duplex and self.playback_buffer.depth_ms() > 0:
+            # Late audio of the answer; without echo cancellation it would open the gate
+            self.follow_up_speech_frames = 0
+            return False
+        if self.follow_up_gate.process(frame):
+            self.follow_up_speech_frames += 1
+        else:
+            self.follow_up_speech_frames = 0
+        return self.follow_up_speech_frames >= self.follow_up_min_speech_frames
+
+    def _start_follow_up_turn(self, frame_end):
+        """Speech in the follow-up window: record it like a wake word turn, pre-roll included."""
+        preroll_start = frame_end - int(self.preroll_seconds * self.sample_rate)
+        self.stt_start_position = max(preroll_start, self.follow_up_start_position)
+        self.speech_search_position = self.stt_start_position  # No wake phrase to skip
+        delay = self.turn_state.seconds_in_current()
+        if self.start_recording(reason="follow_up"):
+            m = self.follow_up_metrics
+            m['turns'] += 1
+            m['mean_speech_delay_ms'] += (delay * 1000 - m['mean_speech_delay_ms']) / m['turns']
+            logger.info(f"Follow-up speech after {delay:.1f}s; recording without the wake word.")
+
+    def _detect_speech_start(self, samples, start):
+        """Marks when the user starts talking, looking only past the wake phrase (ring position `start` onwards)."""
+        if self.speech_search_position is not None:
+            samples = samples[max(0, self.speech_search_position - start):]
+        if not len(samples):
+            return
+        if not self.speech_gate.process(samples):
+            self.speech_gate_chunks = 0
+            return
+        self.speech_gate_chunks += 1
+        if self.speech_gate_chunks >= self.speech_gate_min_chunks:
+            now = time.time()
+            self.endpoint_policy.on_speech_start(now)
+            self.tracer.mark(self.current_trace_id, "speech_start", now)
 
     # --- STT Callbacks ---
+
     def _on_stt_realtime(self, text):
         """Realtime STT callback — handles normal text and voice stop command."""
         if not text:
@@ -200,21 +786,19 @@ class KAIRACore:
 
         normalized = text.lower().strip()
 
-        # 🔴 STOP COMMAND via STT (works even in middle of speech)
+        # 🔴 STOP COMMAND via STT (fallback if the acoustic stop word was missed)
         if "stop kaira" in normalized:
             logger.info("🛑 'Stop Kaira' detected in speech — halting listening.")
-            self.stop_recording()
-            with self.state_lock:
-                self.state['display_text'] = ""
-                self.state['is_final_sentence'] = True
-                self.state['listening_state'] = "WAITING"
+            self.handle_stop_command()
             return
 
+        self.endpoint_policy.on_partial(text, time.time())
+
         # 🧠 Normal real-time text handling during active listening
-        with self.state_lock:
-            if self.state['listening_state'] == 'LISTENING':
-                self.state['display_text'] = text
-                self.state['is_final_sentence'] = False
+        self.state.modify(lambda state: {
+            'display_text': text,
+            'is_final_sentence': False,
+        } if state['listening_state'] == LISTENING else {})
 
 
     def _on_stt_full_sentence(self, text):
@@ -222,60 +806,153 @@ class KAIRACore:
         Callback from STTProcessor for a full sentence.
         This sends the prompt AND automatically stops the recording.
         """
-        with self.state_lock:
-            self.state['display_text'] = text
-            self.state['last_sentence_time'] = time.time()
-            self.state['is_final_sentence'] = True
-            self.state['is_kaira_speaking'] = True 
-            self.state['kaira_response_text'] = ""
-            self.ai_response_start_time = time.time()
+        if not strip_wake_phrase(text):
+            # Just "Hey Kaira." (a pause after the wake word); keep recording for the question
+            logger.info(f"Ignoring wake-phrase-only sentence: '{text}'")
+            return
+        self.ai_response_start_time = time.time()
+        m = self.endpoint_metrics
+        m['turns'] += 1
+        if self.endpoint_silence is not None:
+            if self.endpoint_silence < self.endpoint_policy.base_silence:
+                m['early_finals'] += 1
+            elif self.endpoint_silence > self.endpoint_policy.base_silence:
+                m['extended_finals'] += 1
+        # Automatically stop recording (acts like VAD); THINKING before the prompt
+        # goes out, so the first answer chunk always finds it
+        self.stop_recording(next_state=THINKING, reason="stt_final")
+        self.state.update(
+            display_text=text,
+            last_sentence_time=time.time(),
+            is_final_sentence=True,
+            is_kaira_speaking=True,
+            kaira_response_text="",
+        )
         
         # Send prompt to AI
+        trace_id = self.current_trace_id
+        self.tracer.mark(trace_id, "stt_final")
         try:
             logger.info(f"Sending prompt to AI: '{text}'")
-            payload = {"prompt": text, "timestamp": time.time()}
-            self.prompt_pusher.send_json(payload)
+            with self.prompt_push_lock:
+                self.prompt_pusher.send(encode_prompt(text, trace_id=trace_id or ""))
+            self.tracer.mark(trace_id, "prompt_sent")
         except Exception as e:
             logger.error(f"Failed to send prompt via ZMQ: {e}")
-            with self.state_lock:
-                self.state['is_kaira_speaking'] = False
-                self.state['kaira_response_text'] = "Error: Could not connect to AI."
-        
-        # Automatically stop recording (acts like VAD)
-        self.stop_recording()
+            self.turn_state.transition(WAITING, "prompt_failed", is_kaira_speaking=False,
+                                       kaira_response_text="Error: Could not connect to AI.")
 
     # --- Recording Control Methods ---
-    def start_recording(self):
-        """Starts recording with guard clause to prevent interruption"""
-        with self.state_lock:
+    def start_recording(self, reason="manual"):
+        """Starts recording with guard clause to prevent interruption; returns True if it started."""
+        with self.recording_lock:
             # Don't start if AI is speaking OR if already recording
             if self.state['is_kaira_speaking'] or self.is_recording:
                 if self.state['is_kaira_speaking']:
                     logger.warning("Input blocked: KAIRA is still speaking.")
-                return 
-            
-            logger.info("--- Wake Word DETECTED: Recording START ---")
+                return False
+
+            follow_up = reason == "follow_up"
+            # A follow-up turn only starts if the window has not timed out meanwhile
+            if not self.turn_state.transition(LISTENING, reason, expected=(FOLLOW_UP,) if follow_up else None,
+                                              display_text="...", is_final_sentence=False,
+                                              kaira_response_text=""):
+                return False
+            logger.info(f"--- Recording START ({reason.replace('_', ' ')}) ---")
+            self.current_trace_id = new_trace_id()
+            self.tracer.start(self.current_trace_id, follow_up=follow_up)
+            self.tracer.mark(self.current_trace_id, "follow_up" if follow_up else "wake_word")
+            self.follow_up_turn = follow_up
+            self.endpoint_policy.reset(time.time())
+            self.endpoint_silence = None
+            self.speech_gate.reset()
+            self.speech_gate_chunks = 0
             self.is_recording = True
-            self.state['listening_state'] = 'LISTENING'
-            self.state['display_text'] = "..." 
-            self.state['is_final_sentence'] = False
-            self.state['kaira_response_text'] = ""
+            return True
 
-    def stop_recording(self):
+    def stop_recording(self, next_state=WAITING, reason="stopped"):
         """Stops recording"""
         if not self.is_recording:
             return
 
         logger.info("--- Recording STOP (auto-stopped) ---")
         self.is_recording = False
-        with self.state_lock:
-            self.state['listening_state'] = 'WAITING'
+        self.turn_state.transition(next_state, reason, expected=(LISTENING,))
+
+    def handle_stop_command(self):
+        """
+        Stops everything in progress: discards the current recording, flushes
+        queued playback and asks liveapi to cancel the in-flight response.
+        """
+        trace_id = self.current_trace_id
+        was_recording = self.is_recording
+        self.stop_recording(reason="stop")
+        if was_recording:
+            self.stt_processor.abort()
+
+        self._cancel_response(trace_id)
+
+    def _cancel_response(self, trace_id):
+        """Flushes queued playback and asks liveapi to cancel the in-flight response."""
+        # Flush queued audio and mute anything still in flight for this response
+        if trace_id:
+            self.cancelled_trace_ids.add(trace_id)
+        self.playback_buffer.flush()
+
+        try:
+            with self.prompt_push_lock:
+                self.prompt_pusher.send(encode_prompt(kind="cancel", trace_id=trace_id or ""))
+        except Exception as e:
+            logger.error(f"Failed to send cancel via ZMQ: {e}")
+
+        self.tracer.finish(trace_id, cancelled=True)
+        self.turn_state.transition(
+            WAITING, "cancelled",
+            display_text="",
+            kaira_response_text="",
+            is_final_sentence=True,
+            is_kaira_speaking=False,
+        )
+
+    def _maybe_finish_trace(self, trace_id):
+        """A turn is complete on this side once the answer is final and playback started."""
+        if self.tracer.has(trace_id, "response_final") and self.tracer.has(trace_id, "playback_start"):
+            self.tracer.finish(trace_id)
+
+    def _state_publisher_worker(self):
+        """Waits for new state versions and publishes listening/speaking state when it changes."""
+        version = -1
+        while self.is_listening:
+            snapshot = self.state.wait_for_change(version, timeout=0.5)
+            if snapshot.version == version:
+                continue
+            version = snapshot.version
+            current = (snapshot.data['listening_state'], snapshot.data['is_kaira_speaking'])
+            if current == self.last_published_state:
+                continue
+            try:
+                self.state_pub.send_multipart([TOPIC_KAIRA_STATE, encode_kaira_state(*current)])
+                self.last_published_state = current
+            except zmq.ZMQError as e:
+                logger.error(f"Failed to publish KAIRA state: {e}")
 
     # --- Public Methods ---
     def get_state(self):
-        """Get a copy of the current state"""
-        with self.state_lock:
-            return self.state.copy()
+        """Current state as an immutable snapshot (version + read-only mapping); no copy, no lock."""
+        return self.state.snapshot()
+
+    def clear_captions(self, seen_version, user=False, kaira=False):
+        """
+        Fades captions for a UI that rendered state version `seen_version`.
+        Only applies if the state has not moved since, so a newer sentence is
+        never wiped by a stale decision.
+        """
+        changes = {}
+        if user:
+            changes.update(display_text="", is_final_sentence=False)
+        if kaira:
+            changes['kaira_response_text'] = ""
+        return self.state.update(changes, expected_version=seen_version) is not None
 
     def start(self):
         """Start all core services"""
@@ -283,8 +960,16 @@ class KAIRACore:
         self.is_listening = True 
         self.stt_processor.start()
         self.transcription_thread.start()
+        self.presence_thread.start()
+        self.state_publisher_thread.start()
         self.audio_playback_thread.start()
         self.webrtc_client.start()
+        workers = [self._wake_word_worker, self._stt_feed_worker, self._level_meter_worker]
+        if self.full_duplex:
+            workers.append(self._echo_cancel_worker)
+        self.consumer_threads = [threading.Thread(target=worker, daemon=True) for worker in workers]
+        for thread in self.consumer_threads:
+            thread.start()
         self.start_audio_input_stream()
         print("🚀 KAIRA Core is running (listening for wake word 'hey kaira').")
 
@@ -292,19 +977,28 @@ class KAIRACore:
         """Stop all core services"""
         print("\n🧹 Stopping KAIRA Core services...")
         self.is_listening = False 
+
+        report = self.get_gate_report()
+        print(f"📊 Wake gate: skipped {report['gated_fraction']:.0%} of frames, "
+              f"saved ~{report['estimated_cpu_saved_s']:.1f}s of inference CPU")
         
         if self.stt_processor:
             self.stt_processor.stop()
             
         self.webrtc_client.stop()
-        self.audio_playback_queue.put(None) 
         self.audio_playback_thread.join(timeout=1.0)
             
         if self.transcription_thread:
             self.transcription_thread.join(timeout=1.0)
+        self.presence_thread.join(timeout=1.0)
+        self.state_publisher_thread.join(timeout=1.0)
+
+        for thread in self.consumer_threads:
+            thread.join(timeout=1.0)
         
         self.prompt_pusher.close()
         self.transcription_sub.close()
+        self.state_pub.close()
         self.zmq_context.term()
         
         if self.input_stream:
@@ -0,0 +1,222 @@
+# kaira_messages.py
+"""
+Compact binary wire format shared by every ZMQ topic in KAIRA.
+
+Every message starts with a 2-byte header (schema id, schema version),
+followed by a fixed struct block and then any variable-length UTF-8 strings,
+whose lengths live in the fixed block. Camera frames travel as a separate
+raw payload part so they can be sent and received without copying.
+
+Decoders return plain dicts with the same keys the old JSON payloads used.
+"""
+
+import struct
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# --- Topics ---
+TOPIC_AI_TRANSCRIPTION = b"ai_transcription"
+TOPIC_CURRENT_IDENTITY = b"current_identity"
+TOPIC_KAIRA_STATE = b"kaira_state"
+TOPIC_PRESENCE = b"presence"
+
+
+class WireFormatError(ValueError):
+    """Raised when a message has an unknown schema or an unsupported version."""
+
+
+class Schema:
+    """
+    A versioned struct layout.
+    fixed: list of (name, struct format) pairs; a field may also carry a tuple
+           of enum values, in which case it is packed as the index ('B').
+    strings: names of the variable-length UTF-8 fields, in order.
+    """
+
+    def __init__(self, schema_id: int, version: int, fixed: Sequence[tuple], strings: Sequence[str] = ()):
+        self.schema_id = schema_id
+        self.version = version
+        self.fixed_names = [f[0] for f in fixed]
+        self.enums = {f[0]: f[2] for f in fixed if len(f) > 2}
+        self.enum_index = {name: {v: i for i, v in enumerate(values)} for name, values in self.enums.items()}
+        self.strings = list(strings)
+        fmt = ">BB" + "".join(f[1] for f in fixed) + "I" * len(self.strings)
+        self._struct = struct.Struct(fmt)
+
+    def encode(self, **fields) -> bytes:
+        values = []
+        for name in self.fixed_names:
+            value = fields[name]
+            if name in self.enum_index:
+                value = self.enum_index[name][value]
+            values.append(value)
+        encoded = [fields.get(name, "").encode("utf-8") for name in self.strings]
+        header = self._struct.pack(self.schema_id, self.version, *values, *(len(b) for b in encoded))
+        return header + b"".join(encoded)
+
+    def decode(self, buf) -> Dict:
+        unpacked = self._struct.unpack_from(buf, 0)
+        if unpacked[0] != self.schema_id:
+            raise WireFormatError(f"Expected schema {self.schema_id}, got {unpacked[0]}")
+        if unpacked[1] != self.version:
+            raise WireFormatError(f"Unsupported version {unpacked[1]} for schema {self.schema_id}")
+        n_fixed = len(self.fixed_names)
+        result = dict(zip(self.fixed_names, unpacked[2:2 + n_fixed]))
+        for name, values in self.enums.items():
+            result[name] = values[result[name]]
+        offset = self._struct.size
+        for name, length in zip(self.strings, unpacked[2 + n_fixed:]):
+            result[name] = str(buf[offset:offset + length], "utf-8")
+            offset += length
+        return result
+
+
+# --- Schemas (one per topic) ---
+FRAME_META = Schema(1, 1, [("send_time", "d"), ("dtype", "4s"), ("ndim", "B"),
+                           ("d0", "I"), ("d1", "I"), ("d2", "I"), ("d3", "I")])
+TRANSCRIPTION = Schema(2, 2, [("type", "B", ("chunk", "final"))], ["text", "trace_id"])
+IDENTITY = Schema(3, 1, [("timestamp", "d")], ["identity", "emotion"])
+PROMPT = Schema(4, 3, [("timestamp", "d"), ("type", "B", ("prompt", "greeting", "cancel"))], ["prompt", "trace_id"])
+KAIRA_STATE = Schema(5, 1, [("timestamp", "d"), ("is_kaira_speaking", "?")], ["listening_state"])
+PRESENCE = Schema(6, 1, [("timestamp", "d"), ("face_count", "H"), ("last_face_time", "d")])
+STT_AUDIO = Schema(7, 1, [("timestamp", "d"), ("type", "B", ("audio", "end", "abort")), ("sample_rate", "I")],
+                   ["kiosk_id", "utterance_id"])
+STT_RESULT = Schema(8, 1, [("timestamp", "d"), ("type", "B", ("partial", "final")), ("audio_seconds", "f"),
+                           ("batch_size", "H"), ("inference_ms", "f")], ["kiosk_id", "utterance_id", "text"])
+
+
+# --- Camera frames ---
+def encode_frame_message(frame: np.ndarray, topic: bytes, send_time: float) -> List:
+    """Returns multipart [topic, meta, payload]; send with copy=False to avoid copying the pixels."""
+    frame = np.ascontiguousarray(frame)
+    if frame.ndim > 4:
+        raise WireFormatError(f"Frames with {frame.ndim} dimensions are not supported")
+    dims = list(frame.shape) + [0] * (4 - frame.ndim)
+    meta = FRAME_META.encode(
+        send_time=send_time,
+        dtype=frame.dtype.str.encode("ascii"),
+        ndim=frame.ndim,
+        d0=dims[0], d1=dims[1], d2=dims[2], d3=dims[3],
+    )
+    return [topic, meta, frame]
+
+
+def decode_frame_message(parts: Sequence) -> Tuple[bytes, np.ndarray, Dict]:
+    """
+    Decodes [topic, meta, payload] as received with recv_multipart(copy=False)
+    (zmq.Frame parts) or with copying (bytes parts). The returned array is a
+    read-only view over the received buffer.
+    """
+    topic, meta_part, payload = (_buffer(p) for p in parts)
+    meta = FRAME_META.decode(meta_part)
+    shape = tuple(meta[f"d{i}"] for i in range(meta["ndim"]))
+    dtype = np.dtype(meta["dtype"].rstrip(b"\0").decode("ascii"))
+    frame = np.frombuffer(payload, dtype=dtype).reshape(shape)
+    return bytes(topic), frame, {"send_time": meta["send_time"], "dtype": str(dtype), "shape": shape}
+
+
+def _buffer(part):
+    return part.buffer if hasattr(part, "buffer") else part
+
+
+# --- AI transcription ---
+def encode_transcription(kind: str, text: str, trace_id: str = "") -> bytes:
+    return TRANSCRIPTION.encode(type=kind, text=text, trace_id=trace_id)
+
+
+def decode_transcription(buf) -> Dict:
+    return TRANSCRIPTION.decode(_buffer(buf))
+
+
+# --- Identity ---
+def encode_identity(identity: str, emotion: str = "Neutral", timestamp: Optional[float] = None) -> bytes:
+    return IDENTITY.encode(
+        timestamp=time.time() if timestamp is None else timestamp,
+        identity=identity,
+        emotion=emotion,
+    )
+
+
+def decode_identity(buf) -> Dict:
+    return IDENTITY.decode(_buffer(buf))
+
+
+# --- Listening / speaking state ---
+def encode_kaira_state(listening_state: str, is_kaira_speaking: bool, timestamp: Optional[float] = None) -> bytes:
+    return KAIRA_STATE.encode(
+        timestamp=time.time() if timestamp is None else timestamp,
+        is_kaira_speaking=is_kaira_speaking,
+        listening_state=listening_state,
+    )
+
+
+def decode_kaira_state(buf) -> Dict:
+    return KAIRA_STATE.decode(_buffer(buf))
+
+
+# --- Presence (face detection, independent of recognition) ---
+def encode_presence(face_count: int, last_face_time: float, timestamp: Optional[float] = None) -> bytes:
+    return PRESENCE.encode(
+        timestamp=time.time() if timestamp is None else timestamp,
+        face_count=face_count,
+        last_face_time=last_face_time,
+    )
+
+
+def decode_presence(buf) -> Dict:
+    return PRESENCE.decode(_buffer(buf))
+
+
+# --- Prompts (kaira_core -> liveapi) ---
+def encode_prompt(prompt: str = "", kind: str = "prompt", timestamp: Optional[float] = None,
+                  trace_id: str = "") -> bytes:
+    return PROMPT.encode(
+        timestamp=time.time() if timestamp is None else timestamp,
+        type=kind,
+        prompt=prompt,
+        trace_id=trace_id,
+    )
+
+
+def decode_prompt(buf) -> Dict:
+    return PROMPT.decode(_buffer(buf))
+
+
+# --- Pooled STT (kiosk <-> stt_service) ---
+def encode_stt_audio(kind: str, kiosk_id: str, utterance_id: str, samples: Optional[np.ndarray] = None,
+                     sample_rate: int = 16000, timestamp: Optional[float] = None) -> List:
+    """Returns multipart [meta, pcm]; pcm is int16 audio for 'audio' and empty otherwise."""
+    meta = STT_AUDIO.encode(
+        timestamp=time.time() if timestamp is None else timestamp,
+        type=kind,
+        sample_rate=sample_rate,
+        kiosk_id=kiosk_id,
+        utterance_id=utterance_id,
+    )
+    pcm = np.ascontiguousarray(samples, dtype=np.int16) if samples is not None else b""
+    return [meta, pcm]
+
+
+def decode_stt_audio(parts: Sequence) -> Tuple[Dict, np.ndarray]:
+    meta_part, pcm = (_buffer(p) for p in parts)
+    return STT_AUDIO.decode(meta_part), np.frombuffer(pcm, dtype=np.int16)
+
+
+def encode_stt_result(kind: str, kiosk_id: str, utterance_id: str, text: str, audio_seconds: float = 0.0,
+                      batch_size: int = 1, inference_ms: float = 0.0, timestamp: Optional[float] = None) -> bytes:
+    return STT_RESULT.encode(
+        timestamp=time.time() if timestamp is None else timestamp,
+        type=kind,
+        audio_seconds=audio_seconds,
+        batch_size=batch_size,
+        inference_ms=inference_ms,
+        kiosk_id=kiosk_id,
+        utterance_id=utterance_id,
+        text=text,
+    )
+
+
+def decode_stt_result(buf) -> Dict:
+    return STT_RESULT.decode(_buffer(buf))
@@ -1,12 +1,16 @@
 import pygame
 import numpy as np
-import threading
 import time
 import math
-from kaira_core import KAIRACore 
+import os
+from ui_render import CaptionLayout, FrameScheduler, SpriteCache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from kaira_core import KAIRACore
 
 class KAIRAUI:
-    def __init__(self, core: KAIRACore):
+    def __init__(self, core: "KAIRACore", dirty_rendering=True, idle_fps=None):
         self.core = core
         pygame.init()
         
@@ -32,10 +36,19 @@ class KAIRAUI:
         self.current_mouth_scale = 1.0
         self.is_blinking = False
         self.blink_scale = 1.0
-        self.last_blink_time = time.time()
         self.animation_time = 0.0
         self.mic_particles = []
         self.clock = pygame.time.Clock()
+
+        # --- Frame scheduling ---
+        # Full rate while anything moves, a few frames per second otherwise.
+        # idle_fps=60 keeps the old fixed-rate loop.
+        if idle_fps is None:
+            idle_fps = int(os.getenv("KAIRA_UI_IDLE_FPS", "10"))
+        self.max_fps = 60
+        self.scheduler = FrameScheduler(active_fps=self.max_fps, idle_fps=idle_fps)
+        self.last_frame_time = time.monotonic()
+        self.schedule_next_blink()
         
         # UI's local copy of core state
         self.caption_display_duration = 3.0 # Fade-out time
@@ -46,12 +59,42 @@ class KAIRAUI:
         self.last_sentence_time = 0
         self.normalized_amplitude = 0.0
         self.listening_state = 'WAITING'
+        self.state_version = -1  # Version of the core state snapshot last copied in
 
         # --- Add a microphone button ---
         self.mic_button_rect = pygame.Rect(self.screen_width - 150, self.screen_height - 150, 100, 50)
         self.mic_button_color = (0, 208, 255)  # Bright blue
         self.mic_button_text = pygame.font.SysFont("Arial", 20).render("Mic", True, (255, 255, 255))
 
+        # --- Rendering caches and dirty regions ---
+        # With dirty_rendering off, every frame re-renders and flips everything
+        # (kept as the baseline for bench_ui.py).
+        self.dirty_rendering = dirty_rendering
+        self.sprites = SpriteCache(enabled=dirty_rendering)
+        self.caption_layouts = {
+            'user': CaptionLayout(self.caption_font, self.screen_width - 100, incremental=dirty_rendering),
+            'kaira': CaptionLayout(self.kaira_response_font, self.screen_width - 100, incremental=dirty_rendering),
+        }
+        self.caption_bottom = self.screen_height - 80
+        self.mic_center = (self.screen_width - 120, self.screen_height - 120)
+        scale = min(self.screen_width, self.screen_height) / 100
+        # Eyes and mouth at their largest (open eyes, loudest mouth)
+        self.face_rect = pygame.Rect(self.screen_width // 2 - int(42 * scale), self.screen_height // 2 - int(37 * scale),
+                                     int(84 * scale), int(74 * scale))
+        # Largest particle ring (~100 px radius) around the mic, plus the button
+        self.mic_rect = pygame.Rect(0, 0, 230, 230)
+        self.mic_rect.center = self.mic_center
+        self.mic_rect = self.mic_rect.union(self.mic_button_rect).clip(self.screen.get_rect())
+        self.needs_full_redraw = True
+        self.pixels_pushed = 0
+        self.face_look = None
+        self.mic_look = None
+        self.caption = None
+        self._last_face_look = None
+        self._last_mic_signature = None
+        self._last_caption_signature = None
+        self._last_caption_rect = pygame.Rect(0, self.caption_bottom, 0, 0)
+
         print("KAIRA UI initialized.")
 
     def update_animations(self, dt):
@@ -62,127 +105,161 @@ class KAIRAUI:
         # Decay visual amplitude
         self.normalized_amplitude *= (1.0 - 4.0 * dt)
 
-        # Get latest state from core
-        core_state = self.core.get_state()
-        if core_state['normalized_amplitude'] > self.normalized_amplitude:
-             self.normalized_amplitude = core_state['normalized_amplitude']
-             
-        # --- Update UI state from core ---
-        self.listening_state = core_state['listening_state']
-        self.current_display_text = core_state['display_text']
-        self.kaira_response_text = core_state['kaira_response_text']
-        self.is_final_sentence = core_state['is_final_sentence']
-        self.is_kaira_speaking = core_state['is_kaira_speaking']
-        self.last_sentence_time = core_state['last_sentence_time']
-        
-        if self.listening_state == 'WAITING':
-             pygame.display.set_caption("KAIRA (Press Spacebar to Talk)")
-        else:
-             pygame.display.set_caption("KAIRA (Listening...)")
+        # Amplitude: what the speaker is playing right now, or the mic level while listening.
+        # Both are read without taking the core's state lock.
+        amplitude = self.core.playback_envelope.level_at(time.monotonic())
+        if self.listening_state == 'LISTENING':
+            amplitude = max(amplitude, self.core.input_level)
+        if amplitude > self.normalized_amplitude:
+             self.normalized_amplitude = amplitude
+
+        now = time.monotonic()
+        self.scheduler.run_due(now)
+
+        # --- Update UI state from core (only when a new version was published) ---
+        snapshot = self.core.get_state()
+        if snapshot.version != self.state_version:
+            self.scheduler.wake(now)
+            self.state_version = snapshot.version
+            core_state = snapshot.data
+            self.listening_state = core_state['listening_state']
+            self.current_display_text = core_state['display_text']
+            self.kaira_response_text = core_state['kaira_response_text']
+            self.is_final_sentence = core_state['is_final_sentence']
+            self.is_kaira_speaking = core_state['is_kaira_speaking']
+            self.last_sentence_time = core_state['last_sentence_time']
+            
+            if self.listening_state == 'WAITING':
+                 pygame.display.set_caption("KAIRA (Press Spacebar to Talk)")
+            elif self.listening_state == 'FOLLOW_UP':
+                 pygame.display.set_caption("KAIRA (Go ahead, no wake word needed)")
+            elif self.listening_state == 'LISTENING':
+                 pygame.display.set_caption("KAIRA (Listening...)")
+            else:
+                 pygame.display.set_caption("KAIRA")
 
         # Mouth scale (always reacts to sound)
         target = 1.0 + self.normalized_amplitude * 0.5
         self.current_mouth_scale += (target - self.current_mouth_scale) * scale_speed * dt
         
-        # Blinking (Unchanged)
-        current_time = time.time()
-        if current_time - self.last_blink_time > 3.0 + np.random.rand() * 2.0:
-            self.trigger_blink()
-            self.last_blink_time = current_time
+        # Blinking: trigger_blink/end_blink run from the scheduler's timeline
         if self.is_blinking:
             self.blink_scale = max(0.05, self.blink_scale - 10.0 * dt)
-            if self.blink_scale <= 0.05:
-                self.blink_scale = 0.05
-                threading.Timer(0.15, self.end_blink).start()
         else:
             self.blink_scale = min(1.0, self.blink_scale + 10.0 * dt)
         
-        # Mic animation particles (Unchanged)
-        if len(self.mic_particles) < 3 and np.random.rand() < 0.1:
+        # Mic animation particles: ripples while listening or speaking (~6 per second)
+        engaged = self.listening_state in ('LISTENING', 'FOLLOW_UP') or self.is_kaira_speaking
+        if engaged and len(self.mic_particles) < 3 and np.random.rand() < 6.0 * dt:
             self.mic_particles.append({'radius': 20, 'alpha': 255, 'growth_rate': 60})
         for particle in self.mic_particles[:]:
             particle['radius'] += particle['growth_rate'] * dt
             particle['alpha'] = max(0, particle['alpha'] - 200 * dt)
             if particle['alpha'] <= 0:
                 self.mic_particles.remove(particle)
+
+        scrolling = False
+        for layout in self.caption_layouts.values():
+            scrolling = layout.advance(dt) or scrolling
+
+        if (engaged or scrolling or self.mic_particles or self.blink_scale < 1.0
+                or self.normalized_amplitude > 0.01 or abs(target - self.current_mouth_scale) > 0.01):
+            self.scheduler.wake(now)
             
         # --- NEW FADE-OUT LOGIC ---
         # This one timer now handles fading for BOTH user text and AI text
         time_since_last_sentence = time.time() - self.last_sentence_time
         
-        # Check if we should fade the user's final sentence
-        if self.is_final_sentence and not self.is_kaira_speaking and (time_since_last_sentence > self.caption_display_duration):
-            # Fade user's text if KAIRA doesn't respond
-            self.core.state['display_text'] = "" 
-            self.core.state['is_final_sentence'] = False
+        # Check if we should fade the user's final sentence (if KAIRA doesn't respond)
+        fade_user = self.is_final_sentence and not self.is_kaira_speaking and (time_since_last_sentence > self.caption_display_duration)
+
+        # Check if we should fade KAIRA's final response (after she finishes)
+        fade_kaira = not self.is_kaira_speaking and self.kaira_response_text and (time_since_last_sentence > self.caption_display_duration)
 
-        # Check if we should fade KAIRA's final response
-        if not self.is_kaira_speaking and self.kaira_response_text and (time_since_last_sentence > self.caption_display_duration):
-             # Fade KAIRA's text after she finishes
-             self.core.state['kaira_response_text'] = ""
+        # The core applies it only if nothing changed since the version we looked at
+        if fade_user or fade_kaira:
+            self.core.clear_captions(self.state_version, user=fade_user, kaira=bool(fade_kaira))
 
 
+    def schedule_next_blink(self):
+        self.scheduler.at(time.monotonic() + 3.0 + np.random.rand() * 2.0, self.trigger_blink)
+
     def trigger_blink(self):
         self.is_blinking = True
+        self.scheduler.wake(time.monotonic())
+        # ~0.1 s to close, then stay shut for 0.15 s
+        self.scheduler.at(time.monotonic() + 0.25, self.end_blink)
 
     def end_blink(self):
         self.is_blinking = False
+        self.schedule_next_blink()
 
     def draw_3d_mic_animation(self):
-        """Draw 3D mic animation (Unchanged)"""
-        mic_x = self.screen_width - 120
-        mic_y = self.screen_height - 120
-        
-        if self.listening_state == 'LISTENING':
-            if self.normalized_amplitude > 0.3: 
-                base_color = (255, 50, 50) # Red
-                pulse = 0.8 + 0.2 * self.normalized_amplitude
-            else: 
-                base_color = self.accent_color # Bright Blue
-                pulse = 0.8 + 0.1 * math.sin(self.animation_time * 4) 
-        else: # 'WAITING' state
-            base_color = self.accent_color_dim # Dim Blue
-            pulse = 0.7
+        """Draw 3D mic animation from cached sprites"""
+        mic_x, mic_y = self.mic_center
+        base_color, mic_size = self.mic_look
         
-        particle_color = self.accent_color if self.listening_state == 'LISTENING' else self.accent_color_dim
+        particle_color = self.accent_color if self.listening_state in ('LISTENING', 'FOLLOW_UP') else self.accent_color_dim
         for particle in self.mic_particles:
-            alpha = int(particle['alpha'])
-            color = (*particle_color, alpha)
-            size = int(particle['radius'] * 2 + 10)
-            if size > 0:
-                surf = pygame.Surface((size, size), pygame.SRCALPHA)
-                pygame.draw.circle(surf, color, (size // 2, size // 2), int(particle['radius']), 3)
+            radius = int(particle['radius'])
+            if radius > 0:
+                surf = self.sprites.ring(radius, particle_color)
+                surf.set_alpha(int(particle['alpha']))
+                size = surf.get_width()
                 self.screen.blit(surf, (mic_x - size // 2, mic_y - size // 2))
         
-        mic_size = int(35 * pulse)
         shadow_offset = 4
         pygame.draw.circle(self.screen, (20, 20, 20), 
                           (mic_x + shadow_offset, mic_y + shadow_offset), mic_size + 5)
         
-        for i in range(3, 0, -1):
-            alpha = int(100 / i)
-            glow_color = (*base_color, alpha)
-            glow_surf = pygame.Surface((mic_size * 3, mic_size * 3), pygame.SRCALPHA)
-            pygame.draw.circle(glow_surf, glow_color, (mic_size * 3 // 2, mic_size * 3 // 2), mic_size + i * 8)
-            self.screen.blit(glow_surf, (mic_x - mic_size * 3 // 2, mic_y - mic_size * 3 // 2))
+        glow_surf = self.sprites.glow(mic_size, base_color)
+        self.screen.blit(glow_surf, (mic_x - mic_size * 3 // 2, mic_y - mic_size * 3 // 2))
         
-        # ... (rest of mic drawing unchanged) ...
-        for i in range(5):
-            shade = tuple(max(0, c - i * 20) for c in base_color)
-            pygame.draw.circle(self.screen, shade, (mic_x, mic_y - i), mic_size - i * 2)
-        highlight_offset = int(mic_size * 0.3); pygame.draw.circle(self.screen, (255, 255, 255), (mic_x - highlight_offset, mic_y - highlight_offset), mic_size // 4)
+        body = self.sprites.mic_body(mic_size, base_color)
+        self.screen.blit(body, (mic_x - body.get_width() // 2, mic_y - body.get_height() // 2))
         stem_width, stem_height = 12, 20; stem_rect = pygame.Rect(mic_x - stem_width // 2, mic_y + mic_size - 5, stem_width, stem_height); pygame.draw.rect(self.screen, base_color, stem_rect, border_radius=6)
         base_width, base_height = 30, 8; base_rect = pygame.Rect(mic_x - base_width // 2, mic_y + mic_size + stem_height - 8, base_width, base_height); pygame.draw.rect(self.screen, base_color, base_rect, border_radius=4)
 
+    def _mic_look(self):
+        """Base colour and (quantized) size of the mic for this frame."""
+        if self.listening_state == 'LISTENING':
+            if self.normalized_amplitude > 0.3: 
+                base_color = (255, 50, 50) # Red
+                pulse = 0.8 + 0.2 * self.normalized_amplitude
+            else: 
+                base_color = self.accent_color # Bright Blue
+                pulse = 0.8 + 0.1 * math.sin(self.animation_time * 4) 
+        elif self.listening_state == 'FOLLOW_UP':
+            # Still attentive, but calmer than an active recording
+            base_color = self.accent_color
+            pulse = 0.75 + 0.05 * math.sin(self.animation_time * 2)
+        else: # 'WAITING' (or answering)
+            base_color = self.accent_color_dim # Dim Blue
+            pulse = 0.7
+        return base_color, int(35 * pulse)
+
+    def _caption(self):
+        """Layout of the caption to show (updated to the current text), or None. KAIRA's text takes priority."""
+        if self.kaira_response_text:
+            layout = self.caption_layouts['kaira']
+            layout.set_text(self.kaira_response_text, self.kaira_response_color)
+            return layout
+        if self.current_display_text:
+            # Choose color based on whether text is final or realtime
+            color = self.caption_color if self.is_final_sentence else self.realtime_color
+            layout = self.caption_layouts['user']
+            layout.set_text(self.current_display_text, color)
+            return layout
+        return None
 
-    def draw_face(self):
-        """Draw the minimalist robot face (Unchanged)"""
+    def _draw_scene(self):
+        """Draws every layer; callers clip to the region being refreshed."""
         self.screen.fill(self.bg_color)
         center_x, center_y = self.screen_width // 2, self.screen_height // 2
         scale = min(self.screen_width, self.screen_height) / 100
         
-        eye_color = self.accent_color if self.listening_state == 'LISTENING' else self.accent_color_dim
-        eye_width, eye_height = int(20 * scale), int(30 * scale * self.blink_scale)
+        eye_color, eye_height, mouth_thickness = self.face_look
+        eye_width = int(20 * scale)
         eye_y = center_y - int(20 * scale)
         
         left_eye_rect = pygame.Rect(center_x - int(30 * scale) - eye_width // 2, eye_y - eye_height // 2, eye_width, eye_height)
@@ -191,59 +268,56 @@ class KAIRAUI:
         pygame.draw.rect(self.screen, eye_color, right_eye_rect, border_radius=int(5 * scale))
         
         mouth_y, mouth_width = center_y + int(30 * scale), int(30 * scale)
-        pygame.draw.line(self.screen, eye_color, (center_x - mouth_width, mouth_y), (center_x + mouth_width, mouth_y), int(5 * scale * self.current_mouth_scale))
+        pygame.draw.line(self.screen, eye_color, (center_x - mouth_width, mouth_y), (center_x + mouth_width, mouth_y), mouth_thickness)
 
         self.draw_3d_mic_animation()
         
-        # --- NEW: Prioritized Caption Drawing ---
-        
-        # KAIRA's text takes priority. If it exists, draw it.
-        if self.kaira_response_text:
-            self.draw_wrapped_text(
-                self.kaira_response_text,
-                self.kaira_response_font,
-                self.kaira_response_color,
-                self.screen_width // 2, 
-                self.screen_height - 80, # At the bottom
-                max_width=self.screen_width - 100
-            )
-        # Otherwise, draw the user's text.
-        elif self.current_display_text:
-            # Choose color based on whether text is final or realtime
-            color = self.caption_color if self.is_final_sentence else self.realtime_color
-            self.draw_wrapped_text(
-                self.current_display_text,
-                self.caption_font,
-                color,
-                self.screen_width // 2, 
-                self.screen_height - 80, # At the bottom
-                max_width=self.screen_width - 100
-            )
-
-        pygame.display.flip()
-
-    def draw_wrapped_text(self, text, font, color, center_x, bottom_y, max_width):
-        """Helper function to draw word-wrapped text (Unchanged)"""
-        words = text.split(' ')
-        lines = []
-        current_line = ""
-        
-        for word in words:
-            test_line = f"{current_line} {word}".strip()
-            if font.size(test_line)[0] <= max_width:
-                current_line = test_line
-            else:
-                lines.append(current_line)
-                current_line = word
-        lines.append(current_line)
-        
-        line_height = font.get_linesize()
-        for i, line in enumerate(reversed(lines)):
-            line_surf = font.render(line, True, color)
-            line_rect = line_surf.get_rect(
-                center=(center_x, bottom_y - i * line_height - line_height // 2)
-            )
-            self.screen.blit(line_surf, line_rect)
+        if self.caption:
+            self.caption.draw(self.screen, self.screen_width // 2, self.caption_bottom)
+
+        self.draw_mic_button()
+
+    def draw_face(self):
+        """Draws the frame, pushing only the regions whose content changed."""
+        scale = min(self.screen_width, self.screen_height) / 100
+        eye_color = self.accent_color if self.listening_state in ('LISTENING', 'FOLLOW_UP') else self.accent_color_dim
+        self.face_look = (eye_color, int(30 * scale * self.blink_scale), int(5 * scale * self.current_mouth_scale))
+        self.mic_look = self._mic_look()
+        mic_signature = (self.mic_look, self.listening_state,
+                         tuple((int(p['radius']), int(p['alpha'])) for p in self.mic_particles))
+        self.caption = caption = self._caption()
+        if caption:
+            caption_signature = (id(caption), caption.version, int(caption.scroll))
+            caption_rect = caption.rect(self.screen_width // 2, self.caption_bottom)
+        else:
+            caption_signature = None
+            caption_rect = pygame.Rect(0, self.caption_bottom, 0, 0)
+
+        if not self.dirty_rendering or self.needs_full_redraw:
+            self._draw_scene()
+            pygame.display.flip()
+            self.needs_full_redraw = False
+            self.pixels_pushed += self.screen_width * self.screen_height
+        else:
+            dirty = []
+            if self.face_look != self._last_face_look:
+                dirty.append(self.face_rect)
+            if mic_signature != self._last_mic_signature:
+                dirty.append(self.mic_rect)
+            if caption_signature != self._last_caption_signature:
+                dirty.append(caption_rect.union(self._last_caption_rect))
+            for rect in dirty:
+                self.screen.set_clip(rect)
+                self._draw_scene()
+            self.screen.set_clip(None)
+            if dirty:
+                pygame.display.update(dirty)
+                self.pixels_pushed += sum(r.width * r.height for r in dirty)
+
+        self._last_face_look = self.face_look
+        self._last_mic_signature = mic_signature
+        self._last_caption_signature = caption_signature
+        self._last_caption_rect = caption_rect
 
     def draw_mic_button(self):
         """Draw the microphone button on the screen."""
@@ -272,30 +346,57 @@ class KAIRAUI:
         
         running = True
         while running:
-            dt = self.clock.tick(60) / 1000.0
-            
-            # --- Key Event Handling (Wake Word Mode) ---
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        running = False
-                    if event.key == pygame.K_SPACE:
-                        # Only call start_recording.
-                        # We will no longer check if it's already recording,
-                        # the core will handle that.
-                        self.core.start_recording()
-                self.handle_mic_button_click(event)  # Handle mic button clicks
-
-            # --- END MODIFIED ---
-            
-            self.update_animations(dt)
-            self.draw_face()
-            self.draw_mic_button()  # Draw the mic button
+            running = self.run_frame()
 
         self.cleanup()
 
+    def wait_for_frame(self):
+        """
+        Sleeps until the next frame is due and returns (dt, events). At the
+        full rate this is a plain clock tick; when idle it blocks on the
+        event queue instead, so input still wakes the loop immediately.
+        """
+        wait = self.scheduler.frame_wait(time.monotonic(), self.last_frame_time)
+        events = []
+        if wait <= 1.0 / self.max_fps:
+            self.clock.tick(self.max_fps)
+        else:
+            event = pygame.event.wait(int(wait * 1000))
+            if event.type != pygame.NOEVENT:
+                events.append(event)
+        events.extend(pygame.event.get())
+        if events:
+            self.scheduler.wake(time.monotonic())
+        now = time.monotonic()
+        dt = min(now - self.last_frame_time, 0.1)
+        self.last_frame_time = now
+        return dt, events
+
+    def run_frame(self):
+        """Handles input, advances animations and draws one frame. Returns False to quit."""
+        running = True
+        dt, events = self.wait_for_frame()
+        
+        # --- Key Event Handling (Wake Word Mode) ---
+        for event in events:
+            if event.type == pygame.VIDEOEXPOSE:
+                self.needs_full_redraw = True
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    running = False
+                if event.key == pygame.K_SPACE:
+                    # Only call start_recording.
+                    # We will no longer check if it's already recording,
+                    # the core will handle that.
+                    self.core.start_recording()
+            self.handle_mic_button_click(event)  # Handle mic button clicks
+
+        self.update_animations(dt)
+        self.draw_face()  # Includes the mic button
+        return running
+
     def cleanup(self):
         """Clean up UI resources (Unchanged)"""
         try:
@@ -22,6 +22,11 @@ SERVICES = [
         'script': 'camera_recv.py',
         'description': 'Receives camera frames via WebRTC'
     },
+    {
+        'name': 'State Broker',
+        'script': 'state_broker.py',
+        'description': 'Last-value cache for identity and listening state'
+    },
     {
         'name': 'Face Recognition',
         'script': 'face_recognition_service.py',
@@ -1,5 +1,6 @@
 # liveapi.py - Windows Compatible Version
 import asyncio
+import hashlib
 import json
 import logging
 import os
@@ -7,7 +8,8 @@ import time
 from pathlib import Path
 import zmq
 import threading
-from typing import Optional, List, Dict
+from collections import OrderedDict
+from typing import Optional, List, Dict, Tuple
 
 import aiohttp_cors
 from dotenv import load_dotenv
@@ -23,6 +25,13 @@ try:
 except ImportError:
     print("WARNING: retrieval.py not found. RAG functionality will be disabled.")
     def get_top_k_chunks(model, query, embeddings, chunks, k=3): return []
+from response_cache import GreetingCache, FAQCache, FileFingerprint
+from voice_trace import TraceRecorder
+from state_broker import request_snapshot
+from kaira_messages import (
+    TOPIC_AI_TRANSCRIPTION, TOPIC_CURRENT_IDENTITY,
+    decode_identity, decode_prompt, encode_transcription
+)
 
 # --- 0. Configuration & Setup ---
 logging.basicConfig(level=logging.INFO)
@@ -35,6 +44,8 @@ if not API_KEY:
 
 client = genai.Client(api_key=API_KEY)
 model = "gemini-2.0-flash-live-001"
+VOICE_NAME = "Kore"
+AUDIO_CHUNK_BYTES = 9600  # 200 ms of 24 kHz, 16-bit mono PCM
 
 # --- WebRTC Globals ---
 pc_set = set()
@@ -43,9 +54,10 @@ active_data_channel = None
 # ✅ WINDOWS COMPATIBLE: Use TCP instead of IPC
 AI_TRANSCRIPTION_PUB_URL = "tcp://127.0.0.1:5556"  # Changed from ipc://
 AI_PROMPT_PULL_URL = "tcp://127.0.0.1:5557"        # Changed from ipc://
-IDENTITY_SUB_URL = "tcp://127.0.0.1:5558"          # Changed from ipc://
+IDENTITY_SUB_URL = "tcp://127.0.0.1:5558"          # State broker backend (last-value cache)
 
 zmq_context = zmq.Context()
+tracer = TraceRecorder("liveapi")
 transcription_publisher = zmq_context.socket(zmq.PUB)
 transcription_publisher.bind(AI_TRANSCRIPTION_PUB_URL)
 logger.info(f"✅ ZMQ Publisher bound to {AI_TRANSCRIPTION_PUB_URL}")
@@ -100,23 +112,68 @@ Your purpose is to make a genuine, personal connection with everyone you talk to
 g_current_person_state = {"identity": "Unknown", "emotion": "Neutral"}
 g_current_person_lock = threading.Lock()
 
+# --- Per-identity precomputed context (LRU) ---
+IDENTITY_CONTEXT_CACHE_SIZE = 16
+g_identity_context_cache: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+g_identity_context_lock = threading.Lock()
+
+# --- Pre-synthesized greetings ---
+GREETING_CACHE_DIR = Path("cache/greetings")
+GREETING_PROMPT = "{identity} has just walked up to you. Greet them warmly by name in one or two short sentences."
+# Greetings play when kaira_core asks (wake word from a known face); autoplay on identity change is opt-in
+GREETING_AUTOPLAY = os.getenv("KAIRA_GREETING_AUTOPLAY", "0") == "1"
+GREETING_COOLDOWN_S = 300.0
+greeting_cache = GreetingCache(
+    GREETING_CACHE_DIR,
+    greeting_key=hashlib.sha1(f"{model}|{VOICE_NAME}|{GREETING_PROMPT}".encode()).hexdigest()
+)
+g_last_greeted: Dict[str, float] = {}
+
+# --- FAQ answer cache ---
+FAQ_CACHE_DIR = Path("cache/faq")
+FAQ_CACHE_MAX_BYTES = 200 * 1024 * 1024
+FAQ_SIMILARITY_THRESHOLD = 0.92
+# Re-checked on every cache lookup (mtime-based), so edited documents invalidate answers without a restart
+CONTEXT_FINGERPRINT = FileFingerprint(
+    lambda: [*Path("documents").glob("*.md"), *Path("RAG").glob("*.npy")],
+    prefix="|".join([model, VOICE_NAME, KAIRA_CONTEXT]),
+)
+faq_cache = FAQCache(
+    FAQ_CACHE_DIR,
+    context_fingerprint=CONTEXT_FINGERPRINT,
+    max_bytes=FAQ_CACHE_MAX_BYTES,
+    similarity_threshold=FAQ_SIMILARITY_THRESHOLD
+)
+
 # --- Identity Subscriber Thread ---
-def identity_subscriber_worker():
+def identity_subscriber_worker(loop, publisher):
     context = zmq.Context()
     socket = context.socket(zmq.SUB)
     socket.connect(IDENTITY_SUB_URL)
-    socket.subscribe(b"current_identity")
+    socket.subscribe(TOPIC_CURRENT_IDENTITY)
     logger.info(f"✅ ZMQ Subscriber connected to {IDENTITY_SUB_URL}")
     global g_current_person_state, g_current_person_lock
+
+    # Start from the broker's cached identity instead of assuming "Unknown"
+    snapshot = request_snapshot(context, TOPIC_CURRENT_IDENTITY)
+    if TOPIC_CURRENT_IDENTITY in snapshot:
+        identity = decode_identity(snapshot[TOPIC_CURRENT_IDENTITY]).get("identity", "Unknown")
+        logger.info(f"Identity snapshot from broker: {identity}")
+        with g_current_person_lock:
+            g_current_person_state["identity"] = identity
+        on_identity_changed(identity, loop, publisher)
     while True:
         try:
-            topic, identity_json = socket.recv_multipart()
-            data = json.loads(identity_json.decode())
+            topic, identity_msg = socket.recv_multipart()
+            data = decode_identity(identity_msg)
             new_identity = data.get("identity", "Unknown")
             with g_current_person_lock:
-                if g_current_person_state["identity"] != new_identity:
+                identity_changed = g_current_person_state["identity"] != new_identity
+                if identity_changed:
                     logger.info(f"Identity state updated: {new_identity}")
                     g_current_person_state["identity"] = new_identity
+            if identity_changed:
+                on_identity_changed(new_identity, loop, publisher)
         except Exception as e:
             logger.error(f"Error in identity_subscriber_worker: {e}")
             if zmq_context.closed: break
@@ -137,11 +194,27 @@ def build_conversation_context(recognized_person: Optional[Dict[str, str]] = Non
     context += KAIRA_CONTEXT
     return context
 
+def assemble_system_instruction(base_context: str, additional_context: str) -> str:
+    system_instruction = base_context
+    if additional_context:
+        system_instruction += f"\n\n[Additional Context]\n{additional_context}"
+    return system_instruction
+
 def load_context_files(user_input: str, identity: str = "Unknown") -> str:
     """Performs RAG lookup using the loaded embedding model and data."""
+    return join_chunks(retrieve_chunks(user_input, identity))
+
+def join_chunks(context_chunks: List[str]) -> str:
+    output = "".join(" " + chunk for chunk in context_chunks)
+    if output:
+        logger.info(f"RAG: Loaded {len(output)} chars of additional context.")
+    return output
+
+def retrieve_chunks(user_input: str, identity: str = "Unknown") -> List[str]:
+    """Top-k RAG chunks for a question (phrased with the speaker's identity when known)."""
     if embedding_model is None or embeddings is None or chunks is None:
         logger.warning("RAG components not loaded. Skipping context file lookup.")
-        return ""
+        return []
         
     try:
         if identity != "Unknown":
@@ -151,16 +224,103 @@ def load_context_files(user_input: str, identity: str = "Unknown") -> str:
             rag_query = user_input
             logger.info(f"Performing RAG query (no identity): '{rag_query}'")
 
-        output = ""
-        for chunk in get_top_k_chunks(embedding_model, rag_query, embeddings, chunks):
-            output += " " + chunk
-        
-        if output:
-            logger.info(f"RAG: Loaded {len(output)} chars of additional context.")
-        return output
+        return list(get_top_k_chunks(embedding_model, rag_query, embeddings, chunks))
     except Exception as e:
         logger.error(f"Error during RAG lookup: {e}")
-        return ""
+        return []
+
+def embed_question(question: str) -> Optional[np.ndarray]:
+    """Normalized question embedding used as the FAQ cache key."""
+    if embedding_model is None:
+        return None
+    try:
+        return embedding_model.encode([question], normalize_embeddings=True)[0]
+    except Exception as e:
+        logger.error(f"Error embedding question for FAQ cache: {e}")
+        return None
+
+# --- Identity Context Precomputation ---
+def precompute_identity_context(identity: str) -> Optional[Dict[str, str]]:
+    """Runs the identity RAG lookup and caches the assembled system instruction."""
+    if identity == "Unknown":
+        return None
+    with g_identity_context_lock:
+        cached = g_identity_context_cache.get(identity)
+        if cached is not None:
+            g_identity_context_cache.move_to_end(identity)
+            return cached
+
+    start_time = time.time()
+    person_query = f"Who is {identity}? Their role, designation, department and background."
+    identity_chunks = retrieve_chunks(person_query)
+    additional_context = join_chunks(identity_chunks)
+    base_context = build_conversation_context({"identity": identity})
+    entry = {
+        "identity": identity,
+        "chunks": identity_chunks,
+        "additional_context": additional_context,
+        "system_instruction": assemble_system_instruction(base_context, additional_context),
+    }
+
+    with g_identity_context_lock:
+        g_identity_context_cache[identity] = entry
+        g_identity_context_cache.move_to_end(identity)
+        while len(g_identity_context_cache) > IDENTITY_CONTEXT_CACHE_SIZE:
+            evicted, _ = g_identity_context_cache.popitem(last=False)
+            logger.info(f"Identity context cache evicted: {evicted}")
+    logger.info(f"Precomputed context for {identity} in {(time.time() - start_time) * 1000:.0f} ms")
+    return entry
+
+def get_identity_context(identity: str) -> Optional[Dict[str, str]]:
+    """Returns the cached context for an identity without computing it."""
+    with g_identity_context_lock:
+        entry = g_identity_context_cache.get(identity)
+        if entry is not None:
+            g_identity_context_cache.move_to_end(identity)
+        return entry
+
+def _identity_changed_worker(identity: str, loop, publisher):
+    precompute_identity_context(identity)
+    asyncio.run_coroutine_threadsafe(prepare_greeting(identity, publisher), loop)
+
+def on_identity_changed(identity: str, loop, publisher):
+    """Hook called by the identity subscriber when a new identity is confirmed."""
+    if identity == "Unknown":
+        return
+    threading.Thread(
+        target=_identity_changed_worker,
+        args=(identity, loop, publisher),
+        daemon=True
+    ).start()
+
+# --- In-flight response tracking (for cancel) ---
+g_active_response = None
+g_active_response_trace_id = ""
+g_active_response_lock = threading.Lock()
+
+def set_active_response(future, trace_id: str = ""):
+    global g_active_response, g_active_response_trace_id
+    with g_active_response_lock:
+        g_active_response = future
+        g_active_response_trace_id = trace_id
+
+def cancel_active_response(trace_id: str = ""):
+    """Cancels the Gemini session (or cached replay) answering the turn `trace_id`."""
+    with g_active_response_lock:
+        future = g_active_response
+        active_trace_id = g_active_response_trace_id
+    if future is None or future.done():
+        return
+    if trace_id != active_trace_id:
+        # A stop for another turn (e.g. a new recording) must not kill this answer
+        logger.info(f"Ignoring cancel for trace {trace_id!r}; active response is {active_trace_id!r}.")
+        return
+    logger.info("🛑 Cancel received, stopping in-flight response.")
+    if isinstance(future, asyncio.Future):
+        # asyncio tasks must be cancelled from their own loop
+        future.get_loop().call_soon_threadsafe(future.cancel)
+    else:
+        future.cancel()
 
 # --- ZMQ Prompt Receiver Thread ---
 def prompt_receiver_worker(loop, publisher):
@@ -171,24 +331,53 @@ def prompt_receiver_worker(loop, publisher):
 
     while True:
         try:
-            data = socket.recv_json()
+            data = decode_prompt(socket.recv())
             prompt = data.get("prompt")
+            trace_id = data.get("trace_id", "")
+            tracer.mark(trace_id, "prompt_received")
             
             global active_data_channel
             
-            if prompt:
+            if data.get("type") == "cancel":
+                cancel_active_response(trace_id)
+            elif data.get("type") == "greeting":
+                identity = get_current_person().get("identity", "Unknown")
+                asyncio.run_coroutine_threadsafe(
+                    answer_greeting_request(identity, publisher, trace_id), loop
+                )
+            elif prompt:
                 logger.info("Building dynamic context for new prompt...")
                 
                 recognized_person = get_current_person() 
                 person_identity = recognized_person.get("identity", "Unknown")
                 logger.info(f"Recognized person: {person_identity}")
 
-                additional_context = load_context_files(prompt, person_identity)
+                question_embedding = embed_question(prompt)
+                cached_answer = None
+                if question_embedding is not None:
+                    cached_answer = faq_cache.lookup(question_embedding, person_identity)
+                if cached_answer is not None and active_data_channel:
+                    pcm, transcript, similarity = cached_answer
+                    logger.info(f"FAQ cache hit (similarity {similarity:.3f}), replaying cached answer.")
+                    tracer.mark(trace_id, "faq_hit")
+                    set_active_response(asyncio.run_coroutine_threadsafe(
+                        play_cached_response(pcm, transcript, active_data_channel, publisher, trace_id),
+                        loop
+                    ), trace_id)
+                    continue
+
+                # The question always gets its own lookup; a precomputed identity
+                # context only adds the chunks about the person
+                context_chunks = retrieve_chunks(prompt, person_identity)
+                identity_context = get_identity_context(person_identity)
+                if identity_context is not None:
+                    logger.info(f"Adding precomputed context for {person_identity}.")
+                    context_chunks = context_chunks + [
+                        chunk for chunk in identity_context["chunks"] if chunk not in context_chunks
+                    ]
                 base_context = build_conversation_context(recognized_person)
-                
-                final_system_instruction = base_context
-                if additional_context:
-                    final_system_instruction += f"\n\n[Additional Context]\n{additional_context}"
+                final_system_instruction = assemble_system_instruction(base_context, join_chunks(context_chunks))
+                tracer.mark(trace_id, "retrieval_done")
 
                 while not active_data_channel:
                     logger.warning("Received prompt via ZMQ, waiting for active data channel...")
@@ -196,61 +385,171 @@ def prompt_receiver_worker(loop, publisher):
 
                 logger.info(f"Sending prompt to Gemini: {prompt[:50]}...")
                 
-                asyncio.run_coroutine_threadsafe(
-                    run_gemini_session(prompt, final_system_instruction, active_data_channel, publisher), 
+                faq_key = None
+                if question_embedding is not None:
+                    faq_key = (prompt, question_embedding, person_identity)
+                set_active_response(asyncio.run_coroutine_threadsafe(
+                    run_gemini_session(prompt, final_system_instruction, active_data_channel, publisher, faq_key, trace_id), 
                     loop
-                )
+                ), trace_id)
 
         except Exception as e:
             logger.error(f"Error in prompt_receiver_worker: {e}")
 
 # --- Async Gemini Session Handler ---
-async def run_gemini_session(prompt, system_instruction, channel, publisher):
+def build_live_config(system_instruction: str) -> dict:
+    return {
+      "response_modalities": ["AUDIO"],
+      "system_instruction": system_instruction,
+      "output_audio_transcription": {},
+      "speech_config": {
+        "voice_config": {"prebuilt_voice_config": {"voice_name": VOICE_NAME}}
+      },
+    }
+
+def publish_transcription(publisher, kind: str, text: str, trace_id: str = ""):
+    publisher.send_multipart([TOPIC_AI_TRANSCRIPTION, encode_transcription(kind, text, trace_id)])
+
+def send_trace_marker(channel, trace_id: str):
+    """Marks the start of a response so the client knows which trace the following audio belongs to."""
+    channel.send(json.dumps({"type": "trace", "trace_id": trace_id}))
+
+async def run_gemini_session(prompt, system_instruction, channel, publisher, faq_key=None, trace_id=""):
     logger.info("Connecting to Gemini for new prompt...") 
     try:
-        dynamic_genai_config = {
-          "response_modalities": ["AUDIO"],
-          "system_instruction": system_instruction,
-          "output_audio_transcription": {},
-          "speech_config": {
-            "voice_config": {"prebuilt_voice_config": {"voice_name": "Kore"}}
-          },
-        }
+        dynamic_genai_config = build_live_config(system_instruction)
         async with client.aio.live.connect(model=model, config=dynamic_genai_config) as session: #type: ignore
             logger.info("Gemini connected. Sending prompt.")
+            tracer.mark(trace_id, "gemini_connected")
             await session.send_client_content(
                 turns={"role": "user", "parts": [{"text": prompt}]},
                 turn_complete=True
             )
-            await stream_gemini_audio(session, channel, publisher)
+            pcm, transcript = await stream_gemini_audio(session, channel, publisher, trace_id)
+        if faq_key is not None and pcm and transcript:
+            question, question_embedding, identity = faq_key
+            await asyncio.to_thread(faq_cache.put, question, question_embedding, identity, pcm, transcript)
+            logger.info(f"Stored answer in FAQ cache ({len(pcm)} bytes).")
     except Exception as e:
         logger.error(f"Error in run_gemini_session: {e}")
+    finally:
+        tracer.finish(trace_id)
 
 # --- Gemini Live API Handler ---
-async def stream_gemini_audio(session, data_channel, publisher):
+async def stream_gemini_audio(session, data_channel, publisher, trace_id: str = "") -> Tuple[bytes, str]:
+    """Streams a response to the data channel; returns (pcm, transcript) if it completed."""
     logger.info("Streaming response to WebRTC Data Channel...")
     full_transcription = "" 
+    full_audio = bytearray()
     try:
         async for response in session.receive():
             if response.data is not None:
+                if not full_audio:
+                    tracer.mark(trace_id, "gemini_first_byte")
+                    send_trace_marker(data_channel, trace_id)
                 data_channel.send(response.data)
+                full_audio.extend(response.data)
             if response.server_content.output_transcription:
                 chunk_text = response.server_content.output_transcription.text
                 full_transcription += chunk_text  
-                payload = json.dumps({"type": "chunk", "text": chunk_text})
-                publisher.send_multipart([b"ai_transcription", payload.encode()])
+                publish_transcription(publisher, "chunk", chunk_text, trace_id)
         
         logger.info("Gemini audio stream closed successfully.")
+        tracer.mark(trace_id, "gemini_done")
         
         if full_transcription:
-            payload = json.dumps({"type": "final", "text": full_transcription})
-            publisher.send_multipart([b"ai_transcription", payload.encode()])
+            publish_transcription(publisher, "final", full_transcription, trace_id)
             logger.info(f"Published final transcription to ZMQ: {full_transcription[:50]}...")
+        return bytes(full_audio), full_transcription
     except Exception as e:
         logger.error(f"Error in Gemini streaming: {e}")
+        return b"", ""
     finally:
         logger.info("Gemini audio stream finished.")
 
+# --- Greeting Synthesis & Playback ---
+async def synthesize_response(prompt: str, system_instruction: str) -> Tuple[bytes, str]:
+    """Runs a Gemini turn to completion and returns (pcm, transcript) instead of streaming it."""
+    audio = bytearray()
+    transcript = ""
+    async with client.aio.live.connect(model=model, config=build_live_config(system_instruction)) as session: #type: ignore
+        await session.send_client_content(
+            turns={"role": "user", "parts": [{"text": prompt}]},
+            turn_complete=True
+        )
+        async for response in session.receive():
+            if response.data is not None:
+                audio.extend(response.data)
+            if response.server_content and response.server_content.output_transcription:
+                transcript += response.server_content.output_transcription.text
+    return bytes(audio), transcript
+
+async def play_cached_response(pcm: bytes, transcript: str, channel, publisher, trace_id: str = ""):
+    """Sends pre-synthesized audio to the data channel and publishes its transcript."""
+    if transcript:
+        publish_transcription(publisher, "chunk", transcript, trace_id)
+    send_trace_marker(channel, trace_id)
+    for i in range(0, len(pcm), AUDIO_CHUNK_BYTES):
+        channel.send(pcm[i:i + AUDIO_CHUNK_BYTES])
+        await asyncio.sleep(0)  # Lets a cancel interrupt the replay
+    if transcript:
+        publish_transcription(publisher, "final", transcript, trace_id)
+    tracer.finish(trace_id, cached=True)
+
+async def prepare_greeting(identity: str, publisher):
+    """Makes sure a greeting for this person exists on disk, then plays it if enabled."""
+    if greeting_cache.get(identity) is None:
+        try:
+            identity_context = get_identity_context(identity)
+            if identity_context is None:
+                identity_context = await asyncio.to_thread(precompute_identity_context, identity)
+            logger.info(f"Synthesizing greeting for {identity}...")
+            pcm, transcript = await synthesize_response(
+                GREETING_PROMPT.format(identity=identity),
+                identity_context["system_instruction"]
+            )
+            if not pcm:
+                logger.warning(f"Gemini returned no greeting audio for {identity}.")
+                return
+            greeting_cache.put(identity, pcm, transcript)
+            logger.info(f"Greeting cached for {identity}: {transcript[:50]}...")
+        except Exception as e:
+            logger.error(f"Error synthesizing greeting for {identity}: {e}")
+            return
+    if GREETING_AUTOPLAY:
+        await trigger_greeting(identity, publisher)
+
+async def trigger_greeting(identity: str, publisher, force: bool = False, trace_id: str = "") -> bool:
+    """
+    Plays the cached greeting for the person currently in front of the camera.
+    Never interrupts a response that is still running; returns True if it played.
+    """
+    global g_active_response, g_active_response_trace_id
+    if identity == "Unknown" or get_current_person().get("identity") != identity:
+        return False
+    if not force and time.time() - g_last_greeted.get(identity, 0) < GREETING_COOLDOWN_S:
+        return False
+    greeting = greeting_cache.get(identity)
+    if greeting is None or not active_data_channel:
+        return False
+    with g_active_response_lock:
+        if g_active_response is not None and not g_active_response.done():
+            logger.info(f"Response in progress; skipping greeting for {identity}.")
+            return False
+        g_last_greeted[identity] = time.time()
+        logger.info(f"Playing cached greeting for {identity}.")
+        g_active_response = asyncio.ensure_future(
+            play_cached_response(greeting[0], greeting[1], active_data_channel, publisher, trace_id)
+        )
+        g_active_response_trace_id = trace_id
+    return True
+
+async def answer_greeting_request(identity: str, publisher, trace_id: str):
+    """Greeting asked for by kaira_core; an empty final tells it to go on listening if there is none."""
+    if not await trigger_greeting(identity, publisher, force=True, trace_id=trace_id):
+        publish_transcription(publisher, "final", "", trace_id)
+        tracer.finish(trace_id, greeting_skipped=True)
+
 # --- WebRTC Signaling Handler ---
 async def offer(request):
     params = await request.json()
@@ -305,12 +604,14 @@ async def start_background_tasks(app):
 
     identity_thread = threading.Thread(
         target=identity_subscriber_worker,
+        args=(loop, transcription_publisher),
         daemon=True
     )
     identity_thread.start()
     app['identity_thread'] = identity_thread
 
 async def on_shutdown(app):
+    faq_cache.flush()
     coros = [pc.close() for pc in list(pc_set)]
     await asyncio.gather(*coros)
     pc_set.clear()
@@ -1,26 +1,41 @@
 # main.py
 
+import os
 import sys
 import traceback
-from kaira_core import KAIRACore
-from kaira_ui import KAIRAUI
 
 def main():
     """Main function to initialize and run KAIRA core and UI."""
+    # --ui-process (or KAIRA_UI_PROCESS=1) renders the UI in its own process over shared memory
+    ui_process = "--ui-process" in sys.argv or os.getenv("KAIRA_UI_PROCESS", "0") == "1"
     core = None
     ui = None
+    bridge = None
     try:
-        # 1. Initialize Core
+        # 1. Initialize Core. Imported here, not at module level: the spawned UI
+        # process re-imports this module and must not load the audio/ML stack
+        from kaira_core import KAIRACore
         core = KAIRACore()
         
-        # 2. Initialize UI, passing the core to it
-        ui = KAIRAUI(core)
-        
-        # 3. Start the core services (audio, STT)
-        core.start()
-        
-        # 4. Run the UI (this is the main blocking loop)
-        ui.run()
+        if ui_process:
+            from ui_bridge import UIProcessBridge
+            # 2. Share state/amplitude with the UI process
+            bridge = UIProcessBridge(core)
+            # 3. Start the core services (audio, STT)
+            core.start()
+            # 4. Run the UI process and wait for it to exit
+            bridge.start()
+            bridge.wait()
+        else:
+            from kaira_ui import KAIRAUI
+            # 2. Initialize UI, passing the core to it
+            ui = KAIRAUI(core)
+            
+            # 3. Start the core services (audio, STT)
+            core.start()
+            
+            # 4. Run the UI (this is the main blocking loop)
+            ui.run()
 
     except KeyboardInterrupt:
         print("\n\n⚡ KAIRA interrupted - Shutting down gracefully...")
@@ -31,6 +46,8 @@ def main():
         # 5. Stop services
         if core:
             core.stop()
+        if bridge:
+            bridge.stop()
         # UI cleanup is called by its own .run() method,
         # but we call it again just in case of an error.
         if ui:
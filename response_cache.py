@@ -0,0 +1,280 @@
+# response_cache.py
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _safe_name(identity: str) -> str:
+    """Turns a person's name into a filesystem-safe folder name."""
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", identity).strip("_") or "person"
+    digest = hashlib.sha1(identity.encode("utf-8")).hexdigest()[:8]
+    return f"{slug}_{digest}"
+
+
+class GreetingCache:
+    """
+    Persistent per-person cache of pre-synthesized greetings.
+    Each person gets a folder holding the raw PCM audio and a JSON sidecar
+    with the transcript and the key it was generated with.
+    """
+
+    def __init__(self, cache_dir, greeting_key: str):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.greeting_key = greeting_key
+        self._memory: Dict[str, Tuple[bytes, str]] = {}
+        self._lock = threading.Lock()
+
+    def _paths(self, identity: str) -> Tuple[Path, Path]:
+        folder = self.cache_dir / _safe_name(identity)
+        return folder / "greeting.pcm", folder / "greeting.json"
+
+    def get(self, identity: str) -> Optional[Tuple[bytes, str]]:
+        """Returns (pcm, transcript) for a person, loading from disk if needed."""
+        with self._lock:
+            if identity in self._memory:
+                return self._memory[identity]
+
+        pcm_path, meta_path = self._paths(identity)
+        if not pcm_path.exists() or not meta_path.exists():
+            return None
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta.get("key") != self.greeting_key:
+                logger.info(f"Greeting for {identity} is stale, will regenerate.")
+                return None
+            entry = (pcm_path.read_bytes(), meta.get("transcript", ""))
+        except Exception as e:
+            logger.error(f"Failed to read cached greeting for {identity}: {e}")
+            return None
+
+        with self._lock:
+            self._memory[identity] = entry
+        return entry
+
+    def put(self, identity: str, pcm: bytes, transcript: str):
+        """Stores a greeting in memory and on disk."""
+        with self._lock:
+            self._memory[identity] = (pcm, transcript)
+
+        pcm_path, meta_path = self._paths(identity)
+        try:
+            pcm_path.parent.mkdir(parents=True, exist_ok=True)
+            pcm_path.write_bytes(pcm)
+            meta_path.write_text(json.dumps({
+                "identity": identity,
+                "key": self.greeting_key,
+                "transcript": transcript,
+                "created": time.time(),
+            }), encoding="utf-8")
+        except Exception as e:
+            logger.error(f"Failed to persist greeting for {identity}: {e}")
+
+
+class FAQCache:
+    """
+    Semantic cache of complete spoken answers.
+    Entries are keyed by the normalized embedding of the question together
+    with the identity and a context fingerprint; a lookup hits when a new
+    question is similar enough to a stored one under the same identity.
+    The index is persisted as index.json + embeddings.npy with one PCM file
+    per answer, and the whole cache is dropped when the fingerprint changes.
+    The fingerprint may be a callable; it is then re-checked on every lookup
+    and store, so edited documents invalidate answers without a restart.
+    Hit times (LRU order) are written back at most every save_interval
+    seconds, on every store and on flush().
+    """
+
+    def __init__(self, cache_dir, context_fingerprint: Union[str, Callable[[], str]],
+                 max_bytes: int = 200 * 1024 * 1024, similarity_threshold: float = 0.92,
+                 save_interval: float = 60.0):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if callable(context_fingerprint):
+            self._fingerprint_source = context_fingerprint
+        else:
+            self._fingerprint_source = lambda: context_fingerprint
+        self.context_fingerprint = self._fingerprint_source()
+        self.max_bytes = max_bytes
+        self.similarity_threshold = similarity_threshold
+        self.save_interval = save_interval
+        self._entries: list = []
+        self._embeddings = np.zeros((0, 0), dtype=np.float32)
+        self._lock = threading.Lock()
+        self._dirty = False  # Hit times changed since the index was written
+        self._last_saved = time.time()
+        self._load()
+
+    # --- Persistence ---
+    def _load(self):
+        index_path = self.cache_dir / "index.json"
+        embeddings_path = self.cache_dir / "embeddings.npy"
+        if not index_path.exists() or not embeddings_path.exists():
+            return
+        try:
+            index = json.loads(index_path.read_text(encoding="utf-8"))
+            if index.get("context_fingerprint") != self.context_fingerprint:
+                logger.info("FAQ cache fingerprint changed (documents updated), clearing cache.")
+                self._clear_disk()
+                return
+            entries = index.get("entries", [])
+            embeddings = np.load(embeddings_path)
+            if len(entries) != len(embeddings):
+                raise ValueError("index and embeddings are out of sync")
+            keep = [i for i, e in enumerate(entries) if (self.cache_dir / e["file"]).exists()]
+            self._entries = [entries[i] for i in keep]
+            self._embeddings = embeddings[keep].astype(np.float32) if keep else np.zeros((0, 0), dtype=np.float32)
+            logger.info(f"FAQ cache loaded with {len(self._entries)} answers.")
+        except Exception as e:
+            logger.error(f"Failed to load FAQ cache, starting empty: {e}")
+            self._entries = []
+            self._embeddings = np.zeros((0, 0), dtype=np.float32)
+
+    def _save(self):
+        self._save_index()
+        np.save(self.cache_dir / "embeddings.npy", self._embeddings)
+
+    def _save_index(self):
+        index = {"context_fingerprint": self.context_fingerprint, "entries": self._entries}
+        (self.cache_dir / "index.json").write_text(json.dumps(index), encoding="utf-8")
+        self._dirty = False
+        self._last_saved = time.time()
+
+    def _check_fingerprint(self):
+        """Drops every answer if the documents changed since they were generated (caller holds the lock)."""
+        fingerprint = self._fingerprint_source()
+        if fingerprint == self.context_fingerprint:
+            return
+        logger.info("FAQ cache fingerprint changed (documents updated), clearing cache.")
+        self.context_fingerprint = fingerprint
+        self._entries = []
+        self._embeddings = np.zeros((0, 0), dtype=np.float32)
+        self._dirty = False
+        self._clear_disk()
+
+    def _clear_disk(self):
+        for path in self.cache_dir.glob("*.pcm"):
+            path.unlink(missing_ok=True)
+        for name in ("index.json", "embeddings.npy"):
+            (self.cache_dir / name).unlink(missing_ok=True)
+
+    # --- Public API ---
+    def lookup(self, embedding: np.ndarray, identity: str) -> Optional[Tuple[bytes, str, float]]:
+        """Returns (pcm, transcript, similarity) of the closest cached answer, or None."""
+        with self._lock:
+            self._check_fingerprint()
+            if not self._entries:
+                return None
+            scores = self._embeddings @ embedding.astype(np.float32).ravel()
+            for i, entry in enumerate(self._entries):
+                if entry["identity"] != identity:
+                    scores[i] = -1.0
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            if similarity < self.similarity_threshold:
+                return None
+            entry = self._entries[best]
+            entry["last_used"] = time.time()
+            entry["hits"] = entry.get("hits", 0) + 1
+            self._dirty = True
+            if time.time() - self._last_saved > self.save_interval:
+                self._save_index()
+            pcm_path = self.cache_dir / entry["file"]
+        try:
+            return pcm_path.read_bytes(), entry["transcript"], similarity
+        except Exception as e:
+            logger.error(f"Failed to read cached answer {pcm_path}: {e}")
+            return None
+
+    def put(self, question: str, embedding: np.ndarray, identity: str, pcm: bytes, transcript: str):
+        """Stores a completed answer and evicts least recently used ones past max_bytes."""
+        embedding = embedding.astype(np.float32).ravel()
+        key = hashlib.sha1(f"{identity}|{question}|{time.time()}".encode("utf-8")).hexdigest()[:16]
+        entry = {
+            "file": f"{key}.pcm",
+            "question": question,
+            "identity": identity,
+            "transcript": transcript,
+            "bytes": len(pcm),
+            "created": time.time(),
+            "last_used": time.time(),
+            "hits": 0,
+        }
+        with self._lock:
+            self._check_fingerprint()
+            (self.cache_dir / entry["file"]).write_bytes(pcm)
+            self._entries.append(entry)
+            if self._embeddings.size == 0:
+                self._embeddings = embedding[np.newaxis, :]
+            else:
+                self._embeddings = np.vstack([self._embeddings, embedding])
+            self._evict()
+            self._save()
+
+    def flush(self):
+        """Writes pending hit times to disk (call on shutdown)."""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def _evict(self):
+        total = sum(e["bytes"] for e in self._entries)
+        if total <= self.max_bytes:
+            return
+        order = sorted(range(len(self._entries)), key=lambda i: self._entries[i]["last_used"])
+        dropped = set()
+        for i in order:
+            if total <= self.max_bytes:
+                break
+            total -= self._entries[i]["bytes"]
+            (self.cache_dir / self._entries[i]["file"]).unlink(missing_ok=True)
+            dropped.add(i)
+        keep = [i for i in range(len(self._entries)) if i not in dropped]
+        self._entries = [self._entries[i] for i in keep]
+        self._embeddings = self._embeddings[keep]
+        logger.info(f"FAQ cache evicted {len(dropped)} answers.")
+
+
+class FileFingerprint:
+    """
+    Callable fingerprint of a set of files plus fixed text, for FAQCache.
+    The files are re-listed on every call, but only re-hashed when a path,
+    mtime or size changed.
+    """
+
+    def __init__(self, list_files: Callable[[], Iterable], prefix: str = ""):
+        self.list_files = list_files
+        self.prefix = prefix
+        self._stat_key = None
+        self._fingerprint = ""
+
+    def __call__(self) -> str:
+        paths = sorted(Path(p) for p in self.list_files())
+        try:
+            stat_key = tuple((str(p), p.stat().st_mtime_ns, p.stat().st_size) for p in paths if p.is_file())
+        except OSError:
+            return self._fingerprint  # A file vanished mid-scan (being replaced); check again next time
+        if stat_key != self._stat_key:
+            self._stat_key = stat_key
+            self._fingerprint = hashlib.sha1(f"{self.prefix}|{fingerprint_files(paths)}".encode()).hexdigest()
+        return self._fingerprint
+
+
+def fingerprint_files(paths) -> str:
+    """Content hash over a set of files, used to invalidate caches when documents change."""
+    digest = hashlib.sha1()
+    for path in sorted(Path(p) for p in paths):
+        if path.is_file():
+            digest.update(path.name.encode("utf-8"))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
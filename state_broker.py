@@ -0,0 +1,131 @@
+"""
+KAIRA State Broker - Last-Value Cache
+Forwards state topics (current_identity, kaira_state, ...) from publishers
+to subscribers and remembers the latest message per topic, so a service
+that (re)starts late immediately receives the current state.
+"""
+
+import time
+from typing import Dict, List
+
+import zmq
+
+# ✅ WINDOWS COMPATIBLE: TCP sockets
+STATE_PUB_URL = "tcp://127.0.0.1:5559"       # Publishers connect here (XSUB)
+STATE_SUB_URL = "tcp://127.0.0.1:5558"       # Subscribers connect here (XPUB)
+STATE_SNAPSHOT_URL = "tcp://127.0.0.1:5560"  # REQ/REP snapshot of cached values
+
+
+def request_snapshot(context: zmq.Context, topic: bytes = b"", timeout_ms: int = 500) -> Dict[bytes, bytes]:
+    """
+    Asks the broker for the latest cached message of every topic starting
+    with `topic`. Returns {} if the broker is not running.
+    """
+    socket = context.socket(zmq.REQ)
+    socket.setsockopt(zmq.LINGER, 0)
+    socket.setsockopt(zmq.RCVTIMEO, timeout_ms)
+    socket.connect(STATE_SNAPSHOT_URL)
+    try:
+        socket.send(topic)
+        parts = socket.recv_multipart()
+        return dict(zip(parts[0::2], parts[1::2]))
+    except zmq.Again:
+        return {}
+    finally:
+        socket.close()
+
+
+class LastValueCacheBroker:
+    def __init__(self, context: zmq.Context):
+        self.cache: Dict[bytes, List[bytes]] = {}
+
+        self.frontend = context.socket(zmq.XSUB)
+        self.frontend.bind(STATE_PUB_URL)
+        # Cache every topic, whether or not anyone is subscribed yet
+        self.frontend.send(b"\x01")
+
+        self.backend = context.socket(zmq.XPUB)
+        self.backend.setsockopt(zmq.XPUB_VERBOSE, 1)  # See every subscribe, not just the first
+        self.backend.bind(STATE_SUB_URL)
+
+        self.snapshot = context.socket(zmq.REP)
+        self.snapshot.bind(STATE_SNAPSHOT_URL)
+
+        self.poller = zmq.Poller()
+        self.poller.register(self.frontend, zmq.POLLIN)
+        self.poller.register(self.backend, zmq.POLLIN)
+        self.poller.register(self.snapshot, zmq.POLLIN)
+
+        self.forwarded = 0
+        self.replayed = 0
+
+    def _matching(self, prefix: bytes):
+        return [(topic, parts) for topic, parts in self.cache.items() if topic.startswith(prefix)]
+
+    def _on_publish(self):
+        parts = self.frontend.recv_multipart()
+        self.cache[parts[0]] = parts
+        self.backend.send_multipart(parts)
+        self.forwarded += 1
+
+    def _on_subscription(self):
+        message = self.backend.recv()
+        if not message:
+            return
+        is_subscribe, prefix = message[0] == 1, message[1:]
+        if is_subscribe:
+            for topic, parts in self._matching(prefix):
+                self.backend.send_multipart(parts)
+                self.replayed += 1
+
+    def _on_snapshot(self):
+        prefix = self.snapshot.recv()
+        reply = []
+        for topic, parts in self._matching(prefix):
+            reply.extend([topic, parts[-1]])
+        self.snapshot.send_multipart(reply or [b""])
+
+    def run(self):
+        last_log_time = time.time()
+        while True:
+            events = dict(self.poller.poll(1000))
+            if self.frontend in events:
+                self._on_publish()
+            if self.backend in events:
+                self._on_subscription()
+            if self.snapshot in events:
+                self._on_snapshot()
+
+            if time.time() - last_log_time > 30:
+                print(f"✅ Forwarded {self.forwarded} | Replayed {self.replayed} | Topics: {[t.decode() for t in self.cache]}")
+                last_log_time = time.time()
+
+    def close(self):
+        self.frontend.close()
+        self.backend.close()
+        self.snapshot.close()
+
+
+def main():
+    print("=" * 60)
+    print("📦 KAIRA STATE BROKER (Last-Value Cache)")
+    print("=" * 60)
+    print(f"📥 Publishers connect to:   {STATE_PUB_URL}")
+    print(f"📡 Subscribers connect to:  {STATE_SUB_URL}")
+    print(f"📸 Snapshot requests on:    {STATE_SNAPSHOT_URL}")
+    print("=" * 60)
+
+    context = zmq.Context()
+    broker = LastValueCacheBroker(context)
+    try:
+        broker.run()
+    except KeyboardInterrupt:
+        print("\n⚡ Stopping state broker...")
+    finally:
+        broker.close()
+        context.term()
+        print("✅ State broker stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# state_store.py
+
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, NamedTuple, Optional
+
+
+class StateSnapshot(NamedTuple):
+    """One immutable version of the state. `data` is a read-only mapping."""
+    version: int
+    data: Mapping[str, Any]
+
+
+class StateStore:
+    """
+    Versioned store of immutable state snapshots.
+
+    Writers never mutate a published snapshot: update() copies the current
+    mapping, applies the changes and swaps in a new snapshot with the next
+    version number (a no-op change publishes nothing). Readers just grab the
+    current snapshot reference - no lock, no copy - and can compare its
+    version with the last one they handled. Threads that want to react to
+    changes can block in wait_for_change().
+    """
+
+    def __init__(self, initial: Dict[str, Any]):
+        self._cond = threading.Condition()  # Serializes writers; readers never take it
+        self._snapshot = StateSnapshot(0, MappingProxyType(dict(initial)))
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def snapshot(self) -> StateSnapshot:
+        return self._snapshot
+
+    def __getitem__(self, key: str) -> Any:
+        return self._snapshot.data[key]
+
+    def update(self, changes: Optional[Dict[str, Any]] = None, expected_version: Optional[int] = None,
+               **kwargs) -> Optional[StateSnapshot]:
+        """
+        Publishes a new version with `changes` applied. With expected_version,
+        only applies if nobody else published in between (compare-and-set);
+        returns None if that check failed, otherwise the current snapshot.
+        """
+        changes = {**(changes or {}), **kwargs}
+        with self._cond:
+            current = self._snapshot
+            if expected_version is not None and current.version != expected_version:
+                return None
+            if all(current.data.get(k) == v for k, v in changes.items()):
+                return current
+            data = dict(current.data)
+            data.update(changes)
+            self._snapshot = StateSnapshot(current.version + 1, MappingProxyType(data))
+            self._cond.notify_all()
+            return self._snapshot
+
+    def modify(self, fn: Callable[[Mapping[str, Any]], Dict[str, Any]]) -> StateSnapshot:
+        """Read-modify-write: fn receives the current data and returns the changes to apply."""
+        with self._cond:
+            return self.update(fn(self._snapshot.data))
+
+    def wait_for_change(self, since_version: int, timeout: Optional[float] = None) -> StateSnapshot:
+        """Blocks until the version moves past since_version (or timeout); returns the latest snapshot."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._snapshot.version != since_version, timeout)
+            return self._snapshot
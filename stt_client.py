@@ -0,0 +1,206 @@
+# stt_client.py
+
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+
+import numpy as np
+import zmq
+
+from audio_gate import EnergyGate
+from kaira_messages import decode_stt_result, encode_stt_audio
+
+logger = logging.getLogger(__name__)
+
+STT_SERVICE_URL = "tcp://127.0.0.1:5561"
+
+
+class RemoteSTTProcessor:
+    """
+    Thin-client stand-in for STTProcessor that transcribes on stt_service.py.
+
+    Offers the same callbacks and methods KAIRACore uses. Endpointing stays
+    on the kiosk: a VAD-confirmed energy gate finds the start of speech
+    (sent with a short pre-roll) and the utterance ends after
+    post_speech_silence_duration of silence, which set_post_speech_silence()
+    adjusts exactly as with the local recorder. Audio and control messages
+    are tagged with the kiosk id and an utterance id; partial and final
+    text come back asynchronously. One I/O thread owns the ZMQ socket.
+    """
+
+    def __init__(self, on_realtime_text, on_full_sentence_text, on_speech_start=None, service_url=None,
+                 kiosk_id=None, sample_rate=16000, post_speech_silence_duration=0.5, preroll_seconds=0.3,
+                 stale_seconds=30.0):
+        self.on_realtime_text = on_realtime_text
+        self.on_full_sentence_text = on_full_sentence_text
+        self.on_speech_start = on_speech_start
+        self.service_url = service_url or os.getenv("KAIRA_STT_SERVICE_URL", STT_SERVICE_URL)
+        self.kiosk_id = kiosk_id or os.getenv("KAIRA_KIOSK_ID", socket.gethostname())
+        self.sample_rate = sample_rate
+        self.post_speech_silence_duration = post_speech_silence_duration
+        self.stale_seconds = stale_seconds  # Give up on a final after this long (service restarted, ...)
+
+        self.frame_samples = sample_rate // 50  # 20 ms VAD frames
+        self.gate = EnergyGate(sample_rate=sample_rate, hangover_frames=0, use_webrtc_vad=True)
+        self._remainder = np.zeros(0, dtype=np.int16)
+        self._preroll = deque(maxlen=max(1, int(preroll_seconds * 50)))
+        self._utterance_id = None
+        self._silence_frames = 0
+        self._live_utterances = set()  # Sent, final not yet received (and not aborted)
+        self._feed_lock = threading.Lock()
+        self._outbox = queue.Queue()
+
+        self.ready = threading.Event()  # Nothing to load on the kiosk
+        self.ready.set()
+        self.load_seconds = 0.0
+        self.is_running = False
+        self.io_thread = None
+
+        # --- Stats ---
+        self.utterances = 0
+        self.final_latency_ms = 0.0  # End sent -> final received, for the last utterance
+        self.expired_utterances = 0
+        self._end_sent = {}
+
+    def describe(self):
+        return f"remote service={self.service_url} kiosk={self.kiosk_id}"
+
+    def start(self):
+        if self.is_running:
+            return
+        self.is_running = True
+        self.io_thread = threading.Thread(target=self._io_loop, daemon=True)
+        self.io_thread.start()
+        logger.info(f"STT client started ({self.describe()}).")
+
+    def stop(self):
+        if not self.is_running:
+            return
+        logger.info("Stopping STT client...")
+        self.abort()
+        self.is_running = False
+        if self.io_thread:
+            self.io_thread.join(timeout=2.0)
+        logger.info("STT client stopped.")
+
+    def abort(self):
+        """Discards the utterance currently being recorded without transcribing it."""
+        with self._feed_lock:
+            if self._utterance_id:
+                self._live_utterances.discard(self._utterance_id)
+                self._outbox.put(encode_stt_audio("abort", self.kiosk_id, self._utterance_id))
+            self._reset_utterance()
+
+    def set_post_speech_silence(self, seconds):
+        self.post_speech_silence_duration = seconds
+
+    def _reset_utterance(self):
+        self._utterance_id = None
+        self._silence_frames = 0
+        self._preroll.clear()
+
+    def feed_audio(self, audio_chunk):
+        """Feeds a raw audio chunk (int16 bytes); runs VAD and endpointing on 20 ms frames."""
+        if not (self.is_running and audio_chunk):
+            return
+        with self._feed_lock:
+            samples = np.concatenate((self._remainder, np.frombuffer(audio_chunk, dtype=np.int16)))
+            n = len(samples) // self.frame_samples * self.frame_samples
+            self._remainder = samples[n:]
+            outgoing = []
+            for start in range(0, n, self.frame_samples):
+                frame = samples[start:start + self.frame_samples]
+                speech = self.gate.process(frame)
+                if self._utterance_id is None:
+                    self._preroll.append(frame)
+                    if speech:
+                        self._start_utterance()
+                        outgoing.extend(self._preroll)
+                    continue
+                outgoing.append(frame)
+                self._silence_frames = 0 if speech else self._silence_frames + 1
+                if self._silence_frames * self.frame_samples / self.sample_rate >= self.post_speech_silence_duration:
+                    self._send_audio(outgoing)
+                    outgoing = []
+                    self._end_utterance()
+            self._send_audio(outgoing)
+
+    def _start_utterance(self):
+        self._utterance_id = uuid.uuid4().hex[:12]
+        self._live_utterances.add(self._utterance_id)
+        self._silence_frames = 0
+        self.utterances += 1
+        if self.on_speech_start:
+            self.on_speech_start()
+
+    def _end_utterance(self):
+        self._end_sent[self._utterance_id] = time.perf_counter()
+        self._outbox.put(encode_stt_audio("end", self.kiosk_id, self._utterance_id))
+        self._reset_utterance()
+
+    def _send_audio(self, frames):
+        if frames and self._utterance_id:
+            self._outbox.put(encode_stt_audio("audio", self.kiosk_id, self._utterance_id, np.concatenate(frames),
+                                              sample_rate=self.sample_rate))
+
+    def _on_result(self, payload):
+        result = decode_stt_result(payload)
+        utterance_id = result['utterance_id']
+        if utterance_id not in self._live_utterances:
+            return  # Aborted in the meantime
+        text = result['text'].strip()
+        if result['type'] == 'partial':
+            if self.on_realtime_text and text:
+                self.on_realtime_text(text)
+            return
+        self._live_utterances.discard(utterance_id)
+        sent = self._end_sent.pop(utterance_id, None)
+        if sent is not None:
+            self.final_latency_ms = (time.perf_counter() - sent) * 1000
+        logger.info(f"Detected full sentence: {text} "
+                    f"(batch of {result['batch_size']}, {result['inference_ms']:.0f} ms inference)")
+        if text and self.on_full_sentence_text:
+            self.on_full_sentence_text(text)
+
+    def _expire_stale(self):
+        """Forgets ended utterances whose final never came, as the service drops stale ones."""
+        now = time.perf_counter()
+        with self._feed_lock:
+            for utterance_id, sent in list(self._end_sent.items()):
+                if now - sent > self.stale_seconds:
+                    del self._end_sent[utterance_id]
+                    self._live_utterances.discard(utterance_id)
+                    self.expired_utterances += 1
+                    logger.warning(f"No final for utterance {utterance_id} after {self.stale_seconds:.0f}s; dropping it.")
+
+    def _io_loop(self):
+        context = zmq.Context.instance()
+        dealer = context.socket(zmq.DEALER)
+        dealer.setsockopt(zmq.IDENTITY, f"{self.kiosk_id}-{uuid.uuid4().hex[:6]}".encode("utf-8"))
+        dealer.setsockopt(zmq.LINGER, 0)
+        dealer.connect(self.service_url)
+        last_expiry = time.perf_counter()
+        try:
+            while True:
+                try:
+                    while True:
+                        dealer.send_multipart(self._outbox.get_nowait(), copy=False)
+                except queue.Empty:
+                    pass
+                if not self.is_running:
+                    break  # Outbox flushed (including a final abort)
+                if dealer.poll(10):
+                    try:
+                        self._on_result(dealer.recv())
+                    except Exception as e:
+                        logger.error(f"Error handling STT result: {e}")
+                if time.perf_counter() - last_expiry > 1.0:
+                    self._expire_stale()
+                    last_expiry = time.perf_counter()
+        finally:
+            dealer.close()
@@ -2,8 +2,9 @@
 
 import threading
 import logging
+import os
 import sys
-from RealtimeSTT import AudioToTextRecorder
+import time
 
 # --- Basic Setup (Unchanged) ---
 logging.basicConfig(
@@ -18,6 +19,12 @@ class STTProcessor:
     """
     Manages the RealtimeSTT recorder.
     Receives audio chunks manually.
+
+    Whisper settings come from the constructor or KAIRA_STT_* environment
+    variables: final/realtime model, compute type ('int8', 'float32', ...),
+    beam sizes and CPU threads. Run bench_stt.py to compare them. Models are
+    loaded on the processing thread after start(), not in __init__; audio
+    fed while they load is held and replayed once the recorder is ready.
     """
     
     # --- RECORDER CONFIG MODIFIED ---
@@ -25,7 +32,6 @@ class STTProcessor:
         'spinner': False,
         'use_microphone': False, # <-- ROLLED BACK
         # "input_device_index": 5,
-        'model': 'small',
         'language': 'en',
         'silero_sensitivity': 0.5,
         'webrtc_sensitivity': 1,
@@ -34,25 +40,77 @@ class STTProcessor:
         'min_gap_between_recordings': 0,
         'enable_realtime_transcription': True,
         'realtime_processing_pause': 0,
-        'realtime_model_type': 'tiny.en',
         # --- Wake Word Config REMOVED ---
     }
 
-    def __init__(self, on_realtime_text, on_full_sentence_text): # <-- Removed wakeword callback
+    max_pending_bytes = 16000 * 2 * 10  # Audio held while the models load (10 s at 16 kHz)
+
+    def __init__(self, on_realtime_text, on_full_sentence_text, on_speech_start=None, model=None,
+                 realtime_model=None, compute_type=None, beam_size=None, realtime_beam_size=None,
+                 cpu_threads=None, device=None):
         self.on_realtime_text = on_realtime_text
         self.on_full_sentence_text = on_full_sentence_text
-        
-        # --- Callbacks MODIFIED ---
-        self.recorder_config['on_realtime_transcription_stabilized'] = self._realtime_callback
-        # --- Removed wakeword callback ---
-        
-        logging.info("Initializing RealtimeSTT (manual audio feed)...")
-        self.recorder = AudioToTextRecorder(**self.recorder_config)
-        logging.info("RealtimeSTT initialized.")
+        self.on_speech_start = on_speech_start
+
+        # --- Whisper settings ---
+        self.model = model or os.getenv("KAIRA_STT_MODEL", "small")
+        self.realtime_model = realtime_model or os.getenv("KAIRA_STT_REALTIME_MODEL", "tiny.en")
+        self.compute_type = compute_type or os.getenv("KAIRA_STT_COMPUTE_TYPE", "default")
+        self.beam_size = beam_size or int(os.getenv("KAIRA_STT_BEAM_SIZE", "5"))
+        self.realtime_beam_size = realtime_beam_size or int(os.getenv("KAIRA_STT_REALTIME_BEAM_SIZE", "3"))
+        # 0 leaves CTranslate2's default (4 threads, or OMP_NUM_THREADS)
+        self.cpu_threads = cpu_threads if cpu_threads is not None else int(os.getenv("KAIRA_STT_THREADS", "0"))
+        self.device = device or os.getenv("KAIRA_STT_DEVICE")
+
+        self.recorder_config = dict(STTProcessor.recorder_config)
+        self.recorder_config.update({
+            'model': self.model,
+            'realtime_model_type': self.realtime_model,
+            'compute_type': self.compute_type,
+            'beam_size': self.beam_size,
+            'beam_size_realtime': self.realtime_beam_size,
+            # --- Callbacks MODIFIED ---
+            'on_realtime_transcription_stabilized': self._realtime_callback,
+            'on_recording_start': self._recording_start_callback,
+        })
+        if self.device:
+            self.recorder_config['device'] = self.device
+
+        self.recorder = None
+        self.ready = threading.Event()  # Set once the models are loaded
+        self.load_seconds = None
+        self._pending_audio = []
+        self._pending_bytes = 0
+        self._feed_lock = threading.Lock()
         
         self.is_running = False
         self.processing_thread = None
 
+    def describe(self):
+        return (f"model={self.model} realtime={self.realtime_model} compute={self.compute_type} "
+                f"beam={self.beam_size}/{self.realtime_beam_size} threads={self.cpu_threads or 'default'}")
+
+    def _load_recorder(self):
+        """Creates the recorder (loads both Whisper models) and replays audio fed in the meantime."""
+        from RealtimeSTT import AudioToTextRecorder  # Not needed on kiosks using stt_service.py
+
+        logging.info(f"Initializing RealtimeSTT (manual audio feed, {self.describe()})...")
+        if self.cpu_threads:
+            # RealtimeSTT does not pass cpu_threads through to faster-whisper;
+            # CTranslate2 reads this when its transcription process loads the model
+            os.environ["OMP_NUM_THREADS"] = str(self.cpu_threads)
+        start = time.perf_counter()
+        recorder = AudioToTextRecorder(**self.recorder_config)
+        self.load_seconds = time.perf_counter() - start
+        with self._feed_lock:
+            for chunk in self._pending_audio:
+                recorder.feed_audio(chunk)
+            self._pending_audio = []
+            self._pending_bytes = 0
+            self.recorder = recorder
+        self.ready.set()
+        logging.info(f"RealtimeSTT initialized in {self.load_seconds:.1f}s.")
+
     # --- wakeword_callback REMOVED ---
 
     def _realtime_callback(self, text):
@@ -60,11 +118,26 @@ class STTProcessor:
         if self.on_realtime_text:
             self.on_realtime_text(text)
 
+    def _recording_start_callback(self):
+        """RealtimeSTT's VAD heard speech and started recording the utterance."""
+        if self.on_speech_start:
+            self.on_speech_start()
+
+    def set_post_speech_silence(self, seconds):
+        """Silence that ends the current utterance; RealtimeSTT re-reads it while waiting."""
+        if self.recorder:
+            self.recorder.post_speech_silence_duration = seconds
+
     def _processing_loop(self):
         """
         The main loop for the recorder thread.
         """
         logging.info("STT processing thread started.")
+        try:
+            self._load_recorder()
+        except Exception as e:
+            logging.error(f"Failed to initialize RealtimeSTT: {e}")
+            self.is_running = False
         while self.is_running:
             try:
                 # This call will block until audio is fed
@@ -101,10 +174,19 @@ class STTProcessor:
         self.is_running = False
         if self.recorder:
             self.recorder.stop() 
+            self.recorder.shutdown()
         if self.processing_thread:
             self.processing_thread.join(timeout=2.0)
         logging.info("STT processor stopped.")
 
+    def abort(self):
+        """Discards the utterance currently being recorded without transcribing it."""
+        if self.is_running and self.recorder:
+            try:
+                self.recorder.abort()
+            except Exception as e:
+                logging.error(f"Error aborting STT recording: {e}")
+
     # --- feed_audio method ADDED BACK ---
     def feed_audio(self, audio_chunk):
         """
@@ -112,6 +194,18 @@ class STTProcessor:
         """
         if self.is_running and audio_chunk:
             try:
+                if self.recorder is None:
+                    with self._feed_lock:
+                        if self.recorder is None:
+                            self._hold_audio(audio_chunk)
+                            return
                 self.recorder.feed_audio(audio_chunk)
             except Exception as e:
-                logging.error(f"Error feeding audio to STT: {e}")
\ No newline at end of file
+                logging.error(f"Error feeding audio to STT: {e}")
+
+    def _hold_audio(self, audio_chunk):
+        """Keeps the newest max_pending_bytes of audio until the recorder exists."""
+        self._pending_audio.append(audio_chunk)
+        self._pending_bytes += len(audio_chunk)
+        while self._pending_bytes > self.max_pending_bytes:
+            self._pending_bytes -= len(self._pending_audio.pop(0))
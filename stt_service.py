@@ -0,0 +1,280 @@
+"""
+KAIRA STT Service - pooled Whisper for several kiosks
+Receives utterance audio from kiosks over ZMQ (ROUTER socket, see
+stt_client.RemoteSTTProcessor), batches the realtime (partial) and final
+transcription passes of all concurrent utterances through one
+faster-whisper model, and streams the text back to each kiosk.
+
+Kiosks do their own VAD and endpointing and tell the service when an
+utterance ends, so the service only transcribes. Finals are always served
+before partials; partials for an utterance are re-run about every
+--partial-interval seconds, only when new audio arrived, and ones that are
+nearly due are pulled into the same batch.
+
+Usage:
+  python stt_service.py --model small --compute-type int8 --threads 8
+  (kiosks: KAIRA_STT_SERVICE_URL=tcp://<host>:5561 python main.py)
+"""
+
+import argparse
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import zmq
+
+from kaira_messages import decode_stt_audio, encode_stt_result
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+STT_SERVICE_BIND_URL = "tcp://0.0.0.0:5561"
+SAMPLE_RATE = 16000
+MAX_WINDOW_SECONDS = 30  # Whisper's input window; longer utterances fall back to chunked transcribe()
+
+
+class WhisperBatcher:
+    """
+    One faster-whisper model that transcribes a list of utterances per call.
+
+    Utterances up to 30 s are padded to Whisper's window, encoded as one
+    batch and decoded with a single CTranslate2 generate() call, so N
+    concurrent speakers cost roughly one pass instead of N. Longer audio,
+    or a faster-whisper version whose internals differ, falls back to
+    model.transcribe() one utterance at a time.
+    """
+
+    def __init__(self, model_size: str = "small", device: str = "cpu", compute_type: str = "int8",
+                 cpu_threads: int = 0, language: str = "en"):
+        from faster_whisper import WhisperModel
+
+        self.language = language
+        self.model = WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+        try:
+            from faster_whisper.audio import pad_or_trim
+            from faster_whisper.tokenizer import Tokenizer
+
+            self._pad_or_trim = pad_or_trim
+            self.tokenizer = Tokenizer(self.model.hf_tokenizer, self.model.model.is_multilingual,
+                                       task="transcribe", language=language)
+            self.prompt = self.model.get_prompt(self.tokenizer, [], without_timestamps=True)
+            self.batched = True
+        except (ImportError, AttributeError, TypeError) as e:
+            logger.warning(f"Batched decoding unavailable in this faster-whisper ({e}); transcribing one by one.")
+            self.batched = False
+
+    def transcribe(self, audios: List[np.ndarray], beam_size: int) -> List[str]:
+        """audios: float32 mono 16 kHz arrays in [-1, 1]. Returns one text per utterance."""
+        if not audios:
+            return []
+        fits = [len(a) <= MAX_WINDOW_SECONDS * SAMPLE_RATE for a in audios]
+        texts: List[Optional[str]] = [None] * len(audios)
+        batch = [i for i, ok in enumerate(fits) if ok and self.batched]
+        if batch:
+            for i, text in zip(batch, self._generate([audios[i] for i in batch], beam_size)):
+                texts[i] = text
+        for i, text in enumerate(texts):
+            if text is None:
+                segments, _ = self.model.transcribe(audios[i], language=self.language, beam_size=beam_size,
+                                                    without_timestamps=True)
+                texts[i] = " ".join(segment.text.strip() for segment in segments)
+        return texts
+
+    def _generate(self, audios: List[np.ndarray], beam_size: int) -> List[str]:
+        features = np.stack([self._pad_or_trim(self.model.feature_extractor(audio)) for audio in audios])
+        encoded = self.model.encode(features)
+        results = self.model.model.generate(
+            encoded,
+            [self.prompt] * len(audios),
+            beam_size=beam_size,
+            max_length=self.model.max_length,
+            suppress_blank=True,
+            suppress_tokens=[-1],
+        )
+        eot = self.tokenizer.eot
+        return [self.tokenizer.decode([t for t in r.sequences_ids[0] if t < eot]).strip() for r in results]
+
+
+class Utterance:
+    def __init__(self, kiosk_id: str, utterance_id: str, route: bytes):
+        self.kiosk_id = kiosk_id
+        self.utterance_id = utterance_id
+        self.route = route  # ROUTER identity of the kiosk's socket
+        self.chunks: List[np.ndarray] = []
+        self.samples = 0
+        self.ended = False
+        self.ended_at = 0.0
+        self.last_audio_time = time.time()
+        self.partial_samples = 0   # Audio length the last partial covered
+        self.last_partial_time = 0.0
+        self.last_partial_text = ""
+
+    def append(self, samples: np.ndarray):
+        self.chunks.append(samples)
+        self.samples += len(samples)
+        self.last_audio_time = time.time()
+
+    def audio(self, max_seconds: Optional[float] = None) -> np.ndarray:
+        if len(self.chunks) > 1:
+            self.chunks = [np.concatenate(self.chunks)]
+        audio = self.chunks[0] if self.chunks else np.zeros(0, dtype=np.int16)
+        if max_seconds is not None:
+            audio = audio[-int(max_seconds * SAMPLE_RATE):]
+        return audio.astype(np.float32) / 32768.0
+
+
+class STTService:
+    def __init__(self, context: zmq.Context, batcher: WhisperBatcher, bind_url: str = STT_SERVICE_BIND_URL,
+                 beam_size: int = 5, partial_beam_size: int = 1, partial_interval: float = 0.3,
+                 max_batch: int = 8, stale_seconds: float = 30.0):
+        self.batcher = batcher
+        self.beam_size = beam_size
+        self.partial_beam_size = partial_beam_size
+        self.partial_interval = partial_interval
+        self.max_batch = max_batch
+        self.stale_seconds = stale_seconds
+        self.socket = context.socket(zmq.ROUTER)
+        self.socket.bind(bind_url)
+        self.utterances: Dict[Tuple[str, str], Utterance] = {}
+
+        # --- Stats ---
+        self.batches = {'partial': 0, 'final': 0}
+        self.batched_utterances = {'partial': 0, 'final': 0}
+        self.inference_seconds = 0.0
+        self.audio_seconds_transcribed = 0.0
+
+    def _on_message(self, route: bytes, parts):
+        try:
+            meta, samples = decode_stt_audio(parts)
+        except Exception as e:
+            logger.error(f"Dropping malformed STT message: {e}")
+            return
+        key = (meta['kiosk_id'], meta['utterance_id'])
+        if meta['type'] == 'abort':
+            self.utterances.pop(key, None)
+            return
+        utterance = self.utterances.get(key)
+        if utterance is None:
+            utterance = self.utterances[key] = Utterance(meta['kiosk_id'], meta['utterance_id'], route)
+        if meta['type'] == 'audio':
+            utterance.append(samples)
+        else:  # 'end'
+            utterance.ended = True
+            utterance.ended_at = time.time()
+
+    def _drain(self, timeout_ms: int):
+        """Receives everything queued; waits up to timeout_ms for the first message."""
+        if not self.socket.poll(timeout_ms):
+            return
+        while True:
+            try:
+                route, *parts = self.socket.recv_multipart(zmq.NOBLOCK)
+            except zmq.Again:
+                return
+            self._on_message(route, parts)
+
+    def _run_batch(self, kind: str, batch: List[Utterance]):
+        window = None if kind == 'final' else MAX_WINDOW_SECONDS
+        audios = [u.audio(window) for u in batch]
+        start = time.perf_counter()
+        texts = self.batcher.transcribe(audios, self.beam_size if kind == 'final' else self.partial_beam_size)
+        elapsed = time.perf_counter() - start
+        self.batches[kind] += 1
+        self.batched_utterances[kind] += len(batch)
+        self.inference_seconds += elapsed
+        self.audio_seconds_transcribed += sum(len(a) for a in audios) / SAMPLE_RATE
+
+        for utterance, audio, text in zip(batch, audios, texts):
+            if kind == 'partial':
+                utterance.partial_samples = utterance.samples  # Not len(audio): partials are trimmed to 30 s
+                utterance.last_partial_time = time.time()
+                if not text or text == utterance.last_partial_text:
+                    continue
+                utterance.last_partial_text = text
+            else:
+                self.utterances.pop((utterance.kiosk_id, utterance.utterance_id), None)
+            message = encode_stt_result(kind, utterance.kiosk_id, utterance.utterance_id, text,
+                                        audio_seconds=len(audio) / SAMPLE_RATE, batch_size=len(batch),
+                                        inference_ms=elapsed * 1000)
+            self.socket.send_multipart([utterance.route, message])
+
+    def step(self) -> bool:
+        """Runs one batch (finals first); returns False if there was nothing to do."""
+        now = time.time()
+        for key, utterance in list(self.utterances.items()):
+            if now - utterance.last_audio_time > self.stale_seconds and not utterance.ended:
+                logger.warning(f"Dropping stale utterance {key}")
+                self.utterances.pop(key)
+
+        finals = sorted((u for u in self.utterances.values() if u.ended), key=lambda u: u.ended_at)
+        if finals:
+            self._run_batch('final', finals[:self.max_batch])
+            return True
+        waiting = [u for u in self.utterances.values() if u.samples > u.partial_samples]
+        if any(now - u.last_partial_time >= self.partial_interval for u in waiting):
+            # Bring forward partials that are nearly due so concurrent speakers share batches
+            partials = [u for u in waiting if now - u.last_partial_time >= self.partial_interval / 2]
+            partials.sort(key=lambda u: u.last_partial_time)  # Longest-waiting first
+            self._run_batch('partial', partials[:self.max_batch])
+            return True
+        return False
+
+    def stats(self):
+        return {
+            'active_utterances': len(self.utterances),
+            'batches': dict(self.batches),
+            'mean_batch_size': {k: self.batched_utterances[k] / self.batches[k] if self.batches[k] else 0.0
+                                for k in self.batches},
+            'realtime_factor': (self.inference_seconds / self.audio_seconds_transcribed
+                                if self.audio_seconds_transcribed else 0.0),
+        }
+
+    def run(self):
+        last_log_time = time.time()
+        busy = False
+        while True:
+            # Pick up everything that arrived during the last batch before choosing the next one
+            self._drain(0 if busy else 50)
+            busy = self.step()
+            if time.time() - last_log_time > 30:
+                logger.info(f"STT service stats: {self.stats()}")
+                last_log_time = time.time()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bind", default=os.getenv("KAIRA_STT_SERVICE_BIND", STT_SERVICE_BIND_URL))
+    parser.add_argument("--model", default=os.getenv("KAIRA_STT_MODEL", "small"))
+    parser.add_argument("--compute-type", default=os.getenv("KAIRA_STT_COMPUTE_TYPE", "int8"))
+    parser.add_argument("--device", default=os.getenv("KAIRA_STT_DEVICE", "cpu"))
+    parser.add_argument("--threads", type=int, default=int(os.getenv("KAIRA_STT_THREADS", "0")))
+    parser.add_argument("--beam-size", type=int, default=int(os.getenv("KAIRA_STT_BEAM_SIZE", "5")))
+    parser.add_argument("--partial-beam-size", type=int, default=1)
+    parser.add_argument("--partial-interval", type=float, default=0.3, help="Seconds between partials per utterance")
+    parser.add_argument("--max-batch", type=int, default=8)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🎙️  KAIRA STT SERVICE (pooled Whisper)")
+    print("=" * 60)
+    batcher = WhisperBatcher(args.model, device=args.device, compute_type=args.compute_type,
+                             cpu_threads=args.threads)
+    context = zmq.Context()
+    service = STTService(context, batcher, args.bind, beam_size=args.beam_size,
+                         partial_beam_size=args.partial_beam_size, partial_interval=args.partial_interval,
+                         max_batch=args.max_batch)
+    print(f"📡 Listening for kiosk audio on {args.bind} "
+          f"(model={args.model}, compute={args.compute_type}, batched={batcher.batched})")
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        print("\n⚡ STT service stopped.")
+    finally:
+        service.socket.close(linger=0)
+        context.term()
+
+
+if __name__ == "__main__":
+    main()
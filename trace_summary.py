@@ -0,0 +1,105 @@
+"""
+Voice turn latency report.
+Merges the per-process trace lines in voice_traces.jsonl by trace id and
+prints the mouth-to-ear latency breakdown (end of user speech -> first
+audio out of the speaker) across all complete turns.
+
+Usage: python trace_summary.py [--path voice_traces.jsonl] [--last N]
+"""
+
+import argparse
+import json
+from collections import OrderedDict
+
+import numpy as np
+
+from voice_trace import TRACE_LOG_PATH
+
+# Stages in the order a turn passes through them, with the segment name
+# that ends at each stage.
+STAGES = [
+    ("wake_word", None),
+    ("follow_up", None),  # Turn started by speech in the follow-up window instead
+    ("speech_start", "wait for speech"),
+    ("stt_final", "speech + endpointing"),
+    ("prompt_sent", "prompt push"),
+    ("prompt_received", "ZMQ delivery"),
+    ("retrieval_done", "retrieval / context"),
+    ("gemini_connected", "Gemini connect"),
+    ("gemini_first_byte", "Gemini first byte"),
+    ("audio_received", "data channel delivery"),
+    ("playback_start", "playback queue"),
+]
+
+
+def load_traces(path):
+    traces = OrderedDict()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            trace = traces.setdefault(record["trace_id"], {"spans": {}, "flags": set()})
+            trace["spans"].update(record.get("spans", {}))
+            for flag in ("cached", "cancelled", "follow_up"):
+                if record.get(flag):
+                    trace["flags"].add(flag)
+    return traces
+
+
+def segment_durations(spans):
+    """Milliseconds between consecutive stages that are present in this trace."""
+    durations = {}
+    previous = None
+    for stage, segment in STAGES:
+        if stage not in spans:
+            continue
+        if previous is not None and segment:
+            durations[segment] = (spans[stage] - spans[previous]) * 1000
+        previous = stage
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=str(TRACE_LOG_PATH))
+    parser.add_argument("--last", type=int, default=0, help="Only report the last N turns")
+    args = parser.parse_args()
+
+    traces = load_traces(args.path)
+    complete = [
+        t for t in traces.values()
+        if "stt_final" in t["spans"] and "playback_start" in t["spans"] and "cancelled" not in t["flags"]
+    ]
+    if args.last:
+        complete = complete[-args.last:]
+
+    print(f"Traces: {len(traces)} total, {len(complete)} complete turns")
+    if not complete:
+        return
+
+    segments = OrderedDict((segment, []) for _, segment in STAGES if segment)
+    mouth_to_ear = []
+    for trace in complete:
+        for segment, ms in segment_durations(trace["spans"]).items():
+            segments[segment].append(ms)
+        mouth_to_ear.append((trace["spans"]["playback_start"] - trace["spans"]["stt_final"]) * 1000)
+
+    cached = sum(1 for t in complete if "cached" in t["flags"])
+    follow_ups = sum(1 for t in complete if "follow_up" in t["flags"])
+    print(f"Served from cache: {cached}/{len(complete)}")
+    print(f"Follow-up turns (no wake word): {follow_ups}/{len(complete)}")
+    print()
+    print(f"{'segment':<24}{'n':>5}{'mean ms':>10}{'p50 ms':>10}{'p90 ms':>10}")
+    for segment, values in segments.items():
+        if values:
+            v = np.array(values)
+            print(f"{segment:<24}{len(v):>5}{v.mean():>10.0f}{np.percentile(v, 50):>10.0f}{np.percentile(v, 90):>10.0f}")
+    v = np.array(mouth_to_ear)
+    print("-" * 59)
+    print(f"{'mouth-to-ear':<24}{len(v):>5}{v.mean():>10.0f}{np.percentile(v, 50):>10.0f}{np.percentile(v, 90):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
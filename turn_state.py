@@ -0,0 +1,79 @@
+# turn_state.py
+
+import time
+from typing import Dict, Iterable, Optional
+
+from state_store import StateStore
+
+# Listening states, as published in the state's 'listening_state'
+WAITING = "WAITING"      # Idle; a turn needs the wake word (or the mic button)
+LISTENING = "LISTENING"  # Recording the user's turn
+THINKING = "THINKING"    # Prompt sent, no answer text yet
+SPEAKING = "SPEAKING"    # Answer streaming in and/or still playing
+FOLLOW_UP = "FOLLOW_UP"  # Answer finished; speech starts a new turn without the wake word
+
+STATES = (WAITING, LISTENING, THINKING, SPEAKING, FOLLOW_UP)
+
+
+class TurnStateMachine:
+    """
+    Explicit listening state of the kiosk, kept in the StateStore so the UI
+    and the state publisher see every change.
+
+    transition() is a compare-and-set done under the store's writer lock:
+    with `expected`, it only moves if the current state is one of those, so
+    a stale decision from another thread (a late answer chunk, a follow-up
+    window timing out as speech starts) is dropped instead of applied. Extra
+    state changes passed along are published in the same version. Counts
+    per "FROM->TO" and per reason, and the time spent in each state, are
+    kept for metrics.
+    """
+
+    def __init__(self, store: StateStore, key: str = "listening_state"):
+        self.store = store
+        self.key = key
+        self.entered_at = time.monotonic()
+        self.transitions: Dict[str, int] = {}
+        self.reasons: Dict[str, int] = {}
+        self.seconds_in_state = {state: 0.0 for state in STATES}
+
+    @property
+    def state(self) -> str:
+        return self.store[self.key]
+
+    def seconds_in_current(self) -> float:
+        return time.monotonic() - self.entered_at
+
+    def transition(self, to: str, reason: str, expected: Optional[Iterable[str]] = None, **changes) -> bool:
+        """Moves to `to` (publishing `changes` with it); returns False if the current state was not expected."""
+        if to not in STATES:
+            raise ValueError(f"Unknown listening state: {to}")
+        moved = []
+
+        def apply(data):
+            current = data[self.key]
+            if expected is not None and current not in expected:
+                return {}
+            moved.append(current)
+            if current != to:
+                now = time.monotonic()
+                self.seconds_in_state[current] = self.seconds_in_state.get(current, 0.0) + now - self.entered_at
+                self.entered_at = now
+                edge = f"{current}->{to}"
+                self.transitions[edge] = self.transitions.get(edge, 0) + 1
+                self.reasons[reason] = self.reasons.get(reason, 0) + 1
+            return {**changes, self.key: to}
+
+        self.store.modify(apply)
+        return bool(moved)
+
+    def metrics(self):
+        seconds = dict(self.seconds_in_state)
+        current = self.state
+        seconds[current] = seconds.get(current, 0.0) + self.seconds_in_current()
+        return {
+            'state': current,
+            'transitions': dict(self.transitions),
+            'reasons': dict(self.reasons),
+            'seconds_in_state': seconds,
+        }
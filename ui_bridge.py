@@ -0,0 +1,197 @@
+# ui_bridge.py
+"""
+Runs KAIRAUI in a separate process so rendering never competes with the
+audio callbacks, openwakeword and Whisper for the core process's GIL.
+
+The core process owns a multiprocessing.shared_memory segment holding:
+  - a seqlock-protected copy of the latest state snapshot (version + JSON),
+  - the mic input level,
+  - the playback envelope itself (the output callback writes straight into it).
+The UI process attaches a RemoteCore to that segment, which offers the same
+methods KAIRAUI uses on KAIRACore; button/keyboard commands go back over a
+multiprocessing Pipe and are applied by a bridge thread in the core process.
+"""
+
+import json
+import logging
+import multiprocessing as mp
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+from audio_playback import PlaybackEnvelope
+from state_store import StateSnapshot
+
+logger = logging.getLogger(__name__)
+
+ENVELOPE_CAPACITY = 256
+STATE_BYTES = 64 * 1024
+# Header: state seqlock (uint64), state version (int64), payload length (uint32), input level (float32)
+HEADER = struct.Struct("<QqIf")
+ENVELOPE_OFFSET = HEADER.size
+STATE_OFFSET = ENVELOPE_OFFSET + PlaybackEnvelope.nbytes(ENVELOPE_CAPACITY)
+SEGMENT_BYTES = STATE_OFFSET + STATE_BYTES
+
+
+class UIProcessBridge:
+    """Core-process side: publishes state into shared memory and applies UI commands."""
+
+    def __init__(self, core):
+        self.core = core
+        self.shm = shared_memory.SharedMemory(create=True, size=SEGMENT_BYTES)
+        self._header = self.shm.buf[:HEADER.size]
+        HEADER.pack_into(self._header, 0, 0, -1, 0, 0.0)
+        # The playback callback now writes its envelope directly into the segment
+        self.core.playback_envelope = PlaybackEnvelope(
+            ENVELOPE_CAPACITY, buffer=self.shm.buf[ENVELOPE_OFFSET:STATE_OFFSET]
+        )
+        # Spawn, not fork: by the time the UI starts, the core's audio, ZMQ and
+        # model threads are running, and a forked child could inherit their held
+        # locks (and pygame/SDL would inherit the parent's state)
+        ctx = mp.get_context("spawn")
+        self.commands, child_commands = ctx.Pipe()
+        self.process = ctx.Process(target=run_ui_process, args=(self.shm.name, child_commands), daemon=True)
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self._running = False
+        self._seq = 0
+
+    def start(self):
+        self._running = True
+        self._write_state(self.core.get_state())
+        self.process.start()
+        self.thread.start()
+        logger.info(f"UI process started (pid {self.process.pid}, shared memory {self.shm.name})")
+
+    def wait(self):
+        """Blocks until the UI process exits (window closed or ESC)."""
+        self.process.join()
+
+    def _write_state(self, snapshot: StateSnapshot):
+        data = dict(snapshot.data)
+        payload = json.dumps(data).encode("utf-8")
+        # Only the answer text grows without bound; keep its tail until the
+        # snapshot fits (never cut the JSON itself, the reader must parse it)
+        while len(payload) > STATE_BYTES and data.get('kaira_response_text'):
+            text = data['kaira_response_text']
+            data['kaira_response_text'] = text[max(1, (len(payload) - STATE_BYTES) // 6, len(text) // 8):]
+            payload = json.dumps(data).encode("utf-8")
+        if len(payload) > STATE_BYTES:
+            logger.error(f"State snapshot {snapshot.version} does not fit in shared memory ({len(payload)} bytes); skipped.")
+            return
+        # Seqlock: odd while writing, so readers retry instead of seeing a torn copy
+        self._seq += 1
+        struct.pack_into("<Q", self._header, 0, self._seq)
+        self.shm.buf[STATE_OFFSET:STATE_OFFSET + len(payload)] = payload
+        struct.pack_into("<qI", self._header, 8, snapshot.version, len(payload))
+        self._seq += 1
+        struct.pack_into("<Q", self._header, 0, self._seq)
+
+    def _apply_command(self, command):
+        name, args = command[0], command[1:]
+        if name == "start_recording":
+            self.core.start_recording()
+        elif name == "clear_captions":
+            version, user, kaira = args
+            self.core.clear_captions(version, user=user, kaira=kaira)
+        elif name == "quit":
+            self._running = False
+        else:
+            logger.warning(f"Unknown UI command: {name}")
+
+    def _worker(self):
+        version = None
+        while self._running:
+            snapshot = self.core.state.wait_for_change(version if version is not None else -1, timeout=1 / 60)
+            if snapshot.version != version:
+                version = snapshot.version
+                self._write_state(snapshot)
+            struct.pack_into("<f", self._header, 20, self.core.input_level)
+            try:
+                while self.commands.poll():
+                    self._apply_command(self.commands.recv())
+            except (EOFError, OSError):
+                break  # UI process went away
+
+    def stop(self):
+        self._running = False
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=2.0)
+        if self.thread.is_alive():
+            self.thread.join(timeout=1.0)
+        # Release every view into the segment before closing it
+        self.core.playback_envelope = PlaybackEnvelope(ENVELOPE_CAPACITY)
+        self._header.release()
+        try:
+            self.shm.close()
+        except BufferError:
+            logger.warning("Shared memory still referenced; leaving it to process exit.")
+        self.shm.unlink()
+
+
+class RemoteCore:
+    """UI-process stand-in for KAIRACore, backed by the shared segment and command pipe."""
+
+    def __init__(self, shm_name: str, commands):
+        self.shm = shared_memory.SharedMemory(name=shm_name)
+        self.commands = commands
+        self._header = self.shm.buf[:HEADER.size]
+        self.playback_envelope = PlaybackEnvelope(
+            ENVELOPE_CAPACITY, buffer=self.shm.buf[ENVELOPE_OFFSET:STATE_OFFSET], initialize=False
+        )
+        self._snapshot = StateSnapshot(-1, {})
+        self._last_clear = None
+
+    @property
+    def input_level(self) -> float:
+        return struct.unpack_from("<f", self._header, 20)[0]
+
+    def get_state(self) -> StateSnapshot:
+        """Latest snapshot; only re-parses when the version in the header moved."""
+        for _ in range(10):
+            seq, version, length, _ = HEADER.unpack_from(self._header, 0)
+            if version == self._snapshot.version and seq % 2 == 0:
+                return self._snapshot
+            if seq % 2:
+                time.sleep(0)
+                continue
+            payload = bytes(self.shm.buf[STATE_OFFSET:STATE_OFFSET + length])
+            if struct.unpack_from("<Q", self._header, 0)[0] == seq:
+                try:
+                    self._snapshot = StateSnapshot(version, json.loads(payload))
+                except ValueError as e:
+                    logger.error(f"Could not decode shared state version {version}: {e}")
+                break
+        return self._snapshot
+
+    def start_recording(self):
+        self.commands.send(("start_recording",))
+
+    def clear_captions(self, seen_version, user=False, kaira=False):
+        # The UI asks every frame until the new state arrives; send each request once
+        command = ("clear_captions", seen_version, user, bool(kaira))
+        if command != self._last_clear:
+            self._last_clear = command
+            self.commands.send(command)
+        return True
+
+    def close(self):
+        try:
+            self.commands.send(("quit",))
+        except (BrokenPipeError, OSError):
+            pass
+        self.playback_envelope = None
+        self._header.release()
+        self.shm.close()
+
+
+def run_ui_process(shm_name: str, commands):
+    """UI process entry point."""
+    from kaira_ui import KAIRAUI
+
+    core = RemoteCore(shm_name, commands)
+    try:
+        KAIRAUI(core).run()
+    finally:
+        core.close()
@@ -0,0 +1,244 @@
+# ui_render.py
+
+import heapq
+from collections import OrderedDict, deque
+
+import pygame
+
+
+class SurfaceCache:
+    """
+    Small LRU cache of pre-rendered surfaces. `get(key, build)` returns the
+    cached surface for key, calling build() only on a miss. With
+    enabled=False every call builds a fresh surface (the old behaviour),
+    which the UI benchmark uses as its baseline.
+    """
+
+    def __init__(self, max_items: int = 256, enabled: bool = True):
+        self.max_items = max_items
+        self.enabled = enabled
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0  # Surfaces created
+
+    def get(self, key, build):
+        if not self.enabled:
+            self.misses += 1
+            return build()
+        surface = self._items.get(key)
+        if surface is not None:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = build()
+        self._items[key] = surface
+        if len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+        return surface
+
+
+class SpriteCache(SurfaceCache):
+    """Glow, ring and mic-body sprites keyed by size and colour."""
+
+    def glow(self, mic_size: int, color) -> pygame.Surface:
+        """The three translucent glow layers around the mic, pre-composited."""
+        def build():
+            size = mic_size * 3
+            surface = pygame.Surface((size, size), pygame.SRCALPHA)
+            for i in range(3, 0, -1):
+                layer = pygame.Surface((size, size), pygame.SRCALPHA)
+                pygame.draw.circle(layer, (*color, int(100 / i)), (size // 2, size // 2), mic_size + i * 8)
+                surface.blit(layer, (0, 0))
+            return surface
+        return self.get(("glow", mic_size, color), build)
+
+    def ring(self, radius: int, color) -> pygame.Surface:
+        """Opaque particle ring; callers fade it with set_alpha() before blitting."""
+        def build():
+            size = radius * 2 + 10
+            surface = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.circle(surface, (*color, 255), (size // 2, size // 2), radius, 3)
+            return surface
+        return self.get(("ring", radius, color), build)
+
+    def mic_body(self, mic_size: int, color) -> pygame.Surface:
+        """Shaded mic head with its highlight."""
+        def build():
+            size = mic_size * 2 + 2
+            c = size // 2
+            surface = pygame.Surface((size, size), pygame.SRCALPHA)
+            for i in range(5):
+                shade = tuple(max(0, v - i * 20) for v in color)
+                pygame.draw.circle(surface, shade, (c, c - i), mic_size - i * 2)
+            highlight_offset = int(mic_size * 0.3)
+            pygame.draw.circle(surface, (255, 255, 255), (c - highlight_offset, c - highlight_offset), mic_size // 4)
+            return surface
+        return self.get(("mic_body", mic_size, color), build)
+
+
+class CaptionLayout:
+    """
+    Word-wrapped caption that grows incrementally.
+
+    Streaming responses only ever append to the text, so set_text() wraps
+    just the appended part onto the last (unfinished) line; finished lines
+    and their rendered surfaces are kept as they are. Anything that is not
+    an append (a new sentence, stabilized realtime text) is laid out from
+    scratch. Only the newest `max_lines` lines are kept and shown; when a
+    line scrolls off the top, `scroll` jumps by one line height and
+    advance() eases it back to 0 so the text slides up instead of jumping.
+
+    With incremental=False every set_text() re-wraps and re-renders the
+    whole text (the old behaviour, used as the benchmark baseline).
+    """
+
+    def __init__(self, font: pygame.font.Font, max_width: int, max_lines: int = 3,
+                 scroll_speed: float = 8.0, incremental: bool = True):
+        self.font = font
+        self.max_width = max_width
+        self.max_lines = max_lines
+        self.scroll_speed = scroll_speed  # Fraction of the remaining scroll removed per second
+        self.incremental = incremental
+        self.line_height = font.get_linesize()
+        self.text = ""
+        self.color = None
+        self.version = 0  # Bumped whenever the visible lines change
+        self.words_laid_out = 0  # Words re-wrapped in total (for benchmarks)
+        self.surfaces_rendered = 0
+        self._clear()
+
+    def _clear(self):
+        # Finished lines as [text, surface or None]. Together with the current
+        # line that is one more than fits, so the top one can scroll out.
+        self._lines = deque(maxlen=self.max_lines)
+        self._current = ""
+        self._current_surface = None
+        self._line_start = 0  # Offset in self.text where the current line begins
+        self._total_lines = 1
+        self.scroll = 0.0
+
+    def set_text(self, text: str, color):
+        if text == self.text and color == self.color and self.incremental:
+            return
+        if color != self.color:
+            self.color = color
+            for line in self._lines:
+                line[1] = None
+            self._current_surface = None
+        if not (self.incremental and text.startswith(self.text)):
+            self._clear()
+        self.text = text
+        self._wrap_current()
+        self.version += 1
+
+    def _wrap_current(self):
+        """Re-wraps the text from the start of the unfinished last line; earlier lines are final."""
+        words = self.text[self._line_start:].split(' ')
+        self.words_laid_out += len(words)
+        current_line = ""
+        offset = self._line_start
+        for word in words:
+            test_line = f"{current_line} {word}".strip()
+            if not current_line or self.font.size(test_line)[0] <= self.max_width:
+                current_line = test_line  # A word wider than the line gets a line of its own
+            else:
+                self._push_line(current_line)
+                current_line = word
+                self._line_start = offset
+            offset += len(word) + 1
+        self._current = current_line
+        self._current_surface = None
+
+    def _push_line(self, text: str):
+        self._lines.append([text, None])
+        self._total_lines += 1
+        if self._total_lines > self.max_lines:
+            self.scroll += self.line_height
+
+    def advance(self, dt: float):
+        """Eases the scroll offset back to 0; returns True while still moving."""
+        if self.scroll <= 0.5:
+            self.scroll = 0.0
+            return False
+        self.scroll *= max(0.0, 1.0 - self.scroll_speed * dt)
+        return True
+
+    @property
+    def visible_lines(self) -> int:
+        return min(self._total_lines, self.max_lines)
+
+    def rect(self, center_x: int, bottom_y: int) -> pygame.Rect:
+        """Area the caption occupies, bottom-aligned at bottom_y."""
+        height = self.visible_lines * self.line_height
+        return pygame.Rect(center_x - self.max_width // 2, bottom_y - height, self.max_width, height)
+
+    def draw(self, screen: pygame.Surface, center_x: int, bottom_y: int):
+        """Blits the newest lines bottom-up, clipped to rect() while scrolling."""
+        if not self.text:
+            return
+        clip = screen.get_clip()
+        screen.set_clip(clip.clip(self.rect(center_x, bottom_y)))
+        y = bottom_y - self.line_height // 2 + int(self.scroll)
+        if self._current_surface is None:
+            self._current_surface = self.font.render(self._current, True, self.color)
+            self.surfaces_rendered += 1
+        screen.blit(self._current_surface, self._current_surface.get_rect(center=(center_x, y)))
+        for line in reversed(self._lines):
+            y -= self.line_height
+            if line[1] is None:
+                line[1] = self.font.render(line[0], True, self.color)
+                self.surfaces_rendered += 1
+            screen.blit(line[1], line[1].get_rect(center=(center_x, y)))
+        screen.set_clip(clip)
+
+
+class FrameScheduler:
+    """
+    Decides how long the render loop may sleep before the next frame.
+
+    The loop runs at `active_fps` while something is animating and for
+    `linger_seconds` after the last wake(); otherwise it drops to
+    `idle_fps`. One-shot callbacks (blinks and the like) are kept on a
+    timeline and run from the loop via run_due(), which also shortens the
+    idle sleep so they fire on time instead of on the next idle tick.
+    """
+
+    def __init__(self, active_fps: int = 60, idle_fps: int = 10, linger_seconds: float = 0.5):
+        self.active_fps = active_fps
+        self.idle_fps = min(idle_fps, active_fps)
+        self.linger_seconds = linger_seconds
+        self._active_until = 0.0
+        self._events = []  # Heap of (due time, sequence, callback)
+        self._sequence = 0
+        self.active_frames = 0
+        self.idle_frames = 0
+
+    def wake(self, now: float):
+        """Keeps the loop at the active rate for at least linger_seconds from now."""
+        self._active_until = max(self._active_until, now + self.linger_seconds)
+
+    def is_active(self, now: float) -> bool:
+        return now < self._active_until
+
+    def at(self, due: float, callback):
+        """Runs callback() from the render loop once `due` (time.monotonic) has passed."""
+        self._sequence += 1
+        heapq.heappush(self._events, (due, self._sequence, callback))
+
+    def run_due(self, now: float):
+        while self._events and self._events[0][0] <= now:
+            _, _, callback = heapq.heappop(self._events)
+            callback()
+
+    def frame_wait(self, now: float, last_frame: float) -> float:
+        """Seconds from now until the next frame is due (counts the frame as active or idle)."""
+        if self.is_active(now):
+            self.active_frames += 1
+            due = last_frame + 1.0 / self.active_fps
+        else:
+            self.idle_frames += 1
+            due = last_frame + 1.0 / self.idle_fps
+            if self._events:
+                due = min(due, self._events[0][0])
+        return max(0.0, due - now)
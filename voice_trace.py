@@ -0,0 +1,93 @@
+# voice_trace.py
+
+import json
+import logging
+import threading
+import time
+import uuid
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_LOG_PATH = Path(__file__).resolve().parent / "voice_traces.jsonl"
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class TraceRecorder:
+    """
+    Records wall-clock timestamps for the stages of one voice turn.
+    Each process keeps its own spans for a trace id and appends them as one
+    JSON line when the turn finishes there; trace_summary.py merges the lines
+    from all processes by trace id. A process may open a trace with its
+    first mark (liveapi does), but marks for a trace it already finished
+    (late playback marks of a cancelled answer, say) are dropped, and at
+    most max_active traces are kept open.
+    """
+
+    def __init__(self, process_name: str, path: Path = TRACE_LOG_PATH, max_active: int = 32):
+        self.process_name = process_name
+        self.path = Path(path)
+        self.max_active = max_active
+        self._active: Dict[str, Dict] = {}
+        self._finished: "OrderedDict[str, None]" = OrderedDict()  # Recently finished ids, bounded
+        self._lock = threading.Lock()
+
+    def _open(self, trace_id: str, attrs: Dict) -> Dict:
+        """Creates an active trace (caller holds the lock)."""
+        if len(self._active) >= self.max_active:
+            # Drop the oldest unfinished trace rather than grow without bound
+            oldest = min(self._active, key=lambda t: self._active[t]["created"])
+            self._active.pop(oldest)
+        trace = self._active[trace_id] = {"created": time.time(), "spans": {}, "attrs": attrs}
+        return trace
+
+    def start(self, trace_id: str, **attrs):
+        with self._lock:
+            self._finished.pop(trace_id, None)
+            self._open(trace_id, attrs)
+
+    def mark(self, trace_id: Optional[str], stage: str, timestamp: Optional[float] = None):
+        """Records the first time a stage is reached for a trace."""
+        if not trace_id:
+            return
+        with self._lock:
+            trace = self._active.get(trace_id)
+            if trace is None:
+                if trace_id in self._finished:
+                    return
+                trace = self._open(trace_id, {})
+            trace["spans"].setdefault(stage, time.time() if timestamp is None else timestamp)
+
+    def has(self, trace_id: Optional[str], stage: str) -> bool:
+        with self._lock:
+            trace = self._active.get(trace_id)
+            return trace is not None and stage in trace["spans"]
+
+    def finish(self, trace_id: Optional[str], **attrs):
+        """Appends the trace to the JSON lines log and forgets it."""
+        if not trace_id:
+            return
+        with self._lock:
+            trace = self._active.pop(trace_id, None)
+            self._finished[trace_id] = None
+            while len(self._finished) > 4 * self.max_active:
+                self._finished.popitem(last=False)
+        if trace is None:
+            return
+        record = {
+            "trace_id": trace_id,
+            "process": self.process_name,
+            "spans": trace["spans"],
+            **trace["attrs"],
+            **attrs,
+        }
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except Exception as e:
+            logger.error(f"Failed to write trace {trace_id}: {e}")
@@ -0,0 +1,89 @@
+# wake_word.py
+
+import logging
+import os
+import wave
+
+import numpy as np
+from openwakeword.model import Model
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+WAKE_WORD_NAME = "hey_kairaa"
+STOP_WORD_NAME = "staup_kairaa"
+FRAMEWORK_EXTENSIONS = {"onnx": ".onnx", "tflite": ".tflite"}
+FRAME_SAMPLES = 1280  # 80 ms at 16 kHz, openwakeword's native frame size
+
+
+def model_path(name: str, framework: str) -> str:
+    if framework not in FRAMEWORK_EXTENSIONS:
+        raise ValueError(f"Unknown wake word framework '{framework}' (expected one of {list(FRAMEWORK_EXTENSIONS)})")
+    return os.path.join(MODEL_DIR, name + FRAMEWORK_EXTENSIONS[framework])
+
+
+def create_wake_word_model(framework: str = "onnx", ncpu: int = 1,
+                           names=(WAKE_WORD_NAME, STOP_WORD_NAME)) -> Model:
+    """
+    Loads the bundled wake word models into a single openwakeword Model.
+    `ncpu` sets the threads used by the shared melspectrogram/embedding
+    feature models, which dominate per-frame cost.
+    """
+    paths = [model_path(name, framework) for name in names]
+    logger.info(f"Loading wake word models ({framework}, ncpu={ncpu}): {paths}")
+    return Model(wakeword_models=paths, inference_framework=framework, ncpu=ncpu)
+
+
+def read_wav_16k(path: str) -> np.ndarray:
+    """Reads a 16 kHz, 16-bit mono WAV file as int16 samples."""
+    with wave.open(path, "rb") as wav:
+        if wav.getframerate() != 16000 or wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+            raise ValueError(f"{path}: expected 16 kHz 16-bit mono, got "
+                             f"{wav.getframerate()} Hz, {wav.getsampwidth() * 8}-bit, {wav.getnchannels()} ch")
+        return np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+
+
+class DetectionPolicy:
+    """
+    Turns a per-frame score stream into discrete detections for one word.
+
+    Scores are smoothed with a moving average over `smoothing_frames`, the
+    smoothed score must stay at or above `threshold` for `patience_frames`
+    consecutive frames, and after a detection further triggers are ignored
+    for `refractory_seconds`. Time is passed in by the caller so the same
+    policy runs against live ring positions and offline replays.
+    """
+
+    def __init__(self, threshold: float = 0.5, smoothing_frames: int = 3, patience_frames: int = 2,
+                 refractory_seconds: float = 2.0):
+        self.threshold = threshold
+        self.smoothing_frames = max(1, smoothing_frames)
+        self.patience_frames = max(1, patience_frames)
+        self.refractory_seconds = refractory_seconds
+        self._recent = np.zeros(self.smoothing_frames)
+        self._count = 0
+        self._streak = 0
+        self._last_detection = None
+        self.smoothed = 0.0
+
+    def reset(self):
+        """Clears smoothing and patience state (e.g. after the model is reset); keeps the refractory timer."""
+        self._recent[:] = 0.0
+        self._count = 0
+        self._streak = 0
+        self.smoothed = 0.0
+
+    def update(self, score: float, now: float) -> bool:
+        """Feeds one frame's raw score at time `now` (seconds); returns True on a detection."""
+        self._recent[self._count % self.smoothing_frames] = score
+        self._count += 1
+        self.smoothed = float(self._recent[:min(self._count, self.smoothing_frames)].mean())
+        self._streak = self._streak + 1 if self.smoothed >= self.threshold else 0
+
+        if self._streak < self.patience_frames:
+            return False
+        if self._last_detection is not None and now - self._last_detection < self.refractory_seconds:
+            return False
+        self._last_detection = now
+        self._streak = 0
+        return True
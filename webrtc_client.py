@@ -4,16 +4,16 @@ import asyncio
 import json
 import logging
 import threading
-import queue
+import time
 import aiohttp
 from aiortc import RTCPeerConnection, RTCSessionDescription
 
 logger = logging.getLogger(__name__)
 
 class WebRTCClient:
-    def __init__(self, audio_queue: queue.Queue, server_url="http://localhost:8081/offer"):
+    def __init__(self, audio_queue, server_url="http://localhost:8081/offer"):
         self.server_url = server_url
-        self.audio_queue = audio_queue
+        self.audio_queue = audio_queue  # Anything with put(): a queue.Queue or audio_playback.JitterBuffer
         self.pc = None
         self.loop = None
         self.thread = None
@@ -55,6 +55,17 @@ class WebRTCClient:
         self.thread.join(timeout=1.0)
         logger.info("WebRTC client stopped.")
 
+    def _on_control_message(self, message: str):
+        """Handles JSON control messages sent alongside the audio."""
+        try:
+            data = json.loads(message)
+        except ValueError:
+            logger.warning(f"WebRTC: Ignoring non-JSON text message: {message[:50]}")
+            return
+        if data.get("type") == "trace":
+            # In-band marker so playback knows which turn the next audio belongs to
+            self.audio_queue.put(("trace", data.get("trace_id", ""), time.time()))
+
     async def connect(self):
         """The main async connection logic."""
         
@@ -81,6 +92,8 @@ class WebRTCClient:
                     # This is where we receive the audio bytes
                     if isinstance(message, bytes):
                         self.audio_queue.put(message)
+                    elif isinstance(message, str):
+                        self._on_control_message(message)
                 
                 @channel.on("close")
                 def on_close():